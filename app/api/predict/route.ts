@@ -1,6 +1,5 @@
 import { NextResponse } from 'next/server';
-import { spawn } from 'child_process';
-import path from 'path';
+import { predictWithWorker } from '@/lib/predictWorker';
 
 export async function POST(request: Request) {
     try {
@@ -28,35 +27,12 @@ export async function POST(request: Request) {
             );
         }
 
-        // Call Python script
-        const pythonProcess = spawn('python', [
-            path.join(process.cwd(), 'lib\\predict.py'),
-            JSON.stringify({
-                home_team_id: homeTeamId,
-                away_team_id: awayTeamId,
-                home_rest_days: homeRestDays
-            })
-        ]);
-
-        // Collect output
-        let result = '';
-        for await (const data of pythonProcess.stdout) {
-            result += data.toString();
-        }
-
-        // Handle Python script errors
-        let errorOutput = '';
-        for await (const data of pythonProcess.stderr) {
-            errorOutput += data.toString();
-        }
-
-        if (errorOutput) {
-            console.error('Python error:', errorOutput);
-            throw new Error(errorOutput);
-        }
-
-        // Parse the JSON response
-        const predictionResult = JSON.parse(result);
+        // Send the request to the long-lived Python prediction worker
+        const predictionResult = await predictWithWorker({
+            home_team_id: homeTeamId,
+            away_team_id: awayTeamId,
+            home_rest_days: homeRestDays
+        });
 
         if (predictionResult.error) {
             return NextResponse.json(
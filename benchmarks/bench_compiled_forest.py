@@ -0,0 +1,65 @@
+"""Compare sklearn's RandomForestClassifier with the compiled array evaluator.
+
+For each win model, compiles the forest, checks that predict_proba is
+identical on the engineered feature rows, and times loading (unpickling vs
+memory-mapping), single-row inference, a 15-game slate and every row of
+the feature CSV.
+
+    python benchmarks/bench_compiled_forest.py --repeat 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+from compiled_forest import CompiledForest, compile_forest
+
+MODELS = [
+    ("models/nba_win_predictor.joblib", "models/nba_ml_ready.csv"),
+    ("models/nba_win_predictor2.joblib", "models/nba_ml_ready2.csv"),
+]
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")  # sklearn version and feature-name warnings
+
+    print(f"{'model':<28}{'':>10}{'load ms':>9}{'1 row ms':>10}{'15 rows ms':>12}{'all rows ms':>13}")
+    for model_path, csv_path in MODELS:
+        model = joblib.load(model_path)
+        X = pd.read_csv(csv_path)[list(model.feature_names_in_)]
+        compiled = compile_forest(model)
+        assert np.array_equal(model.predict_proba(X), compiled.predict_proba(X))
+
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "model.forest")
+            compiled.save(path)
+            loads = {
+                "sklearn": best_of(lambda: joblib.load(model_path), args.repeat),
+                "compiled": best_of(lambda: CompiledForest.load(path), args.repeat),
+            }
+            mapped = CompiledForest.load(path)
+
+            name = os.path.basename(model_path)
+            for label, evaluator in [("sklearn", model), ("compiled", mapped)]:
+                times = [
+                    best_of(lambda: evaluator.predict_proba(X.iloc[:n]), args.repeat)
+                    for n in (1, 15, len(X))
+                ]
+                print(f"{name:<28}{label:>10}{loads[label]:>9.1f}{times[0]:>10.2f}{times[1]:>12.2f}{times[2]:>13.2f}")
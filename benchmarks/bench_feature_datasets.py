@@ -0,0 +1,79 @@
+"""Compare the feature CSVs with the season-partitioned Parquet datasets.
+
+Reports disk size and load time for a full CSV read, a full Parquet read
+and a projected (training columns only) read of one season. With --scale N
+the rows are replicated across N synthetic seasons first.
+
+    python benchmarks/bench_feature_datasets.py --scale 20
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+from feature_datasets import SCHEMAS, write_dataset, read_dataset, dataset_path
+
+TRAINING_COLUMNS = {
+    "nba_ml_ready": ["home_avg_pts", "away_avg_pts_scored", "away_avg_pts_allowed",
+                     "home_win_pct", "home_net_rating", "home_rest_days", "home_win"],
+    "nba_ml_ready2": ["home_avg_pts", "away_avg_pts_allowed", "home_off_rating", "away_def_rating",
+                      "home_net_rating", "away_net_rating", "home_rest_days", "home_win"],
+    "nba_ml_ready_with_spread": ["date", "point_spread", "home_avg_margin", "away_avg_margin",
+                                 "home_margin_std", "away_margin_std", "pace_diff"],
+}
+
+def directory_size(path):
+    return sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, names in os.walk(path)
+        for name in names
+    )
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+def scaled(df, scale):
+    """Replicate rows across `scale` seasons, shifting ids, dates and seasons"""
+    copies = []
+    for i in range(scale):
+        copy = df.copy()
+        copy["id"] = copy["id"] + i * len(df)
+        copy["season"] = copy["season"] + i
+        copy["date"] = pd.to_datetime(copy["date"]) + pd.DateOffset(years=i)
+        copies.append(copy)
+    return pd.concat(copies, ignore_index=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        print(f"{'dataset':<26}{'rows':>8}{'csv KB':>9}{'parquet KB':>12}"
+              f"{'csv ms':>9}{'parquet ms':>12}{'projected ms':>14}")
+        for name in SCHEMAS:
+            df = pd.read_csv(f"models/{name}.csv")
+            df = scaled(df[[c for c in df.columns if c in SCHEMAS[name].names]], args.scale)
+            csv_path = os.path.join(root, f"{name}.csv")
+            df.to_csv(csv_path, index=False)
+            write_dataset(df, name, root)
+
+            last_season = [int(df["season"].max())]
+            csv_ms = best_of(lambda: pd.read_csv(csv_path), args.repeat)
+            parquet_ms = best_of(lambda: read_dataset(name, root=root), args.repeat)
+            projected_ms = best_of(
+                lambda: read_dataset(name, TRAINING_COLUMNS[name], last_season, root), args.repeat
+            )
+            print(f"{name:<26}{len(df):>8}{os.path.getsize(csv_path) / 1024:>9.0f}"
+                  f"{directory_size(dataset_path(name, root)) / 1024:>12.0f}"
+                  f"{csv_ms:>9.1f}{parquet_ms:>12.1f}{projected_ms:>14.1f}")
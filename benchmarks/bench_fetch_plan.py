@@ -0,0 +1,91 @@
+"""Time serial vs. planned RPC fetching for one prediction against a local stub.
+
+The stub mimics the PostgREST `/rest/v1/rpc/<name>` endpoints with a fixed
+per-call latency, so the numbers reflect round trips rather than Supabase.
+
+    python benchmarks/bench_fetch_plan.py --latency-ms 40 --repeat 5
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+STUB_ROWS = {
+    "get_home_team_stats": {"avg_pts": 114.2, "avg_pts_allowed": 111.0, "win_pct": 0.56, "home_net_rating": 1.03},
+    "get_away_team_stats": {"avg_pts": 112.8, "avg_pts_allowed": 113.1, "win_pct": 0.48, "home_net_rating": 0.99},
+    "get_advanced_team_stats": {
+        "off_rating": 115.1, "def_rating": 112.4, "net_rating": 2.7, "pace": 99.1,
+        "ts_pct": 0.58, "efg_pct": 0.54, "plus_minus": 3.1,
+    },
+    "get_head_to_head_stats": {"games_played": 12, "avg_point_diff": 2.5},
+    "get_advanced_head_to_head_stats": {"netrtg_last_5": 1.2, "netrtg_last_10": 0.8, "netrtg_last_20": 0.4},
+}
+
+def start_stub_server(latency):
+    """Serve canned RPC rows on localhost after sleeping `latency` seconds"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            func_name = self.path.split("?")[0].rsplit("/", 1)[-1]
+            time.sleep(latency)
+            body = json.dumps([STUB_ROWS[func_name]] if func_name in STUB_ROWS else []).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def time_call(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), sum(timings) / len(timings)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    server = start_stub_server(args.latency_ms / 1000)
+    os.environ["NEXT_PUBLIC_SUPABASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["NEXT_PUBLIC_SUPABASE_ANON_KEY"] = "stub-key"
+
+    import predict
+
+    # Time the network path rather than the in-process RPC cache
+    predict.call_rpc = predict.call_rpc_uncached
+
+    home_team_id, away_team_id, home_rest_days = 1, 2, 2
+
+    def serial():
+        predict.prepare_features_for_model1(home_team_id, away_team_id, home_rest_days)
+        predict.prepare_features_for_model2(home_team_id, away_team_id, home_rest_days)
+
+    def planned():
+        predict.fetch_slate_stats([(home_team_id, away_team_id, home_rest_days)])
+
+    # Warm up the HTTP connection pool before timing
+    planned()
+
+    print(f"Stub latency: {args.latency_ms:.0f} ms per RPC")
+    for name, fn in [("serial (8 RPCs)", serial), ("planned (7 distinct, concurrent)", planned)]:
+        best, mean = time_call(fn, args.repeat)
+        print(f"{name:<34} best {best * 1000:7.1f} ms   mean {mean * 1000:7.1f} ms")
+
+    server.shutdown()
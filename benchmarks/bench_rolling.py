@@ -0,0 +1,87 @@
+"""Compare groupby/transform lambdas with the shared rolling engine in lib/rolling.py.
+
+Builds a synthetic league (see synthetic_league.py), computes the rolling columns used
+by the three feature scripts both ways, checks they are identical and
+prints the timings.
+
+    python benchmarks/bench_rolling.py --seasons 20 --repeat 3
+"""
+import argparse
+import os
+import sys
+import time
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+from rolling import RollingSpec, rolling_features
+from synthetic_league import league
+
+HOME_SPECS = [
+    RollingSpec("home_avg_pts", "home_score", 10, min_periods=3),
+    RollingSpec("home_win_pct", "home_win", 82, min_periods=6),
+    RollingSpec("home_pts_last_10", "home_score", 10, min_periods=5),
+    RollingSpec("home_pts_allowed_last_10", "away_score", 10, min_periods=5),
+    RollingSpec("home_avg_margin", "point_spread", 10, min_periods=3),
+    RollingSpec("home_margin_std", "point_spread", 20, min_periods=5, stat="std"),
+]
+AWAY_SPECS = [
+    RollingSpec("away_avg_pts_scored", "away_score", 10, min_periods=3),
+    RollingSpec("away_avg_pts_allowed", "home_score", 10, min_periods=3),
+    RollingSpec("away_avg_margin", "point_spread", 10, min_periods=3),
+    RollingSpec("away_margin_std", "point_spread", 20, min_periods=5, stat="std"),
+]
+H2H_SPECS = [
+    RollingSpec(f"h2h_spread_last_{window}", "point_spread", window, min_periods=3, shift=1)
+    for window in [5, 10, 20]
+]
+GROUPS = [
+    ("home_team_id", HOME_SPECS),
+    ("away_team_id", AWAY_SPECS),
+    (["home_team_id", "away_team_id"], H2H_SPECS),
+]
+
+def synthetic_games(seasons, teams=30, seed=0):
+    """The synthetic league's games in the feature scripts' working dtypes and order"""
+    _, games, _ = league(seasons, teams, seed)
+    df = games.astype({"home_score": float, "away_score": float, "home_win": bool})
+    df["date"] = pd.to_datetime(df["date"])
+    df["point_spread"] = df["home_score"] - df["away_score"]
+    return df.sort_values(["home_team_id", "date"])
+
+def transform_lambdas(df):
+    """The per-group lambda pattern the feature scripts used before the engine"""
+    out = {}
+    for by, specs in GROUPS:
+        for spec in specs:
+            min_periods = spec.window if spec.min_periods is None else spec.min_periods
+            out[spec.name] = df.groupby(by)[spec.column].transform(
+                lambda x: getattr(x.shift(spec.shift).rolling(spec.window, min_periods=min_periods), spec.stat)()
+            )
+    return pd.DataFrame(out)
+
+def rolling_engine(df):
+    return pd.concat([rolling_features(df, by, specs) for by, specs in GROUPS], axis=1)
+
+def best_of(fn, df, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seasons", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = synthetic_games(args.seasons)
+    baseline, expected = best_of(transform_lambdas, df, args.repeat)
+    engine, actual = best_of(rolling_engine, df, args.repeat)
+
+    pd.testing.assert_frame_equal(expected.astype(float), actual, check_exact=True)
+    print(f"{len(df):,} games, {sum(len(specs) for _, specs in GROUPS)} rolling columns (outputs identical)")
+    print(f"transform lambdas  {baseline * 1000:8.1f} ms")
+    print(f"rolling engine     {engine * 1000:8.1f} ms   ({baseline / engine:.1f}x)")
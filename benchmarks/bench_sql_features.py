@@ -0,0 +1,73 @@
+"""Compare the pandas feature scripts with the DuckDB window-function backend.
+
+Generates a synthetic league (see synthetic_league.py) at about 1x, 10x and
+100x the row count of the current games table. For each size it builds the nba_ml_ready and
+nba_ml_ready_with_spread feature sets both ways, checks that they match,
+and prints the timings. The SQL timing covers only the queries; loading
+the local copy is reported separately.
+
+    python benchmarks/bench_sql_features.py --scales 1 10 100
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+import feature_engineering
+import feature_engineering_regressor
+import sql_features
+from shared_features import shared_features
+from synthetic_league import league, GAMES_PER_TEAM
+
+BASE_ROWS = 1000  # Roughly the games table today
+TEAMS = 30
+
+def seasons_for(scale, teams=TEAMS):
+    """Whole seasons holding about `scale` times BASE_ROWS games"""
+    return max(1, round(BASE_ROWS * scale / (teams * GAMES_PER_TEAM // 2)))
+
+def pandas_features(games, adv_stats):
+    shared = shared_features(games)
+    with contextlib.redirect_stdout(io.StringIO()):
+        win = feature_engineering.engineer_features(games.copy(), shared=shared)
+        spread = feature_engineering_regressor.engineer_features(
+            games.drop(columns=["season_type"]), adv_stats, shared
+        )
+    return win.reset_index(drop=True), spread.reset_index(drop=True)
+
+def sql_features_for(con):
+    return sql_features.win_features(con), sql_features.spread_features(con)
+
+def timed(fn, *args, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000, result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'scale':>6}{'games':>9}{'pandas ms':>11}{'load ms':>9}{'sql ms':>9}{'speedup':>9}")
+    for scale in args.scales:
+        _, games, adv_stats = league(seasons_for(scale), TEAMS)
+        con = sql_features.connect(":memory:")
+
+        pandas_ms, expected = timed(pandas_features, games, adv_stats, repeat=args.repeat)
+        load_ms, _ = timed(sql_features.sync_tables, con, games, adv_stats, repeat=1)
+        sql_ms, actual = timed(sql_features_for, con, repeat=args.repeat)
+
+        # Rolling std-devs are summed in a different order, so allow a few ulps
+        for want, got in zip(expected, actual):
+            pd.testing.assert_frame_equal(want, got, check_exact=False, rtol=1e-12, atol=1e-12)
+        print(f"{scale:>5}x{len(games):>9,}{pandas_ms:>11.1f}{load_ms:>9.1f}{sql_ms:>9.1f}"
+              f"{pandas_ms / sql_ms:>8.1f}x")
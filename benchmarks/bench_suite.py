@@ -0,0 +1,264 @@
+"""Time and memory-profile the feature, training and serving paths on a synthetic league.
+
+For each --seasons size, builds a workspace holding a synthetic league
+(see synthetic_league.py) as a local database, its feature datasets and a
+copy of the model registry. Then every case runs in a fresh process with
+that workspace as its working directory and DATA_SOURCE=local:
+
+    features  shared_features and each engineer_features
+    training  each script in models/training_scripts
+    serving   predict.py cold start, a single request with a warm and a
+              cold RPC cache, a one-day slate and the full matchup matrix
+
+Each case records wall time and peak RSS, plus how much the timed calls
+grew the peak over their setup, and the whole run is written as JSON. Pass
+--compare with an earlier report to flag cases that got slower.
+
+    python benchmarks/bench_suite.py --seasons 2 5 20 --output benchmarks/results/report.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "lib"))
+
+CASES = {
+    "features": ["shared_features", "feature_engineering", "feature_engineering_xgboost",
+                 "feature_engineering_regressor"],
+    "training": ["train_win_model", "train_xgboost_model", "train_spread_model"],
+    "serving": ["predict_cold", "predict_cached", "predict_single", "predict_slate", "predict_matrix"],
+}
+
+# Timed calls per serving case after the warm-up request
+SERVING_ITERATIONS = {"predict_cached": 200, "predict_single": 20, "predict_slate": 5, "predict_matrix": 1}
+
+# Everything the serving path loads besides what training writes
+MODEL_FILES = ["registry.json", "nba_win_predictor.joblib", "nba_win_predictor.forest",
+               "nba_win_predictor2.joblib", "nba_win_predictor2.forest"]
+
+SLOWER = 1.25  # Ratio to an earlier report that counts as a regression
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far"""
+    # VmHWM starts fresh at exec, unlike ru_maxrss, which keeps the parent's
+    # peak from before the fork
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except FileNotFoundError:
+        pass
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+
+def prepare_workspace(path, seasons, teams, seed):
+    """Synthetic league tables, feature datasets and model copies under `path`"""
+    from synthetic_league import league, write_local_db
+    from feature_pipeline import FeaturePipeline
+    from feature_datasets import write_dataset
+
+    os.makedirs(os.path.join(path, "models", "results"), exist_ok=True)
+    os.makedirs(os.path.join(path, "raw"), exist_ok=True)
+    if not os.path.exists(os.path.join(path, "lib")):
+        os.symlink(os.path.abspath(os.path.join(ROOT, "lib")), os.path.join(path, "lib"))
+    for name in MODEL_FILES:
+        source, destination = os.path.join(ROOT, "models", name), os.path.join(path, "models", name)
+        if os.path.isdir(source):
+            shutil.copytree(source, destination, dirs_exist_ok=True)
+        elif os.path.exists(source):
+            shutil.copy2(source, destination)
+
+    teams_df, games, adv_stats = league(seasons, teams, seed)
+    games.to_parquet(os.path.join(path, "raw", "games.parquet"))
+    adv_stats.to_parquet(os.path.join(path, "raw", "team_advanced_stats.parquet"))
+    write_local_db(os.path.join(path, "models", "nba_local.duckdb"), teams_df, games, adv_stats)
+
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        pipeline = FeaturePipeline(cache_dir=os.path.join(path, "pipeline_cache"), games=games, adv_stats=adv_stats)
+        for name, df in pipeline.run().items():
+            write_dataset(df, name, root=os.path.join(path, "models", "datasets"))
+    return len(games)
+
+def load_raw():
+    import pandas as pd
+    from table_reader import GAMES_SCHEMA, ADVANCED_STATS_SCHEMA
+
+    games = pd.read_parquet("raw/games.parquet").astype(GAMES_SCHEMA)
+    adv_stats = pd.read_parquet("raw/team_advanced_stats.parquet").astype(ADVANCED_STATS_SCHEMA)
+    return games, adv_stats
+
+def feature_case(name):
+    """Setup for a features case, returning the call to time"""
+    games, adv_stats = load_raw()
+    if name == "shared_features":
+        from shared_features import shared_features
+        return lambda: shared_features(games)
+    if name == "feature_engineering":
+        import feature_engineering
+        return lambda: feature_engineering.engineer_features(games.copy())
+    if name == "feature_engineering_xgboost":
+        import feature_engineering_xgboost
+        return lambda: feature_engineering_xgboost.engineer_features(games.copy(), adv_stats)
+    import feature_engineering_regressor
+    return lambda: feature_engineering_regressor.engineer_features(games.drop(columns=["season_type"]), adv_stats)
+
+def training_case(name):
+    script = os.path.join(ROOT, "models", "training_scripts", f"{name}.py")
+    return lambda: runpy.run_path(script, run_name="__main__")
+
+def serving_case(name, teams):
+    """Setup for a serving case; cold start times the import and first request"""
+    matchups = [
+        {"home_team_id": home, "away_team_id": away, "home_rest_days": 2}
+        for home in range(1, teams + 1) for away in range(1, teams + 1) if home != away
+    ]
+    if name == "predict_cold":
+        def cold():
+            import predict
+            predict.handle_request(matchups[0])
+        return cold
+
+    import predict
+    predict.handle_request(matchups[0])
+    if name == "predict_cached":
+        return lambda: predict.handle_request(matchups[0])
+
+    def uncached(request):
+        predict.rpc_cache.invalidate()
+        predict.handle_request(request)
+
+    if name == "predict_single":
+        return lambda: uncached(matchups[0])
+    if name == "predict_slate":
+        # One day: every team plays once
+        slate = [{"home_team_id": home, "away_team_id": home + 1, "home_rest_days": 1}
+                 for home in range(1, teams, 2)]
+        return lambda: uncached({"matchups": slate})
+    return lambda: uncached({"matchups": matchups})
+
+def run_case(stage, name, teams):
+    """Run one case in this process and return its measurements; growth is
+    the peak memory added by the timed calls on top of their setup"""
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        if stage == "features":
+            fn = feature_case(name)
+        elif stage == "training":
+            fn = training_case(name)
+        else:
+            fn = serving_case(name, teams)
+        baseline = peak_rss_mb()
+        iterations = SERVING_ITERATIONS.get(name, 1)
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        seconds = (time.perf_counter() - start) / iterations
+    peak = peak_rss_mb()
+    return {"seconds": seconds, "iterations": iterations,
+            "peak_rss_mb": round(peak, 1), "rss_growth_mb": round(peak - baseline, 1)}
+
+def run_case_process(workspace, stage, name, teams):
+    """Run a case in a fresh interpreter with the workspace as its working directory"""
+    result_path = os.path.join(workspace, "result.json")
+    env = {**os.environ, "DATA_SOURCE": "local", "MPLBACKEND": "Agg", "MODEL_RELOAD_SECONDS": "0",
+           "LOCAL_DB_PATH": os.path.join(workspace, "models", "nba_local.duckdb")}
+    env.pop("RPC_CACHE_PATH", None)
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--case", stage, name,
+         "--teams", str(teams), "--result", result_path],
+        cwd=workspace, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"}
+    with open(result_path) as f:
+        return json.load(f)
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(report, baseline_path):
+    """Print each case's time against an earlier report"""
+    with open(baseline_path) as f:
+        baseline = {(r["stage"], r["case"], r["seasons"], r["teams"]): r for r in json.load(f)["results"]}
+    print(f"\nAgainst {baseline_path}:")
+    regressions = 0
+    for result in report["results"]:
+        before = baseline.get((result["stage"], result["case"], result["seasons"], result["teams"]))
+        if before is None or "seconds" not in before or "seconds" not in result:
+            continue
+        ratio = result["seconds"] / before["seconds"]
+        flag = "  SLOWER" if ratio > SLOWER else ""
+        regressions += bool(flag)
+        print(f"{result['case']:<30}{result['seasons']:>4} seasons {ratio:>6.2f}x{flag}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seasons", type=int, nargs="+", default=[2, 5, 20])
+    parser.add_argument("--teams", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--output", default="benchmarks/results/report.json")
+    parser.add_argument("--compare", help="earlier report to compare timings against")
+    parser.add_argument("--workdir", help="keep workspaces here instead of a temporary directory")
+    parser.add_argument("--case", nargs=2, help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        result = run_case(*args.case, args.teams)
+        with open(args.result, "w") as f:
+            json.dump(result, f)
+        sys.exit(0)
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": args.seed,
+        "results": [],
+    }
+    workdir = args.workdir or tempfile.mkdtemp(prefix="nba-bench-")
+    print(f"{'case':<30}{'seasons':>8}{'games':>9}{'ms':>12}{'peak MB':>9}{'growth MB':>11}")
+    try:
+        for seasons in args.seasons:
+            workspace = os.path.abspath(os.path.join(workdir, f"{seasons}-seasons-{args.teams}-teams"))
+            games = prepare_workspace(workspace, seasons, args.teams, args.seed)
+            for stage in args.stages:
+                for name in CASES[stage]:
+                    result = {"stage": stage, "case": name, "seasons": seasons, "teams": args.teams,
+                              "games": games, **run_case_process(workspace, stage, name, args.teams)}
+                    report["results"].append(result)
+                    if "error" in result:
+                        print(f"{name:<30}{seasons:>8}{games:>9,}  failed: {result['error']}")
+                    else:
+                        print(f"{name:<30}{seasons:>8}{games:>9,}{result['seconds'] * 1000:>12.1f}"
+                              f"{result['peak_rss_mb']:>9.0f}{result['rss_growth_mb']:>11.0f}")
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+    if args.compare:
+        compare(report, args.compare)
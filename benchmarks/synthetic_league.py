@@ -0,0 +1,164 @@
+"""Deterministic synthetic league for benchmarks.
+
+Produces the teams, games and team_advanced_stats tables for N seasons of
+M teams, in the schemas table_reader returns. Each team plays about 82
+games a season, never twice on one day, scores follow per-season team
+strengths that drift between seasons, and the advanced stats are derived
+from the same strengths, so the feature scripts see plausible signal. The
+same (seasons, teams, seed) always gives the same tables.
+
+    python benchmarks/synthetic_league.py --seasons 20 --teams 30 --db models/bench.duckdb
+
+With --schedule it also writes each season in the layout of the NBA
+schedule feed, for running ingestion against local files.
+"""
+import argparse
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+from table_reader import TEAMS_SCHEMA, GAMES_SCHEMA, ADVANCED_STATS_SCHEMA
+
+FIRST_SEASON = 2000
+GAMES_PER_TEAM = 82
+SEASON_DAYS = 165
+HOME_EDGE = 2.5  # Points
+
+def teams_table(teams):
+    return pd.DataFrame({
+        "id": np.arange(1, teams + 1),
+        "name": [f"Team {team:02d}" for team in range(1, teams + 1)],
+        "abbreviation": [f"T{team:02d}" for team in range(1, teams + 1)],
+    }).astype(TEAMS_SCHEMA)
+
+def season_schedule(rng, teams):
+    """(day, home, away) arrays for one season where every team plays each day at most once"""
+    total = teams * GAMES_PER_TEAM // 2
+    per_day = max(1, min(teams // 2, -(-total // SEASON_DAYS)))
+    days = -(-total // per_day)
+    # Each day pairs off a random permutation of the teams
+    pairs = np.argsort(rng.random((days, teams)), axis=1)[:, :2 * per_day] + 1
+    home = pairs[:, 0::2].ravel()[:total]
+    away = pairs[:, 1::2].ravel()[:total]
+    day = np.repeat(np.arange(days), per_day)[:total]
+    return day, home, away
+
+def league(seasons, teams=30, seed=0):
+    """teams, games and team_advanced_stats tables for `seasons` seasons of `teams` teams"""
+    rng = np.random.default_rng(seed)
+    strength = rng.normal(0, 5, teams)
+    games, adv_stats = [], []
+    for offset in range(seasons):
+        season = FIRST_SEASON + offset
+        # Rosters change: strengths carry over with some regression and noise
+        strength = 0.7 * strength + rng.normal(0, 3, teams)
+        day, home, away = season_schedule(rng, teams)
+        edge = (strength[home - 1] - strength[away - 1]) / 2 + HOME_EDGE / 2
+        home_score = np.round(rng.normal(112 + edge, 11)).astype(int)
+        away_score = np.round(rng.normal(112 - edge, 11)).astype(int)
+        # No ties: overtime goes to a coin flip
+        tied = home_score == away_score
+        home_score[tied] += rng.integers(0, 2, tied.sum()) * 2 - 1
+        start = pd.Timestamp(f"{season}-10-22")
+        games.append(pd.DataFrame({
+            "season": season,
+            "date": (start + pd.to_timedelta(day, unit="D")).strftime("%Y-%m-%d"),
+            "home_team_id": home,
+            "away_team_id": away,
+            "home_score": home_score,
+            "away_score": away_score,
+            "home_win": home_score > away_score,
+            "season_type": "Regular Season",
+        }))
+
+        off_rating = 114 + strength / 2 + rng.normal(0, 1.5, teams)
+        def_rating = 114 - strength / 2 + rng.normal(0, 1.5, teams)
+        adv_stats.append(pd.DataFrame({
+            "team_id": np.arange(1, teams + 1),
+            "season": season,
+            "off_rating": off_rating,
+            "def_rating": def_rating,
+            "net_rating": off_rating - def_rating,
+            "pace": rng.normal(99, 2, teams),
+            "ts_pct": 0.57 + strength * 0.002 + rng.normal(0, 0.01, teams),
+            "efg_pct": 0.53 + strength * 0.002 + rng.normal(0, 0.01, teams),
+            "plus_minus": strength * 0.9 + rng.normal(0, 1, teams),
+        }))
+
+    games = pd.concat(games, ignore_index=True)
+    games.insert(0, "id", np.arange(1, len(games) + 1))
+    adv_stats = pd.concat(adv_stats, ignore_index=True)
+    adv_stats.insert(0, "id", np.arange(1, len(adv_stats) + 1))
+    return teams_table(teams), games.astype(GAMES_SCHEMA), adv_stats.astype(ADVANCED_STATS_SCHEMA)
+
+def schedule_json(teams, games, season, preseason_games=10):
+    """One season of games in the layout of the NBA 00_full_schedule.json feed,
+    led by a few preseason games, as a fixture for ingestion"""
+    abbreviation = dict(zip(teams["id"], teams["abbreviation"]))
+    games = games[games["season"] == season]
+    rng = np.random.default_rng(season)
+    preseason = pd.DataFrame({
+        "date": pd.Timestamp(f"{season}-10-05") + pd.to_timedelta(np.arange(preseason_games), unit="D"),
+        "home_team_id": rng.integers(1, len(teams) + 1, preseason_games),
+    })
+    preseason["away_team_id"] = preseason["home_team_id"] % len(teams) + 1
+
+    def game(season_type, number, date, home, away, home_score=None, away_score=None):
+        day = pd.Timestamp(date).strftime("%Y%m%d")
+        return {
+            # Like real ids: season type (001 preseason, 002 regular season), season, number
+            "gid": f"{season_type}{season % 100:02d}{number:05d}",
+            "gcode": f"{day}/{abbreviation[away]}{abbreviation[home]}",
+            "h": {"tid": int(home), "ta": abbreviation[home], "s": "" if home_score is None else str(home_score)},
+            "v": {"tid": int(away), "ta": abbreviation[away], "s": "" if away_score is None else str(away_score)},
+        }
+
+    rows = [
+        game("001", i + 1, row.date, row.home_team_id, row.away_team_id)
+        for i, row in enumerate(preseason.itertuples())
+    ]
+    rows += [
+        game("002", i + 1, row.date, row.home_team_id, row.away_team_id, row.home_score, row.away_score)
+        for i, row in enumerate(games.itertuples())
+    ]
+    months = {}
+    for row in rows:
+        months.setdefault(row["gcode"][:6], []).append(row)
+    return {"lscd": [
+        {"mscd": {"mon": pd.Timestamp(f"{month}01").strftime("%B"), "g": month_games}}
+        for month, month_games in months.items()
+    ]}
+
+def write_local_db(path, teams, games, adv_stats):
+    """Load the tables into a local database that DATA_SOURCE=local can serve from"""
+    from data_access import LocalSource
+
+    source = LocalSource(path)
+    source.replace_table("teams", teams)
+    source.replace_table("games", games)
+    source.replace_table("team_advanced_stats", adv_stats)
+    source.con.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seasons", type=int, default=5)
+    parser.add_argument("--teams", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", help="local database file to write")
+    parser.add_argument("--schedule", help="also write each season's schedule feed, with {season} in the path")
+    args = parser.parse_args()
+
+    teams, games, adv_stats = league(args.seasons, args.teams, args.seed)
+    if args.db:
+        write_local_db(args.db, teams, games, adv_stats)
+        print(f"Wrote {len(games):,} games and {len(adv_stats):,} advanced stat rows to {args.db}")
+    if args.schedule:
+        for season in games["season"].unique():
+            path = args.schedule.format(season=season)
+            with open(path, "w") as f:
+                json.dump(schedule_json(teams, games, season), f)
+            print(f"Wrote the {season} schedule to {path}")
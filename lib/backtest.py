@@ -0,0 +1,168 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from sklearn.metrics import accuracy_score, roc_auc_score, log_loss, mean_absolute_error
+from feature_datasets import dataset_path
+from feature_pipeline import content_hash
+from model_registry import read_manifest
+from model_params import MODELS, tuned_params
+
+CACHE_DIR = "models/backtest_cache"
+RESULTS_PATH = "models/results/backtest.csv"
+
+# Folds need at least this many training games before a period is scored
+MIN_TRAIN_GAMES = 200
+
+def load_frame(dataset):
+    """A feature dataset in date order, with the season and month each game falls in"""
+    df = pd.read_parquet(dataset_path(dataset))
+    df = df.sort_values(["date", "id"], kind="stable").reset_index(drop=True)
+    df["season"] = df["season"].astype(int)
+    df["month"] = df["date"].dt.to_period("M").astype(str)
+    return df
+
+def cached_matrix(dataset, df, cache_dir=CACHE_DIR):
+    """Every numeric column of a dataset as one float64 matrix saved as .npy.
+
+    Rows are in date order, so each fold's training and test games are
+    contiguous row ranges, and every model on the dataset selects its own
+    columns from the same file. The file is keyed on the data's content
+    hash and workers memory-map it, so it is built once and shared by all
+    folds, models and later runs.
+    """
+    numeric = df.drop(columns=["date", "month"]).select_dtypes(include=["number", "bool"])
+    path = os.path.join(cache_dir, f"{dataset}-{content_hash(numeric)}.npy")
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, numeric.to_numpy(dtype=np.float64))
+        os.replace(tmp_path, path)
+    return path, list(numeric.columns)
+
+def make_folds(periods, window="expanding", train_periods=3, min_train=MIN_TRAIN_GAMES):
+    """Walk-forward folds over a date-ordered Series of period labels.
+
+    Each fold tests one period and trains on all earlier ones (expanding)
+    or the `train_periods` before it (rolling), as (label, train, test)
+    row ranges.
+    """
+    starts = np.flatnonzero(periods.ne(periods.shift()).to_numpy())
+    labels = periods.iloc[starts].tolist()
+    bounds = starts.tolist() + [len(periods)]
+
+    folds = []
+    for i, label in enumerate(labels):
+        first = 0 if window == "expanding" else max(0, i - train_periods)
+        train = (bounds[first], bounds[i])
+        if i == 0 or train[1] - train[0] < min_train:
+            continue
+        folds.append((label, train, (bounds[i], bounds[i + 1])))
+    return folds
+
+def score_fold(model, y, predicted):
+    """Fold metrics: win models score probabilities, the spread model its margins
+    (the predicted winner and margin ranking against who actually won)"""
+    if MODELS[model]["target"] == "point_spread":
+        won = y > 0
+        return {
+            "accuracy": accuracy_score(won, predicted > 0),
+            "auc": roc_auc_score(won, predicted) if won.min() != won.max() else np.nan,
+            "logloss": np.nan,
+            "mae": mean_absolute_error(y, predicted),
+        }
+    won = y.astype(bool)
+    return {
+        "accuracy": accuracy_score(won, predicted > 0.5),
+        "auc": roc_auc_score(won, predicted) if won.min() != won.max() else np.nan,
+        "logloss": log_loss(won, np.clip(predicted, 1e-15, 1 - 1e-15), labels=[False, True]),
+        "mae": np.nan,
+    }
+
+def run_fold(model, params, matrix_path, feature_cols, target_col, train, test):
+    """Fit one model on a fold's training rows and score it on the test rows"""
+    start = time.perf_counter()
+    matrix = np.load(matrix_path, mmap_mode="r")
+    X_train, y_train = matrix[train[0]:train[1], feature_cols], matrix[train[0]:train[1], target_col]
+    X_test, y_test = matrix[test[0]:test[1], feature_cols], matrix[test[0]:test[1], target_col]
+
+    estimator = MODELS[model]["build"](params)
+    if MODELS[model]["target"] == "point_spread":
+        estimator.fit(X_train, y_train)
+        predicted = estimator.predict(X_test)
+    else:
+        estimator.fit(X_train, y_train.astype(bool))
+        predicted = estimator.predict_proba(X_test)[:, 1]
+    return {**score_fold(model, y_test, predicted), "seconds": time.perf_counter() - start}
+
+def backtest(models, by="month", window="expanding", train_periods=3, min_train=MIN_TRAIN_GAMES,
+             jobs=None, cache_dir=CACHE_DIR):
+    """Walk-forward backtest of each model, with every (model, fold) pair run
+    in a process pool; returns one row of metrics per model and fold"""
+    manifest = read_manifest()["models"]
+    tasks, rows = [], []
+    frames = {}
+    for model in models:
+        spec = MODELS[model]
+        if spec["dataset"] not in frames:
+            df = load_frame(spec["dataset"])
+            frames[spec["dataset"]] = (df, *cached_matrix(spec["dataset"], df, cache_dir))
+        df, matrix_path, columns = frames[spec["dataset"]]
+
+        features = manifest[spec["registry"]]["features"]
+        feature_cols = [columns.index(feature) for feature in features]
+        target_col = columns.index(spec["target"])
+        params = tuned_params(model)
+        for label, train, test in make_folds(df[by], window, train_periods, min_train):
+            tasks.append((model, params, matrix_path, feature_cols, target_col, train, test))
+            rows.append({
+                "model": model, "test_period": label,
+                "train_from": df[by].iloc[train[0]], "train_to": df[by].iloc[train[1] - 1],
+                "train_games": train[1] - train[0], "test_games": test[1] - test[0],
+            })
+
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+        results = list(pool.map(run_fold, *zip(*tasks))) if tasks else []
+    return pd.DataFrame([{**row, **result} for row, result in zip(rows, results)])
+
+def summarize(results):
+    """Per-model metrics over all folds, weighted by test games"""
+    def weighted(group):
+        weights = group["test_games"]
+        return pd.Series({
+            "folds": len(group),
+            "test_games": weights.sum(),
+            **{metric: np.average(group[metric].dropna(), weights=weights[group[metric].notna()])
+               if group[metric].notna().any() else np.nan
+               for metric in ["accuracy", "auc", "logloss", "mae"]},
+            "seconds": group["seconds"].sum(),
+        })
+    return results.groupby("model", sort=False)[list(results.columns)].apply(weighted)
+
+# Walk-forward backtest, e.g. `python lib/backtest.py --by month --window rolling --train-periods 6`
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the trained models")
+    parser.add_argument("--models", nargs="+", choices=sorted(MODELS), default=list(MODELS))
+    parser.add_argument("--by", choices=["month", "season"], default="month")
+    parser.add_argument("--window", choices=["expanding", "rolling"], default="expanding")
+    parser.add_argument("--train-periods", type=int, default=3, help="periods trained on by a rolling window")
+    parser.add_argument("--min-train", type=int, default=MIN_TRAIN_GAMES)
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--output", default=RESULTS_PATH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = backtest(args.models, args.by, args.window, args.train_periods, args.min_train, args.jobs)
+    if results.empty:
+        print("No folds: not enough periods with the minimum training games")
+    else:
+        pd.set_option("display.width", 200)
+        print(results.round(4).to_string(index=False))
+        print("\nSummary:")
+        print(summarize(results).round(4).to_string())
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+        results.to_csv(args.output, index=False)
+        print(f"\nSaved {len(results)} folds to {args.output} in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,164 @@
+import os
+import sys
+import json
+import shutil
+import numpy as np
+
+# Rows walked through the trees together; small blocks keep the per-node
+# temporaries in cache on large batches
+BLOCK_ROWS = 64
+
+ARRAYS = ["feature", "threshold", "missing_left", "children", "value", "roots"]
+
+def compiled_path(model_path):
+    """Directory holding the compiled arrays for a .joblib model"""
+    return os.path.splitext(model_path)[0] + ".forest"
+
+def source_stamp(model_path):
+    """Size and mtime of the pickled model, to tell when a compiled copy is stale"""
+    stat = os.stat(model_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+def compile_forest(model):
+    """Flatten a fitted RandomForestClassifier into contiguous node arrays.
+
+    All trees share one set of arrays indexed by global node id, with the
+    root of tree t at roots[t]. children[2 * node] and children[2 * node + 1]
+    are the left and right child; leaves point back at themselves on both
+    sides, so walking every row for `depth` steps always ends on a leaf.
+    missing_left records where sklearn sends NaN inputs, and value holds
+    each node's class probabilities, as tree.predict_proba returns them.
+    """
+    trees = [estimator.tree_ for estimator in model.estimators_]
+    sizes = np.array([tree.node_count for tree in trees])
+    offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+
+    feature, threshold, missing_left, left, right, value = [], [], [], [], [], []
+    for tree, offset in zip(trees, offsets):
+        nodes = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        feature.append(np.where(is_leaf, 0, tree.feature))
+        threshold.append(np.where(is_leaf, np.inf, tree.threshold))
+        missing_left.append(np.asarray(tree.missing_go_to_left, dtype=bool))
+        left.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+        right.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+        proba = tree.value[:, 0, :]
+        value.append(proba / proba.sum(axis=1, keepdims=True))
+
+    return CompiledForest(
+        arrays={
+            "feature": np.concatenate(feature).astype(np.int32),
+            "threshold": np.concatenate(threshold).astype(np.float64),
+            "missing_left": np.concatenate(missing_left),
+            "children": np.column_stack([np.concatenate(left), np.concatenate(right)]).ravel().astype(np.intp),
+            "value": np.concatenate(value).astype(np.float64),
+            "roots": offsets.astype(np.intp),
+        },
+        meta={
+            "depth": int(max(tree.max_depth for tree in trees)),
+            "n_features": int(model.n_features_in_),
+            "feature_names": [str(name) for name in getattr(model, "feature_names_in_", [])],
+            "classes": np.asarray(model.classes_).tolist(),
+        },
+    )
+
+class CompiledForest:
+    """Array-based RandomForestClassifier evaluator.
+
+    predict_proba matches the sklearn forest it was compiled from: inputs
+    are compared as float32, as sklearn's trees do, and the per-tree
+    probabilities are summed in tree order before averaging.
+    """
+
+    def __init__(self, arrays, meta):
+        self.arrays = arrays
+        self.meta = meta
+        self.classes_ = np.asarray(meta["classes"])
+        self.n_features_in_ = meta["n_features"]
+        if meta["feature_names"]:
+            self.feature_names_in_ = np.asarray(meta["feature_names"], dtype=object)
+
+    def save(self, path, source=None):
+        """Write the arrays as .npy files, with meta.json written last.
+
+        Everything is fsynced in a temporary directory before it replaces
+        the old one; processes still mapping the old arrays keep them.
+        """
+        tmp_path = path + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name in ARRAYS:
+            with open(os.path.join(tmp_path, f"{name}.npy"), "wb") as f:
+                np.save(f, self.arrays[name])
+                os.fsync(f.fileno())
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump({**self.meta, "source": source}, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Open compiled arrays memory-mapped; nothing is unpickled"""
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in ARRAYS}
+        return cls(arrays, meta)
+
+    def predict_proba(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if len(X) <= BLOCK_ROWS:
+            return self._predict_block(X)
+        return np.concatenate([
+            self._predict_block(X[start:start + BLOCK_ROWS])
+            for start in range(0, len(X), BLOCK_ROWS)
+        ])
+
+    def _predict_block(self, X):
+        a = self.arrays
+        # Flat positions of each row's features, one column per tree
+        row_start = (np.arange(len(X)) * X.shape[1])[:, None]
+        node = np.repeat(a["roots"][None, :], len(X), axis=0)
+        has_missing = np.isnan(X).any()
+        for _ in range(self.meta["depth"]):
+            x = X.ravel()[row_start + a["feature"][node]]
+            goes_right = ~(x <= a["threshold"][node])
+            if has_missing:
+                goes_right &= ~(np.isnan(x) & a["missing_left"][node])
+            node = a["children"][2 * node + goes_right]
+
+        # Summing over the leading tree axis adds trees one at a time, in
+        # order, so rounding matches sklearn's accumulation
+        proba = a["value"][node.T].sum(axis=0)
+        return proba / node.shape[1]
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+def compile_model_file(model_path):
+    """Compile a pickled forest next to it and return the compiled directory"""
+    import joblib
+
+    model = joblib.load(model_path)
+    path = compiled_path(model_path)
+    compile_forest(model).save(path, source=source_stamp(model_path))
+    return path
+
+def load_compiled(model_path):
+    """The compiled copy of a .joblib model, or None if missing or older than the pickle"""
+    path = compiled_path(model_path)
+    try:
+        with open(os.path.join(path, "meta.json")) as f:
+            source = json.load(f).get("source")
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    if source != source_stamp(model_path):
+        return None
+    return CompiledForest.load(path)
+
+# Compile the given forests (default: both win models)
+if __name__ == "__main__":
+    paths = sys.argv[1:] or ["models/nba_win_predictor.joblib", "models/nba_win_predictor2.joblib"]
+    for model_path in paths:
+        print(f"Compiled {model_path} -> {compile_model_file(model_path)}")
@@ -0,0 +1,182 @@
+import os
+import sys
+import threading
+import pandas as pd
+from dotenv import load_dotenv
+from table_reader import PAGE_SIZE, TEAMS_SCHEMA, GAMES_SCHEMA, ADVANCED_STATS_SCHEMA
+import table_reader
+
+load_dotenv()
+
+# Filter operators understood by read_table, as PostgREST names them
+SQL_OPERATORS = {"eq": "=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+
+TABLE_SCHEMAS = {
+    "teams": TEAMS_SCHEMA,
+    "games": GAMES_SCHEMA,
+    "team_advanced_stats": ADVANCED_STATS_SCHEMA,
+}
+
+class SupabaseSource:
+    """Hosted Supabase: paginated table reads, PostgREST writes and the stats RPCs.
+
+    The client is created on first use, so importing a module that holds a
+    source needs neither credentials nor network access.
+    """
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        if self._client is None:
+            from supabase import create_client
+            # The app's variables, or the ones the Python scripts used before
+            url = os.getenv("NEXT_PUBLIC_SUPABASE_URL") or os.getenv("SUPABASE_URL")
+            key = os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY") or os.getenv("SUPABASE_KEY")
+            if not url or not key:
+                raise ValueError("Supabase URL or Key is missing. Check your environment variables.")
+            self._client = create_client(url, key)
+        return self._client
+
+    def read_table(self, table, schema, key="id", page_size=PAGE_SIZE, filters=()):
+        return table_reader.read_table(self.client, table, schema, key, page_size, filters)
+
+    def insert(self, table, rows):
+        self.client.table(table).insert(rows).execute()
+
+    def upsert(self, table, rows):
+        self.client.table(table).upsert(rows).execute()
+
+    def rpc(self, func_name, params):
+        """First row returned by an RPC function, or None"""
+        response = self.client.rpc(func_name, params).execute()
+        return response.data[0] if response.data else None
+
+class LocalSource:
+    """Embedded DuckDB database with the same tables and RPCs as Supabase.
+
+    Reads, writes and stats calls all run in-process against one database
+    file (the copy sql_features.py builds features from), so pipelines can
+    run offline at disk speed. Calls are serialised on one connection, which
+    is opened on first use. DuckDB is only imported by local sources, so the
+    Supabase serving path does not load it.
+    """
+
+    def __init__(self, path=None):
+        import sql_features
+        self.path = path or sql_features.DEFAULT_DB_PATH
+        self._con = None
+        self.lock = threading.Lock()
+
+    @property
+    def con(self):
+        if self._con is None:
+            import sql_features
+            self._con = sql_features.connect(self.path)
+        return self._con
+
+    def has_table(self, table):
+        with self.lock:
+            return bool(self.con.execute(
+                "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?", [table]
+            ).fetchone()[0])
+
+    def read_table(self, table, schema, key="id", page_size=PAGE_SIZE, filters=()):
+        columns = list(schema)
+        conditions, values = [], []
+        for operator, column, value in filters:
+            conditions.append(f"{column} {SQL_OPERATORS[operator]} ?")
+            values.append(value)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self.lock:
+            df = self.con.execute(
+                f"SELECT {', '.join(columns)} FROM {table} {where} ORDER BY {key}", values
+            ).df()
+        # Dates come back as strings, as they do from PostgREST
+        if "date" in schema and pd.api.types.is_datetime64_any_dtype(df["date"]):
+            df["date"] = df["date"].dt.strftime("%Y-%m-%d")
+        df = df.astype(schema)
+        for column, dtype in schema.items():
+            if dtype == "object":
+                df[column] = df[column].where(df[column].notna(), None)
+        return df
+
+    def replace_table(self, table, frame):
+        with self.lock:
+            import sql_features
+            sql_features.replace_table(self.con, table, frame)
+
+    def insert(self, table, rows):
+        """Append rows, numbering them after the current max id like a serial column"""
+        frame = pd.DataFrame.from_records(rows)
+        if not self.has_table(table):
+            if "id" not in frame.columns:
+                frame.insert(0, "id", range(1, len(frame) + 1))
+            self.replace_table(table, frame)
+            return
+
+        with self.lock:
+            if "id" not in frame.columns:
+                next_id = self.con.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").fetchone()[0]
+                frame.insert(0, "id", range(next_id, next_id + len(frame)))
+            self.con.register("incoming", frame)
+            try:
+                self.con.execute(f"INSERT INTO {table} BY NAME SELECT * FROM incoming")
+            finally:
+                self.con.unregister("incoming")
+
+    def upsert(self, table, rows):
+        """Update the given columns of rows whose id exists and insert the rest"""
+        frame = pd.DataFrame.from_records(rows)
+        assignments = ", ".join(f"{column} = incoming.{column}" for column in frame.columns if column != "id")
+        with self.lock:
+            self.con.register("incoming", frame)
+            try:
+                self.con.execute(f"UPDATE {table} SET {assignments} FROM incoming WHERE {table}.id = incoming.id")
+                self.con.execute(
+                    f"INSERT INTO {table} BY NAME SELECT * FROM incoming "
+                    f"WHERE id NOT IN (SELECT id FROM {table})"
+                )
+            finally:
+                self.con.unregister("incoming")
+
+    def rpc(self, func_name, params):
+        """First row of the local version of an RPC function, or None"""
+        with self.lock:
+            import sql_features
+            df = self.con.execute(sql_features.LOCAL_RPCS[func_name], params).df()
+        if df.empty:
+            return None
+        return {column: (None if pd.isna(value) else value.item() if hasattr(value, "item") else value)
+                for column, value in df.to_dict("records")[0].items()}
+
+def copy_tables(source, destination, tables=TABLE_SCHEMAS):
+    """Snapshot whole tables from one source into a local one"""
+    for table, schema in tables.items():
+        frame = source.read_table(table, schema)
+        destination.replace_table(table, frame)
+        print(f"Copied {len(frame)} rows of {table}")
+
+_sources = {}
+
+def data_source(kind=None, path=None):
+    """The configured data source, shared per process.
+
+    DATA_SOURCE=local selects the embedded database at LOCAL_DB_PATH
+    (default models/nba_local.duckdb); anything else uses Supabase.
+    """
+    kind = kind or os.getenv("DATA_SOURCE", "supabase")
+    if kind == "local":
+        import sql_features
+        path = path or os.getenv("LOCAL_DB_PATH", sql_features.DEFAULT_DB_PATH)
+    key = (kind, path if kind == "local" else None)
+    if key not in _sources:
+        _sources[key] = LocalSource(path) if kind == "local" else SupabaseSource()
+    return _sources[key]
+
+# Pull a local copy of the Supabase tables for offline runs
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else None
+    copy_tables(data_source("supabase"), data_source("local", path))
@@ -1,14 +1,11 @@
 import pandas as pd
-from supabase import create_client, Client
-import os
 from dotenv import load_dotenv
+from data_access import data_source
 
 load_dotenv()
 
-# Initialize Supabase
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Supabase, or the local database when DATA_SOURCE=local
+source = data_source()
 
 def clean_data(raw_csv_path):
     df = pd.read_csv(raw_csv_path)
@@ -31,14 +28,14 @@ def clean_data(raw_csv_path):
 def upload_to_supabase(clean_df):
     # Batch insert teams first
     teams = clean_df[['team_id', 'team_name']].drop_duplicates()
-    supabase.table('teams').insert(teams.to_dict('records')).execute()
+    source.insert('teams', teams.to_dict('records'))
     
     # Insert games
     games = clean_df[[
         'date', 'season', 'home_team_id', 'away_team_id', 
         'HOME_TEAM_PTS', 'AWAY_TEAM_PTS', 'home_win'
     ]]
-    supabase.table('games').insert(games.to_dict('records')).execute()
+    source.insert('games', games.to_dict('records'))
 
 if __name__ == "__main__":
     raw_data = "nba_games_raw.csv"
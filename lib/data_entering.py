@@ -1,20 +1,16 @@
-import os
 from dotenv import load_dotenv
 import requests
 import pandas as pd
-from supabase import create_client, Client
+from rpc_cache import notify_data_changed
+from data_access import data_source
+from table_reader import GAMES_SCHEMA
+import team_registry
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Supabase configuration
-SUPABASE_URL = os.getenv("NEXT_PUBLIC_SUPABASE_URL")
-SUPABASE_KEY = os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
-
-if not SUPABASE_URL or not SUPABASE_KEY:
-    raise ValueError("Supabase URL or Key is missing. Check your environment variables.")
-
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Supabase, or the local database when DATA_SOURCE=local
+source = data_source()
 
 
 HEADERS = {
@@ -22,6 +18,10 @@ HEADERS = {
     "Referer": "https://www.nba.com/"
 }
 
+# Game ids start with the season type: 001 preseason, 002 regular season.
+# The gcode holds the team codes, so it cannot mark preseason (PHI, PHX, POR)
+PRESEASON_GAME_ID = "001"
+
 def fetch_nba_schedule(year=2024):
     url = f"https://data.nba.com/data/10s/v2015/json/mobile_teams/nba/{year}/league/00_full_schedule.json"
     response = requests.get(url, headers=HEADERS)
@@ -29,15 +29,15 @@ def fetch_nba_schedule(year=2024):
 
 def parse_schedule(raw_json, season):
     games = []
-    season_start_date = f"{season}-10-24"  # Hardcoded season start
+    season_start_date = f"{season}1024"  # Hardcoded season start, as YYYYMMDD
     
     for month in raw_json["lscd"]:
         for game in month["mscd"]["g"]:
             game_date = game["gcode"].split("/")[0]  # Extract date (YYYYMMDD)
             
             # Skip if before season start or preseason game
-            if (pd.to_datetime(game_date) < pd.to_datetime(season_start_date)) or \
-               ("P" in game.get("gcode", "")):
+            preseason = game["gid"].startswith(PRESEASON_GAME_ID)
+            if game_date < season_start_date or preseason:
                 continue
                 
             games.append({
@@ -47,67 +47,130 @@ def parse_schedule(raw_json, season):
                 "away_team": game["v"]["ta"],
                 "home_score": game["h"].get("s", None),
                 "away_score": game["v"].get("s", None),
-                "season_type": "Preseason" if "P" in game.get("gcode", "") else "Regular Season"
+                "season_type": "Preseason" if preseason else "Regular Season"
             })
     
     return pd.DataFrame(games)
 
 def get_team_ids():
-    """Fetch team abbreviations and IDs from the Supabase 'teams' table."""
-    response = supabase.table("teams").select("id, abbreviation").execute()
+    """Map team abbreviations to Supabase IDs using the shared team registry."""
+    return team_registry.load(source).abbreviation_to_id()
 
-    # Check if the response contains data
-    if not response.data:
-        raise Exception(f"Error fetching teams: {response}")
+GAME_KEY = ["date", "home_team_id", "away_team_id"]
+GAME_VALUES = ["season", "home_score", "away_score", "home_win"]
 
-    # Return a dictionary mapping abbreviations to IDs
-    return {team["abbreviation"]: team["id"] for team in response.data}
+def prepare_games(games_df, team_ids, season):
+    """Vectorized team-id mapping and score/home_win derivation.
 
-def insert_games_to_db(games_df, team_ids, season):
-    """Insert games into the Supabase 'games' table."""
+    Returns the rows ready for the 'games' table plus the number of
+    preseason games and games with an unmapped team that were skipped.
+    """
     season_start = pd.to_datetime(f"{season}-10-24")
-    for _, game in games_df.iterrows():
-        game_date = pd.to_datetime(game["date"])
-        if game_date < season_start:
-            print(f"Skipping preseason game {game['game_id']} on {game['date']}")
-            continue
-
-        home_team_id = team_ids.get(game["home_team"])
-        away_team_id = team_ids.get(game["away_team"])
-
-        if not home_team_id or not away_team_id:
-            print(f"Skipping game {game['game_id']} due to missing team ID.")
-            print(f"Home team: {game['home_team']} (ID: {home_team_id}), Away team: {game['away_team']} (ID: {away_team_id})")
+    preseason = pd.to_datetime(games_df["date"]) < season_start
+    
+    games = pd.DataFrame({
+        "season": season,
+        "date": games_df["date"],
+        "home_team_id": games_df["home_team"].map(team_ids).astype("Int64"),
+        "away_team_id": games_df["away_team"].map(team_ids).astype("Int64"),
+        "home_score": pd.to_numeric(games_df["home_score"], errors="coerce").astype("Int64"),
+        "away_score": pd.to_numeric(games_df["away_score"], errors="coerce").astype("Int64"),
+    })
+    games["home_win"] = (games["home_score"] > games["away_score"]).astype("boolean")
+    
+    unmapped = ~preseason & games[["home_team_id", "away_team_id"]].isna().any(axis=1)
+    for _, game in games_df[unmapped].iterrows():
+        print(f"Skipping game {game['game_id']} due to missing team ID.")
+        print(f"Home team: {game['home_team']}, Away team: {game['away_team']}")
+    
+    games = games[~preseason & ~unmapped].drop_duplicates(subset=GAME_KEY)
+    games[["home_team_id", "away_team_id"]] = games[["home_team_id", "away_team_id"]].astype("int64")
+    return games.reset_index(drop=True), int(preseason.sum()), int(unmapped.sum())
+
+def fetch_existing_games(dates):
+    """Existing rows for the given dates, one per natural game key"""
+    existing = source.read_table(
+        "games", GAMES_SCHEMA,
+        filters=[("gte", "date", min(dates)), ("lte", "date", max(dates))]
+    )
+    return existing.drop_duplicates(subset=GAME_KEY)
+
+def to_records(df):
+    """DataFrame rows as JSON-safe dicts with None for missing values"""
+    return [
+        {column: (None if pd.isna(value) else value.item() if hasattr(value, "item") else value)
+         for column, value in row.items()}
+        for row in df.astype(object).to_dict("records")
+    ]
+
+def insert_games_to_db(games_df, team_ids, season, batch_size=500):
+    """Load games into the 'games' table in idempotent batches.
+
+    Games are matched to existing rows on (date, home_team_id, away_team_id):
+    new games are inserted in one request per batch, games whose scores
+    changed are upserted by id, and unchanged games are skipped, so
+    re-running a season does not duplicate rows.
+    """
+    games, preseason, unmapped = prepare_games(games_df, team_ids, season)
+    print(f"Skipping {preseason} preseason games and {unmapped} games with unmapped teams")
+    totals = {"inserted": 0, "updated": 0, "skipped": 0}
+    
+    for start in range(0, len(games), batch_size):
+        try:
+            counts = write_games_batch(games.iloc[start:start + batch_size])
+        except Exception as e:
+            print(f"Error writing batch starting at game {start}: {e}")
             continue
+        for key, value in counts.items():
+            totals[key] += value
+        print(f"Batch {start // batch_size + 1}: {counts['inserted']} inserted, "
+              f"{counts['updated']} updated, {counts['skipped']} skipped")
+    
+    return totals
 
-        # Ensure scores are integers or None
-        home_score = int(game["home_score"]) if pd.notna(game["home_score"]) else None
-        away_score = int(game["away_score"]) if pd.notna(game["away_score"]) else None
-
-        home_win = None
-        if home_score is not None and away_score is not None:
-            home_win = home_score > away_score
-
-        # Insert game into the database
-        try:
-            response = supabase.table("games").insert({
-                "season": season,
-                "date": game["date"],
-                "home_team_id": home_team_id,
-                "away_team_id": away_team_id,
-                "home_score": home_score,
-                "away_score": away_score,
-                "home_win": home_win
-            }).execute()
-
-            # Check if the insertion was successful
-            if not response.data:
-                print(f"Error inserting game {game['game_id']}: {response}")
-            else:
-                print(f"Inserted game {game['game_id']} successfully.")
+def write_games_batch(batch):
+    """Insert the new games of a prepared batch and upsert the changed ones.
 
-        except Exception as e:
-            print(f"Error inserting game {game['game_id']}: {e}")
+    Returns the inserted/updated/skipped counts.
+    """
+    existing = fetch_existing_games(batch["date"].tolist())
+    
+    merged = batch.merge(
+        existing[["id"] + GAME_KEY + GAME_VALUES], on=GAME_KEY,
+        how="left", suffixes=("", "_existing")
+    )
+    is_new = merged["id"].isna()
+    changed = pd.Series(False, index=merged.index)
+    for column in GAME_VALUES:
+        new, old = merged[column], merged[f"{column}_existing"]
+        changed |= ~((new == old).fillna(False) | (new.isna() & old.isna()))
+    is_update = ~is_new & changed
+    
+    if is_new.any():
+        source.insert("games", to_records(merged.loc[is_new, GAME_KEY + GAME_VALUES]))
+    if is_update.any():
+        updates = merged.loc[is_update, ["id"] + GAME_KEY + GAME_VALUES].astype({"id": "int64"})
+        source.upsert("games", to_records(updates))
+    
+    return {
+        "inserted": int(is_new.sum()),
+        "updated": int(is_update.sum()),
+        "skipped": int((~is_new & ~changed).sum()),
+    }
+
+def after_ingestion():
+    """Expire cached team stats in running prediction workers and refresh the
+    team registry they adopt from disk.
+
+    The prediction matrix is left stale, so predictions fall back to live
+    inference until `python lib/prediction_matrix.py` rebuilds it (or
+    ingest_stream.py runs with --build-matrix) on the serving host.
+    """
+    notify_data_changed()
+    try:
+        team_registry.load(source, refresh=True)
+    except Exception as e:
+        print(f"Error refreshing team registry: {str(e)}")
 
 # Main execution
 if __name__ == "__main__":
@@ -119,4 +182,7 @@ if __name__ == "__main__":
     team_ids = get_team_ids()
 
     # Insert games into the database
-    insert_games_to_db(games_df, team_ids, season)
\ No newline at end of file
+    totals = insert_games_to_db(games_df, team_ids, season)
+    print(f"Done: {totals['inserted']} inserted, {totals['updated']} updated, {totals['skipped']} skipped")
+
+    after_ingestion()
\ No newline at end of file
@@ -0,0 +1,101 @@
+import os
+import sys
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from tracing import span
+
+DATASET_ROOT = "models/datasets"
+
+GAME_FIELDS = [
+    ("id", pa.int64()),
+    ("season", pa.int64()),
+    ("date", pa.timestamp("ms")),
+    ("home_team_id", pa.int64()),
+    ("away_team_id", pa.int64()),
+    ("home_score", pa.int64()),
+    ("away_score", pa.int64()),
+    ("home_win", pa.bool_()),
+]
+
+def float_fields(names):
+    return [(name, pa.float64()) for name in names]
+
+# Explicit schema of every dataset the feature scripts produce
+SCHEMAS = {
+    "nba_ml_ready": pa.schema(GAME_FIELDS + [("season_type", pa.string())] + float_fields([
+        "home_avg_pts", "away_avg_pts_scored", "away_avg_pts_allowed",
+        "home_win_pct", "home_net_rating", "home_rest_days",
+    ])),
+    "nba_ml_ready2": pa.schema(GAME_FIELDS + [("season_type", pa.string())] + float_fields([
+        "home_avg_pts", "away_avg_pts_allowed",
+        "home_off_rating", "home_def_rating", "home_net_rating", "home_pace",
+        "home_ts_pct", "home_efg_pct", "home_plus_minus",
+        "away_off_rating", "away_def_rating", "away_net_rating", "away_pace",
+        "away_ts_pct", "away_efg_pct", "away_plus_minus",
+        "home_ortg_adj_avg_pts", "away_drtg_adj_pts_allowed",
+        "home_net_rating_plusminus", "away_net_rating_plusminus",
+        "ortg_matchup_diff", "drtg_matchup_diff", "net_rating_diff",
+        "home_rest_days", "home_rest_adj",
+        "h2h_netrtg_last_5", "h2h_netrtg_last_10", "h2h_netrtg_last_20",
+    ])),
+    "nba_ml_ready_with_spread": pa.schema(GAME_FIELDS + float_fields([
+        "home_pace", "away_pace", "home_avg_pts", "away_avg_pts_allowed",
+        "home_net_rating", "away_net_rating", "point_spread",
+        "home_avg_margin", "away_avg_margin", "home_margin_std", "away_margin_std",
+        "pace_diff", "home_rest_days", "rest_adjusted_spread", "h2h_avg_spread",
+    ])),
+}
+
+PARTITIONING = ds.partitioning(pa.schema([("season", pa.int64())]), flavor="hive")
+
+def dataset_path(name, root=DATASET_ROOT):
+    return os.path.join(root, name)
+
+def to_table(df, name):
+    """Convert a feature frame to Arrow using the dataset's explicit schema"""
+    schema = SCHEMAS[name]
+    df = df.assign(date=pd.to_datetime(df["date"]))
+    return pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+
+def write_dataset(df, name, root=DATASET_ROOT):
+    """Write a feature frame as Parquet, one directory per season.
+
+    Only the seasons present in df are replaced, so appending a night of
+    games rewrites a single partition.
+    """
+    with span(f"write_dataset:{name}"):
+        ds.write_dataset(
+            to_table(df, name),
+            dataset_path(name, root),
+            format="parquet",
+            partitioning=PARTITIONING,
+            existing_data_behavior="delete_matching",
+            basename_template="part-{i}.parquet",
+        )
+
+def append_to_dataset(df, name, root=DATASET_ROOT):
+    """Add rows to a dataset, rewriting only the seasons they belong to"""
+    seasons = sorted(df["season"].unique().tolist())
+    if os.path.isdir(dataset_path(name, root)):
+        existing = read_dataset(name, seasons=seasons, root=root)
+        df = pd.concat([existing, df.assign(date=pd.to_datetime(df["date"]))], ignore_index=True)
+    write_dataset(df, name, root)
+
+def read_dataset(name, columns=None, seasons=None, root=DATASET_ROOT):
+    """Load a feature dataset, reading only the requested columns and seasons.
+
+    Season selection prunes whole partitions and column selection skips the
+    other Parquet column chunks, so neither is read from disk.
+    """
+    dataset = ds.dataset(dataset_path(name, root), format="parquet", partitioning=PARTITIONING)
+    season_filter = ds.field("season").isin(seasons) if seasons else None
+    return dataset.to_table(columns=columns, filter=season_filter).to_pandas()
+
+if __name__ == "__main__":
+    # Convert the existing CSV exports into season-partitioned datasets
+    names = sys.argv[1:] or list(SCHEMAS)
+    for name in names:
+        df = pd.read_csv(f"models/{name}.csv")
+        write_dataset(df, name)
+        print(f"Wrote {len(df)} rows to {dataset_path(name)}")
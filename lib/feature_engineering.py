@@ -1,59 +1,237 @@
 import pandas as pd
-from supabase import create_client
+from datetime import timedelta
 import os
+import sys
+import json
 from dotenv import load_dotenv
+from rolling import RollingSpec, rolling_features
+from shared_features import shared_features
+from data_access import data_source
+from table_reader import read_games
+from feature_datasets import write_dataset, append_to_dataset
+import tracing
+from tracing import span
 
 load_dotenv()
 
-# Connect to Supabase
-supabase = create_client(os.getenv("NEXT_PUBLIC_SUPABASE_URL"), os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY"))
+# Supabase, or the local database when DATA_SOURCE=local
+source = data_source()
+
+OUTPUT_PATH = "models/nba_ml_ready.csv"
+CHECKPOINT_PATH = "models/nba_ml_ready.checkpoint.json"
+
+# Rolling windows kept per team in the checkpoint (largest window per column)
+HOME_WINDOWS = {"home_score": 10, "away_score": 10, "home_win": 82}
+AWAY_WINDOWS = {"away_score": 10, "home_score": 10}
+
+# Unscored games dated before the watermark (postponed) are rechecked for
+# a score this many days, then given up on
+PENDING_DAYS = 30
 
 # Fetch raw games data
-def fetch_games():
-    response = supabase.table("games").select("*").execute()
-    return pd.DataFrame(response.data)
+def fetch_games(since=None):
+    return read_games(source, since=since)
 
 # Calculate rolling averages and other features
-def engineer_features(df):
+def engineer_features(df, shared=None):
+    if shared is None:
+        shared = shared_features(df)
     df = df.sort_values(by=["home_team_id", "date"])
     
-    # 1. Rolling stats for home team (offense)
-    df["home_avg_pts"] = df.groupby("home_team_id")["home_score"].transform(
-        lambda x: x.rolling(10, min_periods=3).mean()
-    )
-
-    # 1. Add away team offensive stats
-    df["away_avg_pts_scored"] = df.groupby("away_team_id")["away_score"].transform(
-        lambda x: x.rolling(10, min_periods=3).mean()
-    )
-    
-    # 2. Rolling stats for away team (defense)
-    df["away_avg_pts_allowed"] = df.groupby("away_team_id")["home_score"].transform(
-        lambda x: x.rolling(10, min_periods=3).mean()  # Home score = away team's points allowed
-    )
+    home = rolling_features(df, "home_team_id", [
+        # 3. Win % (last 82 games)
+        RollingSpec("home_win_pct", "home_win", 82, min_periods=6),
+        # Net rating inputs (last 10 games)
+        RollingSpec("home_pts_last_10", "home_score", 10, min_periods=5),
+        RollingSpec("home_pts_allowed_last_10", "away_score", 10, min_periods=5),
+    ])
+    # Away windows run over each away team's games in date order
+    away = rolling_features(df.sort_values(by=["away_team_id", "date"]), "away_team_id", [
+        # 1. Add away team offensive stats
+        RollingSpec("away_avg_pts_scored", "away_score", 10, min_periods=3),
+    ])
     
-    # 3. Win % (last 82 games)
-    df["home_win_pct"] = df.groupby("home_team_id")["home_win"].transform(
-        lambda x: x.rolling(82, min_periods=6).mean()
-    )
+    # 1. Rolling stats for home team (offense) and 2. away team (defense)
+    df["home_avg_pts"] = shared["home_avg_pts"]
+    df["away_avg_pts_scored"] = away["away_avg_pts_scored"]
+    df["away_avg_pts_allowed"] = shared["away_avg_pts_allowed"]
+    df["home_win_pct"] = home["home_win_pct"]
 
     ## Net rating (last 10 games)
-    df["home_net_rating"] = (df.groupby("home_team_id")["home_score"].transform(
-        lambda x: x.rolling(10, min_periods=5).mean()
-    ) / df.groupby("home_team_id")["away_score"].transform(
-        lambda x: x.rolling(10, min_periods=5).mean()
-    ))  # Ratio is more stable than difference
+    df["home_net_rating"] = (
+        home["home_pts_last_10"] / home["home_pts_allowed_last_10"]
+    )  # Ratio is more stable than difference
     
     # 4. Rest days
     df["date"] = pd.to_datetime(df["date"])
-    df["home_rest_days"] = df.groupby("home_team_id")["date"].diff().dt.days.clip(1, 10)
+    df["home_rest_days"] = shared["home_days_since_last_game"].clip(1, 10)
     
-    # Filter out preseason and incomplete records
-    df = df.dropna(subset=["home_avg_pts", "away_avg_pts_allowed"])
+    # Filter out preseason and incomplete records; unfinished games are
+    # added by an incremental run once they have a score
+    df = df.dropna(subset=["home_avg_pts", "away_avg_pts_allowed", "home_score", "away_score"])
     
     return df
 
+def completed_games(df):
+    return df[df["home_score"].notna() & df["away_score"].notna()]
+
+def build_checkpoint(df):
+    """Per-team rolling state after every completed game in df.
+
+    Besides the watermark (the date of the newest completed game) the
+    checkpoint tracks the ids of games already processed on and after the
+    oldest date still being checked, and the unscored games dated before
+    the watermark, so an incremental run neither repeats nor misses games.
+    """
+    df = df.assign(date=lambda x: pd.to_datetime(x["date"]))
+    completed = completed_games(df).sort_values(by="date")
+    watermark = completed["date"].max()
+    unfinished = df[~df.index.isin(completed.index) & (df["date"] <= watermark)]
+    checkpoint = {
+        "watermark": watermark.strftime("%Y-%m-%d"),
+        "processed": dict(zip(completed["id"].astype(str), completed["date"].dt.strftime("%Y-%m-%d"))),
+        "pending": dict(zip(unfinished["id"].astype(str), unfinished["date"].dt.strftime("%Y-%m-%d"))),
+        "home": {},
+        "away": {},
+    }
+    trim_checkpoint(checkpoint)
+    df = completed
+    
+    for side, windows in [("home", HOME_WINDOWS), ("away", AWAY_WINDOWS)]:
+        for team_id, games in df.groupby(f"{side}_team_id"):
+            team_state = {
+                column: games[column].astype(float).tail(window).tolist()
+                for column, window in windows.items()
+            }
+            team_state["last_date"] = games["date"].iloc[-1].strftime("%Y-%m-%d")
+            checkpoint[side][str(team_id)] = team_state
+    
+    return checkpoint
+
+def fetch_floor(checkpoint):
+    """Oldest game date an incremental run still has to look at"""
+    return min([checkpoint["watermark"], *checkpoint.get("pending", {}).values()])
+
+def trim_checkpoint(checkpoint):
+    """Give up on long-unscored games and forget processed ids older than any date still fetched"""
+    cutoff = (pd.Timestamp(checkpoint["watermark"]) - timedelta(days=PENDING_DAYS)).strftime("%Y-%m-%d")
+    checkpoint["pending"] = {
+        game_id: date for game_id, date in checkpoint.get("pending", {}).items() if date >= cutoff
+    }
+    floor = fetch_floor(checkpoint)
+    checkpoint["processed"] = {
+        game_id: date for game_id, date in checkpoint.get("processed", {}).items() if date >= floor
+    }
+
+def window_mean(values, window, min_periods):
+    values = values[-window:]
+    return sum(values) / len(values) if len(values) >= min_periods else float("nan")
+
+def engineer_features_incremental(df, checkpoint):
+    """Feature rows for games after the checkpoint, advancing it in place.
+
+    Produces the same values engineer_features() gives these games on a
+    full rebuild, using only the per-team windows kept in the checkpoint.
+    """
+    df = df.assign(date=lambda x: pd.to_datetime(x["date"])).sort_values(by=["date", "home_team_id"])
+    empty = {column: [] for column in {**HOME_WINDOWS, **AWAY_WINDOWS}}
+    rows = []
+    
+    for game in df.to_dict("records"):
+        home = checkpoint["home"].setdefault(str(game["home_team_id"]), {**empty, "last_date": None})
+        away = checkpoint["away"].setdefault(str(game["away_team_id"]), {**empty, "last_date": None})
+        
+        # The rolling windows include the current game, as in the full rebuild
+        for state, windows in [(home, HOME_WINDOWS), (away, AWAY_WINDOWS)]:
+            for column, window in windows.items():
+                state[column] = (state[column] + [float(game[column])])[-window:]
+        
+        home_rest_days = float("nan")
+        if home["last_date"]:
+            home_rest_days = min(max((game["date"] - pd.Timestamp(home["last_date"])).days, 1), 10)
+        home["last_date"] = away["last_date"] = game["date"].strftime("%Y-%m-%d")
+        
+        rows.append({
+            **game,
+            "home_avg_pts": window_mean(home["home_score"], 10, 3),
+            "away_avg_pts_scored": window_mean(away["away_score"], 10, 3),
+            "away_avg_pts_allowed": window_mean(away["home_score"], 10, 3),
+            "home_win_pct": window_mean(home["home_win"], 82, 6),
+            "home_net_rating": window_mean(home["home_score"], 10, 5) / window_mean(home["away_score"], 10, 5),
+            "home_rest_days": float(home_rest_days),
+        })
+    
+    if len(df):
+        checkpoint["watermark"] = max(checkpoint["watermark"], df["date"].max().strftime("%Y-%m-%d"))
+        processed = checkpoint.setdefault("processed", {})
+        pending = checkpoint.setdefault("pending", {})
+        for game_id, date in zip(df["id"].astype(str), df["date"].dt.strftime("%Y-%m-%d")):
+            processed[game_id] = date
+            pending.pop(game_id, None)
+    
+    engineered = pd.DataFrame(rows, columns=list(df.columns) + [
+        "home_avg_pts", "away_avg_pts_scored", "away_avg_pts_allowed",
+        "home_win_pct", "home_net_rating", "home_rest_days",
+    ])
+    return engineered.dropna(subset=["home_avg_pts", "away_avg_pts_allowed"])
+
+def run_full():
+    df = fetch_games()
+    with span("engineer"):
+        engineered_df = engineer_features(df)
+    with span("write_csv"):
+        engineered_df.to_csv(OUTPUT_PATH, index=False)
+    write_dataset(engineered_df, "nba_ml_ready")
+    save_checkpoint(build_checkpoint(df))
+
+def run_incremental():
+    with open(CHECKPOINT_PATH) as f:
+        checkpoint = json.load(f)
+    
+    # Fetch from the oldest date still open, including that day, and skip
+    # games already processed. Checkpoints from before processed ids were
+    # tracked cover their whole watermark day.
+    floor = fetch_floor(checkpoint)
+    if "processed" in checkpoint:
+        since = (pd.Timestamp(floor) - timedelta(days=1)).strftime("%Y-%m-%d")
+    else:
+        since = floor
+    games = fetch_games(since=since).assign(date=lambda x: pd.to_datetime(x["date"]).dt.strftime("%Y-%m-%d"))
+    games = games[~games["id"].astype(str).isin(checkpoint.get("processed", {}))]
+    new_games = completed_games(games)
+    
+    # Unscored games older than the newest scored one were postponed; check
+    # them again next time instead of holding everything else back
+    newest = max([checkpoint["watermark"], *new_games["date"]])
+    unfinished = games[~games.index.isin(new_games.index) & (games["date"] < newest)]
+    checkpoint.setdefault("pending", {}).update(zip(unfinished["id"].astype(str), unfinished["date"]))
+    if new_games.empty:
+        trim_checkpoint(checkpoint)
+        save_checkpoint(checkpoint)
+        print("No new games since", floor)
+        return
+    
+    with span("engineer"):
+        engineered_df = engineer_features_incremental(new_games, checkpoint)
+    with span("write_csv"):
+        columns = pd.read_csv(OUTPUT_PATH, nrows=0).columns
+        engineered_df.reindex(columns=columns).to_csv(OUTPUT_PATH, mode="a", header=False, index=False)
+    if not engineered_df.empty:
+        append_to_dataset(engineered_df, "nba_ml_ready")
+    trim_checkpoint(checkpoint)
+    save_checkpoint(checkpoint)
+    print(f"Appended {len(engineered_df)} rows; watermark now {checkpoint['watermark']}")
+
+def save_checkpoint(checkpoint):
+    tmp_path = CHECKPOINT_PATH + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, CHECKPOINT_PATH)
+
 # Save to Supabase or CSV
-df = fetch_games()
-engineered_df = engineer_features(df)
-engineered_df.to_csv("models/nba_ml_ready.csv", index=False)
\ No newline at end of file
+if __name__ == "__main__":
+    tracing.trace_script("feature_engineering")
+    if "--incremental" in sys.argv and os.path.exists(CHECKPOINT_PATH):
+        run_incremental()
+    else:
+        run_full()
@@ -1,27 +1,27 @@
 import pandas as pd
-from supabase import create_client
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
+from rolling import RollingSpec, rolling_features
+from data_access import data_source
+from table_reader import read_games, read_advanced_stats
+from shared_features import shared_features
+from feature_datasets import write_dataset
+import tracing
+from tracing import span
 
 load_dotenv()
 
-# Connect to Supabase
-supabase = create_client(os.getenv("NEXT_PUBLIC_SUPABASE_URL"), os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY"))
+# Supabase, or the local database when DATA_SOURCE=local
+source = data_source()
 
 def fetch_advanced_stats():
     """Fetch the latest advanced stats for all teams"""
-    response = supabase.table("team_advanced_stats").select("*").execute()
-    return pd.DataFrame(response.data)
+    return read_advanced_stats(source)
 
 def fetch_games():
     """Fetch raw games data with additional stats needed for spread prediction"""
-    response = supabase.table("games").select("""
-        *, 
-        home_team:home_team_id(name, abbreviation),
-        away_team:away_team_id(name, abbreviation)
-    """).execute()
-    df = pd.DataFrame(response.data)
+    df = read_games(source)
     
     # Drop the season_type column if it exists
     if "season_type" in df.columns:
@@ -29,10 +29,14 @@ def fetch_games():
     
     return df
 
-def engineer_features(df):
+def engineer_features(df, adv_stats=None, shared=None):
+    if adv_stats is None:
+        adv_stats = fetch_advanced_stats()
+    if shared is None:
+        shared = shared_features(df)
+    
     # Convert date and sort
     df["date"] = pd.to_datetime(df["date"])
-    adv_stats = fetch_advanced_stats()
     df = df.sort_values(by=["home_team_id", "date"])
     
     # Add a season column to games_df based on the game date
@@ -52,62 +56,54 @@ def engineer_features(df):
             how='left'
         )
         
-        # Add pace from advanced stats
-        df[f"{team_type}_pace"] = merged["pace"]
+        # Add pace from advanced stats (the left merge keeps df's row order)
+        df[f"{team_type}_pace"] = merged["pace"].to_numpy()
+
+    # Actual point spread (target variable), needed by the rolling margins below
+    point_spread = df["home_score"] - df["away_score"]
+    rolling_input = df.assign(point_spread=point_spread)
+    home = rolling_features(rolling_input, "home_team_id", [
+        RollingSpec("home_pts_last_10", "home_score", 10),
+        RollingSpec("home_pts_allowed_last_10", "away_score", 10),
+        RollingSpec("home_avg_margin", "point_spread", 10, min_periods=3),
+        RollingSpec("home_margin_std", "point_spread", 20, min_periods=5, stat="std"),
+    ])
+    # Away windows run over each away team's games in date order
+    away = rolling_features(rolling_input.sort_values(by=["away_team_id", "date"]), "away_team_id", [
+        RollingSpec("away_pts_last_10", "away_score", 10),
+        RollingSpec("away_pts_allowed_last_10", "home_score", 10),
+        RollingSpec("away_avg_margin", "point_spread", 10, min_periods=3),
+        RollingSpec("away_margin_std", "point_spread", 20, min_periods=5, stat="std"),
+    ])
 
     # 1. Base features (shared with win probability model)
-    df["home_avg_pts"] = df.groupby("home_team_id")["home_score"].transform(
-        lambda x: x.rolling(10, min_periods=3).mean()
-    )
-    df["away_avg_pts_allowed"] = df.groupby("away_team_id")["home_score"].transform(
-        lambda x: x.rolling(10, min_periods=3).mean()
-    )
-    df["home_net_rating"] = (
-        df.groupby("home_team_id")["home_score"].transform(
-            lambda x: x.rolling(10).mean()
-        ) - df.groupby("home_team_id")["away_score"].transform(
-            lambda x: x.rolling(10).mean()
-        )
-    )
-    df["away_net_rating"] = (
-        df.groupby("away_team_id")["away_score"].transform(
-            lambda x: x.rolling(10).mean()
-        ) - df.groupby("away_team_id")["home_score"].transform(
-            lambda x: x.rolling(10).mean()
-        )
-    )
+    df["home_avg_pts"] = shared["home_avg_pts"]
+    df["away_avg_pts_allowed"] = shared["away_avg_pts_allowed"]
+    df["home_net_rating"] = home["home_pts_last_10"] - home["home_pts_allowed_last_10"]
+    df["away_net_rating"] = away["away_pts_last_10"] - away["away_pts_allowed_last_10"]
 
     # 2. Spread-specific features
-    # Actual point spread (target variable)
-    df["point_spread"] = df["home_score"] - df["away_score"]
+    df["point_spread"] = point_spread
     
     # Rolling average margins
-    df["home_avg_margin"] = df.groupby("home_team_id")["point_spread"].transform(
-        lambda x: x.rolling(10, min_periods=3).mean()
-    )
-    df["away_avg_margin"] = df.groupby("away_team_id")["point_spread"].transform(
-        lambda x: x.rolling(10, min_periods=3).mean()
-    )
+    df["home_avg_margin"] = home["home_avg_margin"]
+    df["away_avg_margin"] = away["away_avg_margin"]
     
     # Volatility metrics
-    df["home_margin_std"] = df.groupby("home_team_id")["point_spread"].transform(
-        lambda x: x.rolling(20, min_periods=5).std()
-    )
-    df["away_margin_std"] = df.groupby("away_team_id")["point_spread"].transform(
-        lambda x: x.rolling(20, min_periods=5).std()
-    )
+    df["home_margin_std"] = home["home_margin_std"]
+    df["away_margin_std"] = away["away_margin_std"]
     
     # Pace-adjusted features
     df["pace_diff"] = df["home_pace"] - df["away_pace"]
     
     # 3. Rest days with spread adjustment
-    df["home_rest_days"] = df.groupby("home_team_id")["date"].diff().dt.days.fillna(7)
+    df["home_rest_days"] = shared["home_days_since_last_game"].fillna(7)
     df["rest_adjusted_spread"] = df["home_avg_margin"] * (1 + (df["home_rest_days"] - 3) * 0.02)
     
     # 4. Head-to-head spread history
-    df["h2h_avg_spread"] = df.groupby(["home_team_id", "away_team_id"])["point_spread"].transform(
-        lambda x: x.shift().rolling(5, min_periods=2).mean()
-    )
+    df["h2h_avg_spread"] = rolling_features(df, ["home_team_id", "away_team_id"], [
+        RollingSpec("h2h_avg_spread", "point_spread", 5, min_periods=2, shift=1),
+    ])["h2h_avg_spread"]
     
     # Handle missing values
     print("Missing values per column before handling:")
@@ -138,11 +134,16 @@ def engineer_features(df):
 
 # Main execution
 if __name__ == "__main__":
+    tracing.trace_script("feature_engineering_regressor")
     games_df = fetch_games()
-    engineered_df = engineer_features(games_df)
+    adv_stats = fetch_advanced_stats()
+    with span("engineer"):
+        engineered_df = engineer_features(games_df, adv_stats)
     
     # Save for both models
-    engineered_df.to_csv("models/nba_ml_ready_with_spread.csv", index=False)
+    with span("write_csv"):
+        engineered_df.to_csv("models/nba_ml_ready_with_spread.csv", index=False)
+    write_dataset(engineered_df, "nba_ml_ready_with_spread")
     
     # Optional: Save back to Supabase
     # supabase.table("ml_ready_games").upsert(engineered_df.to_dict('records')).execute()
\ No newline at end of file
@@ -1,51 +1,52 @@
 import pandas as pd
-from supabase import create_client
 import os
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
+from rolling import RollingSpec, rolling_features, group_mean
+from data_access import data_source
+from table_reader import read_games, read_advanced_stats
+from shared_features import shared_features
+from feature_datasets import write_dataset
+import tracing
+from tracing import span
 
 load_dotenv()
 
-# Connect to Supabase
-supabase = create_client(os.getenv("NEXT_PUBLIC_SUPABASE_URL"), os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY"))
+# Supabase, or the local database when DATA_SOURCE=local
+source = data_source()
 
 def fetch_advanced_stats():
     """Fetch the latest advanced stats for all teams"""
-    response = supabase.table("team_advanced_stats").select("*").execute()
-    return pd.DataFrame(response.data)
+    return read_advanced_stats(source)
 
 def fetch_games():
     """Fetch raw games data"""
-    response = supabase.table("games").select("*").execute()
-    return pd.DataFrame(response.data)
+    return read_games(source)
 
-def engineer_features(games_df):
+def engineer_features(games_df, adv_stats=None, shared=None):
     # Fetch advanced stats
-    adv_stats = fetch_advanced_stats()
-    adv_stats['date'] = pd.to_datetime(adv_stats['season'].astype(str) + '-04-15')  # Mid-season date
+    if adv_stats is None:
+        adv_stats = fetch_advanced_stats()
+    if shared is None:
+        shared = shared_features(games_df)
+    adv_stats = adv_stats.assign(date=pd.to_datetime(adv_stats['season'].astype(str) + '-04-15'))  # Mid-season date
     
     # Convert game dates
     games_df = games_df.sort_values(by=["home_team_id", "date"])
     games_df["date"] = pd.to_datetime(games_df["date"])
 
-    # Calculate rolling averages for home and away teams
-    games_df["home_avg_pts"] = (
-        games_df.groupby("home_team_id")["home_score"]
-        .transform(lambda x: x.rolling(10, min_periods=3).mean())
-    )
-
-    games_df["away_avg_pts_allowed"] = (
-        games_df.groupby("away_team_id")["home_score"]
-        .transform(lambda x: x.rolling(10, min_periods=3).mean())
-    )
+    # Rolling averages for home and away teams
+    games_df["home_avg_pts"] = shared["home_avg_pts"]
+    games_df["away_avg_pts_allowed"] = shared["away_avg_pts_allowed"]
     
     # 1. Add advanced stats as features
+    games_df = games_df.sort_values('date', kind='stable')
     for team_type in ['home', 'away']:
         team_col = f"{team_type}_team_id"
         
         # Merge with the most recent advanced stats before each game
         merged = pd.merge_asof(
-            games_df.sort_values('date'),
+            games_df,
             adv_stats.sort_values('date'),
             left_on='date',
             right_on='date',
@@ -54,25 +55,29 @@ def engineer_features(games_df):
             direction='backward'
         )
         
-        # Add advanced stats with prefix
+        # Add advanced stats with prefix (merge_asof keeps games_df's row order)
         for stat in ['off_rating', 'def_rating', 'net_rating', 'pace', 'ts_pct', 'efg_pct', 'plus_minus']:
-            games_df[f"{team_type}_{stat}"] = merged[stat]
+            games_df[f"{team_type}_{stat}"] = merged[stat].to_numpy()
     
     # 2. Enhanced rolling averages (weighted by advanced stats)
     games_df = games_df.sort_values(by=["home_team_id", "date"])
     
     # Offensive rating weighted rolling average
-    games_df["home_ortg_adj_avg_pts"] = (
-        games_df.groupby("home_team_id", group_keys=False)
-        .apply(lambda x: x["home_score"].rolling(10, min_periods=6).mean() * 
-            (x["home_off_rating"] / x["home_off_rating"].mean()), include_groups=False)
+    home_pts = rolling_features(games_df, "home_team_id", [
+        RollingSpec("pts", "home_score", 10, min_periods=6),
+    ])["pts"]
+    games_df["home_ortg_adj_avg_pts"] = home_pts * (
+        games_df["home_off_rating"] /
+        group_mean(games_df, "home_team_id", "home_off_rating")
     )
 
     # Defensive rating weighted points allowed
-    games_df["away_drtg_adj_pts_allowed"] = (
-        games_df.groupby("away_team_id", group_keys=False)
-        .apply(lambda x: x["home_score"].rolling(10, min_periods=6).mean() * 
-            (x["away_def_rating"] / x["away_def_rating"].mean()), include_groups=False)
+    away_pts_allowed = rolling_features(games_df, "away_team_id", [
+        RollingSpec("pts_allowed", "home_score", 10, min_periods=6),
+    ])["pts_allowed"]
+    games_df["away_drtg_adj_pts_allowed"] = away_pts_allowed * (
+        games_df["away_def_rating"] /
+        group_mean(games_df, "away_team_id", "away_def_rating")
     )
     
     # 3. Advanced win metrics
@@ -85,16 +90,20 @@ def engineer_features(games_df):
     games_df["net_rating_diff"] = games_df["home_net_rating"] - games_df["away_net_rating"]
     
     # 5. Rest days with pace adjustment
-    games_df["home_rest_days"] = games_df.groupby("home_team_id")["date"].diff().dt.days.fillna(7)
+    games_df["home_rest_days"] = shared["home_days_since_last_game"].fillna(7)
     games_df["home_rest_adj"] = games_df["home_rest_days"] * (games_df["home_pace"] / games_df["home_pace"].mean())
     
     # 6. Head-to-head with advanced stats
+    h2h = rolling_features(
+        games_df.assign(netrtg_diff=games_df["home_net_rating"] - games_df["away_net_rating"]),
+        ["home_team_id", "away_team_id"],
+        [
+            RollingSpec(f"h2h_netrtg_last_{window}", "netrtg_diff", window, min_periods=3, shift=1)
+            for window in [5, 10, 20]
+        ]
+    )
     for window in [5, 10, 20]:
-        games_df[f"h2h_netrtg_last_{window}"] = (
-            games_df.groupby(["home_team_id", "away_team_id"], group_keys=False)
-            .apply(lambda x: (x["home_net_rating"] - x["away_net_rating"])
-                  .shift().rolling(window, min_periods=3).mean(), include_groups=False)
-        )
+        games_df[f"h2h_netrtg_last_{window}"] = h2h[f"h2h_netrtg_last_{window}"]
     
     # Filter out preseason and incomplete records
     required_cols = ['home_avg_pts', 'away_avg_pts_allowed', 
@@ -105,11 +114,16 @@ def engineer_features(games_df):
 
 # Main execution
 if __name__ == "__main__":
+    tracing.trace_script("feature_engineering_xgboost")
     games_df = fetch_games()
-    engineered_df = engineer_features(games_df)
+    adv_stats = fetch_advanced_stats()
+    with span("engineer"):
+        engineered_df = engineer_features(games_df, adv_stats)
     
     # Save to CSV
-    engineered_df.to_csv("models/nba_ml_ready2.csv", index=False)
+    with span("write_csv"):
+        engineered_df.to_csv("models/nba_ml_ready2.csv", index=False)
+    write_dataset(engineered_df, "nba_ml_ready2")
     
     # Optional: Save back to Supabase
     # supabase.table("ml_ready_games").upsert(engineered_df.to_dict('records')).execute()
\ No newline at end of file
@@ -0,0 +1,143 @@
+import os
+import sys
+import hashlib
+import pandas as pd
+from dotenv import load_dotenv
+from data_access import data_source
+from table_reader import read_games, read_advanced_stats
+from shared_features import shared_features
+from feature_datasets import write_dataset
+import feature_engineering
+import feature_engineering_xgboost
+import feature_engineering_regressor
+import tracing
+from tracing import span
+
+load_dotenv()
+
+# Supabase, or the local database when DATA_SOURCE=local
+source = data_source()
+
+CACHE_DIR = "models/pipeline_cache"
+
+# Bump a stage's version when its code changes so old cached outputs are ignored
+STAGE_VERSIONS = {
+    "shared": 1,
+    "nba_ml_ready": 1,
+    "nba_ml_ready2": 1,
+    "nba_ml_ready_with_spread": 1,
+}
+
+OUTPUTS = {
+    "nba_ml_ready": "models/nba_ml_ready.csv",
+    "nba_ml_ready2": "models/nba_ml_ready2.csv",
+    "nba_ml_ready_with_spread": "models/nba_ml_ready_with_spread.csv",
+}
+
+def content_hash(*frames):
+    """Hash of the values, index and columns of every input frame"""
+    digest = hashlib.sha256()
+    for frame in frames:
+        digest.update(repr(list(zip(frame.columns, frame.dtypes.astype(str)))).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+class FeaturePipeline:
+    """Builds every model's feature set from one read of the source tables.
+
+    Stages run in order games -> advanced_stats -> shared -> per-model features.
+    Each derived stage is cached on disk under its name, version and the
+    content hash of its inputs, so a rerun on unchanged data loads the
+    pickled output instead of recomputing it.
+    """
+    def __init__(self, data=None, cache_dir=CACHE_DIR, games=None, adv_stats=None):
+        self.data = data if data is not None else source
+        self.cache_dir = cache_dir
+        self.results = {}
+        if games is not None:
+            self.results["games"] = games
+        if adv_stats is not None:
+            self.results["advanced_stats"] = adv_stats
+
+    def run_stage(self, name, fn, *inputs):
+        if name in self.results:
+            return self.results[name]
+
+        key = f"{name}-v{STAGE_VERSIONS[name]}-{content_hash(*inputs)}"
+        path = os.path.join(self.cache_dir, key + ".pkl")
+        if os.path.exists(path):
+            print(f"{name}: cached")
+            with span(f"load_cached:{name}"):
+                result = pd.read_pickle(path)
+        else:
+            print(f"{name}: computing")
+            # Stages get copies so nothing they mutate leaks into shared inputs
+            with span(f"engineer:{name}"):
+                result = fn(*[frame.copy() for frame in inputs])
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = path + ".tmp"
+            result.to_pickle(tmp_path)
+            os.replace(tmp_path, path)
+
+        self.results[name] = result
+        return result
+
+    def games(self):
+        if "games" not in self.results:
+            self.results["games"] = read_games(self.data)
+        return self.results["games"]
+
+    def advanced_stats(self):
+        if "advanced_stats" not in self.results:
+            self.results["advanced_stats"] = read_advanced_stats(self.data)
+        return self.results["advanced_stats"]
+
+    def shared(self):
+        return self.run_stage("shared", shared_features, self.games())
+
+    def win_features(self):
+        return self.run_stage(
+            "nba_ml_ready",
+            lambda games, shared: feature_engineering.engineer_features(games, shared=shared),
+            self.games(), self.shared(),
+        )
+
+    def xgboost_features(self):
+        return self.run_stage(
+            "nba_ml_ready2",
+            lambda games, adv, shared: feature_engineering_xgboost.engineer_features(games, adv, shared),
+            self.games(), self.advanced_stats(), self.shared(),
+        )
+
+    def spread_features(self):
+        games = self.games().drop(columns=["season_type"], errors="ignore")
+        return self.run_stage(
+            "nba_ml_ready_with_spread",
+            lambda games, adv, shared: feature_engineering_regressor.engineer_features(games, adv, shared),
+            games, self.advanced_stats(), self.shared(),
+        )
+
+    def run(self, names=None):
+        stages = {
+            "nba_ml_ready": self.win_features,
+            "nba_ml_ready2": self.xgboost_features,
+            "nba_ml_ready_with_spread": self.spread_features,
+        }
+        return {name: stages[name]() for name in (names or stages)}
+
+def write_outputs(pipeline, results):
+    for name, df in results.items():
+        with span(f"write_csv:{name}"):
+            df.to_csv(OUTPUTS[name], index=False)
+        write_dataset(df, name)
+
+    # Keep incremental win-model runs in step with the full rebuild
+    if "nba_ml_ready" in results:
+        feature_engineering.save_checkpoint(feature_engineering.build_checkpoint(pipeline.games()))
+
+# Build every feature set (or the ones named on the command line)
+if __name__ == "__main__":
+    tracing.trace_script("feature_pipeline")
+    names = [arg for arg in sys.argv[1:] if arg in OUTPUTS] or None
+    pipeline = FeaturePipeline()
+    write_outputs(pipeline, pipeline.run(names))
@@ -0,0 +1,213 @@
+import os
+import sys
+import json
+import glob
+import hashlib
+from datetime import datetime, timezone
+import numpy as np
+from dotenv import load_dotenv
+from fetch_planner import FetchPlan
+from rpc_cache import data_version
+
+load_dotenv()
+
+DEFAULT_STORE_DIR = "models/feature_store"
+MANIFEST_NAME = "manifest.json"
+
+# Snapshot tables: the RPC each one mirrors and the parameters that index it
+TEAM_TABLES = {
+    "home_team_stats": ("get_home_team_stats", ("team_id",)),
+    "away_team_stats": ("get_away_team_stats", ("team_id",)),
+    "advanced_team_stats": ("get_advanced_team_stats", ("team_id_input",)),
+}
+MATCHUP_TABLES = {
+    "head_to_head_stats": ("get_head_to_head_stats", ("home_team_id", "away_team_id")),
+    "advanced_head_to_head_stats": (
+        "get_advanced_head_to_head_stats",
+        ("home_team_id_input", "away_team_id_input"),
+    ),
+}
+RPC_TABLES = {
+    func_name: (table, param_names)
+    for table, (func_name, param_names) in {**TEAM_TABLES, **MATCHUP_TABLES}.items()
+}
+
+def max_age_hours():
+    return float(os.getenv("FEATURE_STORE_MAX_AGE_HOURS", "24"))
+
+class FeatureStore:
+    """Read-only, memory-mapped snapshot of the per-team and head-to-head RPC rows.
+
+    Team tables are (n_teams, n_fields) float arrays and matchup tables are
+    (n_teams, n_teams, n_fields); a row that is entirely NaN means the RPC
+    returned no data for it.
+    """
+
+    def __init__(self, store_dir, manifest):
+        self.store_dir = store_dir
+        self.manifest = manifest
+        self.version = manifest["version"]
+        self.data_version = manifest.get("data_version")
+        self.built_at = datetime.fromisoformat(manifest["built_at"])
+        self.team_index = {team_id: i for i, team_id in enumerate(manifest["team_ids"])}
+        self.fields = manifest["fields"]
+        self.arrays = {
+            table: np.load(os.path.join(store_dir, filename), mmap_mode="r")
+            for table, filename in manifest["files"].items()
+        }
+
+    @classmethod
+    def load(cls, store_dir=DEFAULT_STORE_DIR):
+        """Open the current snapshot, or return None if none has been built"""
+        try:
+            with open(os.path.join(store_dir, MANIFEST_NAME)) as f:
+                manifest = json.load(f)
+            return cls(store_dir, manifest)
+        except FileNotFoundError:
+            return None
+
+    def age_hours(self):
+        return (datetime.now(timezone.utc) - self.built_at).total_seconds() / 3600
+
+    def is_stale(self):
+        """Too old, or built before the last ingestion bumped the data epoch"""
+        return self.age_hours() > max_age_hours() or self.data_version != data_version()
+
+    def lookup(self, func_name, params):
+        """Answer an RPC call from the snapshot.
+
+        Returns the row the RPC would return (None if it had no data) and
+        raises KeyError for calls or teams the snapshot does not cover.
+        """
+        table, param_names = RPC_TABLES[func_name]
+        index = tuple(self.team_index[params[name]] for name in param_names)
+        values = self.arrays[table][index]
+        if np.isnan(values).all():
+            return None
+        return {
+            field: None if np.isnan(value) else float(value)
+            for field, value in zip(self.fields[table], values)
+        }
+
+_current = {}
+
+def current_store(store_dir=DEFAULT_STORE_DIR):
+    """Return the snapshot in store_dir if it exists and is fresh, else None.
+
+    The open store is reused until the manifest changes on disk, so a
+    long-lived worker picks up rebuilt snapshots for the cost of one stat().
+    A snapshot from before the latest ingestion is not fresh, so predictions
+    go back to the RPCs until the store is rebuilt.
+    """
+    try:
+        mtime = os.stat(os.path.join(store_dir, MANIFEST_NAME)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    
+    cached = _current.get(store_dir)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, FeatureStore.load(store_dir))
+        _current[store_dir] = cached
+    
+    store = cached[1]
+    return store if store is not None and not store.is_stale() else None
+
+def numeric_fields(rows):
+    """Numeric column names across RPC rows, in first-seen order"""
+    fields = {}
+    for row in rows:
+        for key, value in (row or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                fields.setdefault(key, None)
+    return list(fields)
+
+def to_array(rows, fields, shape):
+    values = np.full(shape + (len(fields),), np.nan)
+    for index, row in rows.items():
+        if row:
+            values[index] = [
+                row[field] if isinstance(row.get(field), (int, float)) else np.nan
+                for field in fields
+            ]
+    return values
+
+def build_feature_store(team_ids, fetch, store_dir=DEFAULT_STORE_DIR):
+    """Snapshot every team row and the full head-to-head matrix to disk.
+
+    `fetch(func_name, params)` is the RPC call used to populate the store.
+    Arrays are written under version-stamped names and the manifest is
+    replaced last, so readers holding the previous snapshot keep working.
+    """
+    team_ids = sorted(team_ids)
+    n_teams = len(team_ids)
+    # Read before fetching, so ingestion during the build leaves it stale
+    stamp = data_version()
+    
+    # Plan every team and matchup call, then run them concurrently
+    plan = FetchPlan(fetch)
+    keys = {}
+    for table, (func_name, param_names) in TEAM_TABLES.items():
+        for i, team_id in enumerate(team_ids):
+            keys[table, (i,)] = plan.add(func_name, dict(zip(param_names, (team_id,))))
+    for table, (func_name, param_names) in MATCHUP_TABLES.items():
+        for i, home_team_id in enumerate(team_ids):
+            for j, away_team_id in enumerate(team_ids):
+                if i != j:
+                    keys[table, (i, j)] = plan.add(
+                        func_name, dict(zip(param_names, (home_team_id, away_team_id)))
+                    )
+    results = plan.execute()
+    
+    arrays, fields = {}, {}
+    for table in {**TEAM_TABLES, **MATCHUP_TABLES}:
+        rows = {index: results[key] for (name, index), key in keys.items() if name == table}
+        shape = (n_teams,) if table in TEAM_TABLES else (n_teams, n_teams)
+        fields[table] = numeric_fields(rows.values())
+        arrays[table] = to_array(rows, fields[table], shape)
+    
+    digest = hashlib.sha256()
+    for table in sorted(arrays):
+        digest.update(table.encode())
+        digest.update(arrays[table].tobytes())
+    built_at = datetime.now(timezone.utc)
+    version = f"{built_at:%Y%m%d%H%M%S}-{digest.hexdigest()[:12]}"
+    
+    os.makedirs(store_dir, exist_ok=True)
+    files = {}
+    for table, values in arrays.items():
+        files[table] = f"{table}-{version}.npy"
+        np.save(os.path.join(store_dir, files[table]), values)
+    
+    manifest = {
+        "version": version,
+        "built_at": built_at.isoformat(),
+        "data_version": stamp,
+        "team_ids": team_ids,
+        "fields": fields,
+        "files": files,
+    }
+    tmp_path = os.path.join(store_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(store_dir, MANIFEST_NAME))
+    
+    # Drop arrays from older snapshots; open mmaps keep their data on POSIX
+    current = set(files.values())
+    for path in glob.glob(os.path.join(store_dir, "*.npy")):
+        if os.path.basename(path) not in current:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+    
+    return manifest
+
+if __name__ == "__main__":
+    from data_access import data_source
+    import team_registry
+
+    source = data_source()
+    store_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_STORE_DIR
+    team_ids = team_registry.load(source).ids
+    manifest = build_feature_store(team_ids, source.rpc, store_dir)
+    print(f"Built feature store {manifest['version']} for {len(manifest['team_ids'])} teams in {store_dir}")
@@ -0,0 +1,61 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Shared pool so a long-lived worker does not pay thread start-up per request
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="rpc-fetch")
+
+def rpc_key(func_name, params):
+    """Hashable identity of an RPC call, used to drop duplicate calls"""
+    return func_name, tuple(sorted(params.items()))
+
+class FetchPlan:
+    """Request-scoped set of RPC calls that are deduplicated and run concurrently.
+
+    Callers add every call a prediction needs, execute the plan once, then
+    read the rows back by key. `fetch` is called as fetch(func_name, params)
+    and should return a single row (or None).
+    """
+
+    def __init__(self, fetch):
+        self.fetch = fetch
+        self.calls = {}
+        self.results = {}
+
+    def add(self, func_name, params):
+        key = rpc_key(func_name, params)
+        self.calls.setdefault(key, (func_name, params))
+        return key
+
+    def resolve_from(self, lookup):
+        """Answer calls from a local source before going to the network.
+
+        `lookup(func_name, params)` returns the row or raises KeyError for
+        calls it cannot answer; those stay pending for execute().
+        """
+        for key, (func_name, params) in self.calls.items():
+            if key in self.results:
+                continue
+            try:
+                self.results[key] = lookup(func_name, params)
+            except KeyError:
+                pass
+
+    def execute(self):
+        pending = [key for key in self.calls if key not in self.results]
+        futures = {
+            key: _executor.submit(self._fetch_one, *self.calls[key])
+            for key in pending
+        }
+        for key, future in futures.items():
+            self.results[key] = future.result()
+        return self.results
+
+    def get(self, func_name, params):
+        return self.results.get(rpc_key(func_name, params))
+
+    def _fetch_one(self, func_name, params):
+        try:
+            return self.fetch(func_name, params)
+        except Exception as e:
+            print(f"Error fetching {func_name}: {str(e)}", file=sys.stderr)
+            return None
@@ -1,45 +1,21 @@
 import pandas as pd
 from nba_api.stats.endpoints import TeamDashboardByGeneralSplits, LeagueDashTeamStats
 from nba_api.stats.static import teams
-from supabase import create_client, Client
 import os
 from dotenv import load_dotenv
-import time
+from concurrent.futures import ThreadPoolExecutor
+from rate_limit import TokenBucket, call_with_retries
+from rpc_cache import notify_data_changed
+from data_access import data_source
+import team_registry
 
 # Load environment variables
 load_dotenv()
-SUPABASE_URL = os.getenv("NEXT_PUBLIC_SUPABASE_URL")
-SUPABASE_KEY = os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+source = data_source()
 
 def get_team_id_mapping():
     """Map NBA API team IDs to our Supabase team IDs"""
-    response = supabase.table("teams").select("id, name, abbreviation").execute()
-    teams_data = response.data
-    
-    nba_teams = teams.get_teams()
-    team_map = {}
-    
-    for nba_team in nba_teams:
-        # Try to match by abbreviation first
-        supabase_team = next(
-            (t for t in teams_data if t['abbreviation'] == nba_team['abbreviation']),
-            None
-        )
-        
-        # If no match by abbreviation, try by name
-        if not supabase_team:
-            supabase_team = next(
-                (t for t in teams_data if t['name'].lower() == nba_team['full_name'].lower()),
-                None
-            )
-        
-        if supabase_team:
-            team_map[nba_team['id']] = supabase_team['id']
-        else:
-            print(f"Warning: Could not match NBA team {nba_team['full_name']} ({nba_team['abbreviation']})")
-    
-    return team_map
+    return team_registry.load(source).nba_to_supabase()
 
 def calculate_advanced_stats(row):
     """Calculate advanced metrics from basic stats"""
@@ -62,93 +38,127 @@ def calculate_advanced_stats(row):
         'tov_pct': tov_pct
     }
 
-def fetch_and_store_team_stats():
-    team_map = get_team_id_mapping()
-    seasons = [2024, 2023, 2022, 2021, 2020]
+SEASONS = [2024, 2023, 2022, 2021, 2020]
+
+def season_string(season):
+    return f"{season}-{str(season+1)[-2:]}"
 
-    for season in seasons:
-        season_str = f"{season}-{str(season+1)[-2:]}"
-        print(f"\nProcessing season: {season_str}")
+def fetch_league_advanced_stats(season_str):
+    """League-wide advanced metrics for one season from LeagueDashTeamStats"""
+    return LeagueDashTeamStats(
+        season=season_str,
+        season_type_all_star="Regular Season",
+        measure_type_detailed_defense="Advanced",  # Fetch advanced metrics
+        per_mode_detailed="Per100Possessions"  # Normalize stats per 100 possessions
+    ).get_data_frames()[0]
+
+def fetch_team_dashboard(team_id, season_str):
+    """Basic team stats for one season from TeamDashboardByGeneralSplits"""
+    dashboard = TeamDashboardByGeneralSplits(
+        team_id=team_id,
+        season=season_str,
+        season_type_all_star="Regular Season"
+    )
+    return dashboard.get_data_frames()[0].iloc[0]
+
+def build_team_stats_row(supabase_team_id, season, team_stats, team_advanced):
+    """Combine dashboard and league stats into a team_advanced_stats row"""
+    # Calculate additional metrics
+    calculated_stats = calculate_advanced_stats(team_stats)
+    
+    return {
+        'team_id': supabase_team_id,
+        'season': season,
+        # From LeagueDashTeamStats
+        'off_rating': team_advanced.get('OFF_RATING'),
+        'def_rating': team_advanced.get('DEF_RATING'),
+        'net_rating': team_advanced.get('NET_RATING'),
+        'pace': team_advanced.get('PACE'),
+        # Calculated metrics
+        'ts_pct': calculated_stats['ts_pct'],
+        'efg_pct': calculated_stats['efg_pct'],
+        'ast_ratio': calculated_stats['ast_ratio'],
+        'tov_pct': calculated_stats['tov_pct'],
+        # From TeamDashboard
+        'oreb_pct': team_stats['OREB'] / (team_stats['OREB'] + team_stats['DREB']) if (team_stats['OREB'] + team_stats['DREB']) > 0 else 0,
+        'dreb_pct': team_stats['DREB'] / (team_stats['OREB'] + team_stats['DREB']) if (team_stats['OREB'] + team_stats['DREB']) > 0 else 0,
+        # Additional valuable metrics
+        'win_pct': team_stats['W_PCT'],
+        'plus_minus': team_stats['PLUS_MINUS'],
+        'fg_pct': team_stats['FG_PCT'],
+        'fg3_pct': team_stats['FG3_PCT'],
+        'ft_pct': team_stats['FT_PCT'],
+        'ast_to_tov': team_stats['AST'] / team_stats['TOV'] if team_stats['TOV'] > 0 else 0,
+        'stl_pct': team_stats['STL'] / team_stats['MIN'] * 100 if team_stats['MIN'] > 0 else 0,
+        'blk_pct': team_stats['BLK'] / team_stats['MIN'] * 100 if team_stats['MIN'] > 0 else 0
+    }
+
+def fetch_team_stats_rows(team_map, seasons=SEASONS, rate=2.0, max_workers=4,
+                          fetch_league=fetch_league_advanced_stats,
+                          fetch_dashboard=fetch_team_dashboard, retry_delay=1.0):
+    """Fetch team_advanced_stats rows for every mapped team and season.
+
+    Upstream calls share one token bucket (`rate` requests per second) and
+    at most `max_workers` run at once; failed calls are retried with
+    jittered backoff starting at `retry_delay` seconds. The fetch functions
+    can be swapped for a fake endpoint, as tests/fake_nba_endpoint.py does.
+    """
+    bucket = TokenBucket(rate)
+    nba_teams = []
+    for team in teams.get_teams():
+        if team['id'] in team_map:
+            nba_teams.append(team)
+        else:
+            print(f"Skipping unmapped team: {team['full_name']}")
+    
+    rows = []
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # Fetch league-wide advanced stats for every season first
+        league_futures = {
+            season: pool.submit(
+                call_with_retries, fetch_league, season_string(season),
+                bucket=bucket, base_delay=retry_delay, label=f"league stats {season_string(season)}"
+            )
+            for season in seasons
+        }
+        league_stats = {}
+        for season, future in league_futures.items():
+            try:
+                league_stats[season] = future.result()
+            except Exception as e:
+                print(f"Error fetching league data for season {season_string(season)}: {str(e)}")
         
-        # Fetch advanced stats from LeagueDashTeamStats
+        team_futures = {
+            (season, team['id']): (team, pool.submit(
+                call_with_retries, fetch_dashboard, team['id'], season_string(season),
+                bucket=bucket, base_delay=retry_delay, label=f"{team['full_name']} {season_string(season)}"
+            ))
+            for season in league_stats
+            for team in nba_teams
+        }
+        for (season, team_id), (team, future) in team_futures.items():
+            try:
+                advanced_stats = league_stats[season]
+                team_advanced = advanced_stats[advanced_stats['TEAM_ID'] == team_id].iloc[0]
+                rows.append(build_team_stats_row(team_map[team_id], season, future.result(), team_advanced))
+            except Exception as e:
+                print(f"Error processing {team['full_name']} ({season_string(season)}): {str(e)}")
+    
+    return rows
+
+def fetch_and_store_team_stats(seasons=SEASONS, rate=2.0, max_workers=4, batch_size=100):
+    team_map = get_team_id_mapping()
+    rows = fetch_team_stats_rows(team_map, seasons, rate, max_workers)
+    
+    # Insert into the data source in batches
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
         try:
-            print("Fetching league-wide advanced stats...")
-            advanced_stats = LeagueDashTeamStats(
-                season=season_str,
-                season_type_all_star="Regular Season",
-                measure_type_detailed_defense="Advanced",  # Fetch advanced metrics
-                per_mode_detailed="Per100Possessions"  # Normalize stats per 100 possessions
-            ).get_data_frames()[0]
-            
-            # Fetch basic stats from TeamDashboardByGeneralSplits
-            nba_teams = teams.get_teams()
-            
-            for team in nba_teams:
-                team_id = team['id']
-                team_name = team['full_name']
-                
-                if team_id not in team_map:
-                    print(f"Skipping unmapped team: {team_name}")
-                    continue
-                
-                try:
-                    print(f"Processing {team_name}...")
-                    
-                    # Get team dashboard data
-                    dashboard = TeamDashboardByGeneralSplits(
-                        team_id=team_id,
-                        season=season_str,
-                        season_type_all_star="Regular Season"
-                    )
-                    team_stats = dashboard.get_data_frames()[0].iloc[0]
-                    
-                    # Get advanced stats for this team from league data
-                    team_advanced = advanced_stats[advanced_stats['TEAM_ID'] == team_id].iloc[0]
-                    
-                    # Calculate additional metrics
-                    calculated_stats = calculate_advanced_stats(team_stats)
-                    
-                    # Prepare data for Supabase
-                    data = {
-                        'team_id': team_map[team_id],
-                        'season': season,
-                        # From LeagueDashTeamStats
-                        'off_rating': team_advanced.get('OFF_RATING'),
-                        'def_rating': team_advanced.get('DEF_RATING'),
-                        'net_rating': team_advanced.get('NET_RATING'),
-                        'pace': team_advanced.get('PACE'),
-                        # Calculated metrics
-                        'ts_pct': calculated_stats['ts_pct'],
-                        'efg_pct': calculated_stats['efg_pct'],
-                        'ast_ratio': calculated_stats['ast_ratio'],
-                        'tov_pct': calculated_stats['tov_pct'],
-                        # From TeamDashboard
-                        'oreb_pct': team_stats['OREB'] / (team_stats['OREB'] + team_stats['DREB']) if (team_stats['OREB'] + team_stats['DREB']) > 0 else 0,
-                        'dreb_pct': team_stats['DREB'] / (team_stats['OREB'] + team_stats['DREB']) if (team_stats['OREB'] + team_stats['DREB']) > 0 else 0,
-                        # Additional valuable metrics
-                        'win_pct': team_stats['W_PCT'],
-                        'plus_minus': team_stats['PLUS_MINUS'],
-                        'fg_pct': team_stats['FG_PCT'],
-                        'fg3_pct': team_stats['FG3_PCT'],
-                        'ft_pct': team_stats['FT_PCT'],
-                        'ast_to_tov': team_stats['AST'] / team_stats['TOV'] if team_stats['TOV'] > 0 else 0,
-                        'stl_pct': team_stats['STL'] / team_stats['MIN'] * 100 if team_stats['MIN'] > 0 else 0,
-                        'blk_pct': team_stats['BLK'] / team_stats['MIN'] * 100 if team_stats['MIN'] > 0 else 0
-                    }
-                    
-                    # Insert into Supabase
-                    supabase.table("team_advanced_stats").insert(data).execute()
-                    print(f"Inserted data for {team_name}")
-                    
-                    time.sleep(0.5)  # Rate limiting
-                    
-                except Exception as e:
-                    print(f"Error processing {team_name}: {str(e)}")
-                    continue
-                    
+            source.insert("team_advanced_stats", batch)
+            print(f"Inserted {len(batch)} team seasons")
         except Exception as e:
-            print(f"Error fetching league data for season {season_str}: {str(e)}")
-            continue
+            print(f"Error inserting team stats batch starting at row {start}: {str(e)}")
 
 if __name__ == "__main__":
-    fetch_and_store_team_stats()
\ No newline at end of file
+    fetch_and_store_team_stats()
+    notify_data_changed()
\ No newline at end of file
@@ -0,0 +1,201 @@
+import re
+import json
+import time
+import codecs
+import asyncio
+import argparse
+import requests
+import pandas as pd
+from data_entering import HEADERS, PRESEASON_GAME_ID, prepare_games, write_games_batch, get_team_ids, after_ingestion
+
+SCHEDULE_URL = "https://data.nba.com/data/10s/v2015/json/mobile_teams/nba/{season}/league/00_full_schedule.json"
+
+CHUNK_BYTES = 64 * 1024
+BATCH_SIZE = 500
+
+# Items each queue holds before its producer waits; with one season's
+# schedule a few MB, memory stays at a few chunks and batches in flight
+QUEUE_SIZE = 8
+
+# Opens each month's list of games in the schedule JSON
+GAMES_ARRAY = re.compile(r'"g"\s*:\s*\[')
+
+END = object()
+
+class ScheduleParser:
+    """Incremental parser yielding the game objects of a schedule as its bytes arrive.
+
+    Only the "g" arrays of the schedule are decoded, one game object at a
+    time, so the whole document is never held in memory or parsed at once.
+    """
+
+    def __init__(self):
+        self.text = codecs.getincrementaldecoder("utf-8")()
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.in_games = False
+
+    def feed(self, data):
+        """Add a chunk of bytes and return the games it completed"""
+        buffer = self.buffer + self.text.decode(data)
+        games, pos = [], 0
+        while True:
+            if not self.in_games:
+                match = GAMES_ARRAY.search(buffer, pos)
+                if match is None:
+                    # Keep a tail in case the next marker is split across chunks
+                    pos = max(pos, len(buffer) - 16)
+                    break
+                pos, self.in_games = match.end(), True
+
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                break
+            if buffer[pos] == "]":
+                pos, self.in_games = pos + 1, False
+                continue
+            try:
+                game, pos = self.decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # The object continues in the next chunk
+                break
+            games.append(game)
+        self.buffer = buffer[pos:]
+        return games
+
+    def close(self):
+        if self.in_games:
+            raise ValueError("Schedule ended inside a list of games")
+
+def schedule_frame(games, season):
+    """Regular season games of a parsed batch in parse_schedule's columns, plus
+    the number of preseason games dropped; dates are filtered as arrays"""
+    gcode = pd.Series([game.get("gcode", "") for game in games], dtype="object")
+    game_id = pd.Series([game["gid"] for game in games], dtype="object")
+    game_date = gcode.str.split("/").str[0]
+    dates = pd.to_datetime(game_date, format="%Y%m%d")
+    preseason = (dates < pd.Timestamp(f"{season}-10-24")) | game_id.str.startswith(PRESEASON_GAME_ID)
+
+    frame = pd.DataFrame({
+        "game_id": game_id,
+        "date": dates.dt.strftime("%Y-%m-%d"),
+        "home_team": [game["h"]["ta"] for game in games],
+        "away_team": [game["v"]["ta"] for game in games],
+        "home_score": [game["h"].get("s", None) for game in games],
+        "away_score": [game["v"].get("s", None) for game in games],
+        "season_type": "Regular Season",
+    })
+    return frame[~preseason].reset_index(drop=True), int(preseason.sum())
+
+async def download(schedules, out, chunk_bytes=CHUNK_BYTES):
+    """Stream each (season, URL or local path) schedule as (season, chunk) items,
+    with (season, None) marking the end of a season"""
+    for season, location in schedules:
+        remote = location.startswith(("http://", "https://"))
+        if remote:
+            response = await asyncio.to_thread(requests.get, location, headers=HEADERS, stream=True, timeout=60)
+            chunks = response.iter_content(chunk_bytes)
+            read = lambda: next(chunks, b"")
+        else:
+            f = open(location, "rb")
+            read = lambda: f.read(chunk_bytes)
+        try:
+            if remote:
+                response.raise_for_status()
+            while chunk := await asyncio.to_thread(read):
+                await out.put((season, chunk))
+        finally:
+            if remote:
+                response.close()
+            else:
+                f.close()
+        await out.put((season, None))
+    await out.put(END)
+
+async def parse(chunks, out, batch_size=BATCH_SIZE):
+    """Decode games as chunks arrive and pass them on in (season, games) batches"""
+    parser, batch = ScheduleParser(), []
+    while (item := await chunks.get()) is not END:
+        season, chunk = item
+        if chunk is None:
+            parser.close()
+            if batch:
+                await out.put((season, batch))
+            parser, batch = ScheduleParser(), []
+            continue
+        for game in parser.feed(chunk):
+            batch.append(game)
+            if len(batch) >= batch_size:
+                await out.put((season, batch))
+                batch = []
+    await out.put(END)
+
+async def transform(batches, out, team_ids, stats):
+    """Filter out preseason games and map teams to ids, a batch at a time"""
+    while (item := await batches.get()) is not END:
+        season, games = item
+        frame, preseason = schedule_frame(games, season)
+        prepared, _, unmapped = prepare_games(frame, team_ids, season)
+        stats["games"] += len(games)
+        stats["preseason"] += preseason
+        stats["unmapped"] += unmapped
+        if len(prepared):
+            await out.put(prepared)
+    await out.put(END)
+
+async def write(batches, totals):
+    """Write prepared batches in order; the database client blocks, so each
+    write runs in a thread while the earlier stages keep going"""
+    number = 0
+    while (batch := await batches.get()) is not END:
+        number += 1
+        try:
+            counts = await asyncio.to_thread(write_games_batch, batch)
+        except Exception as e:
+            print(f"Error writing batch {number}: {e}")
+            continue
+        for key, value in counts.items():
+            totals[key] += value
+        print(f"Batch {number}: {counts['inserted']} inserted, "
+              f"{counts['updated']} updated, {counts['skipped']} skipped")
+
+async def ingest(schedules, team_ids, batch_size=BATCH_SIZE, queue_size=QUEUE_SIZE):
+    """Run download, parse, transform and write as concurrent stages joined by
+    bounded queues, so a full queue holds back the stages feeding it"""
+    chunks, games, prepared = (asyncio.Queue(maxsize=queue_size) for _ in range(3))
+    totals = {"inserted": 0, "updated": 0, "skipped": 0}
+    stats = {"games": 0, "preseason": 0, "unmapped": 0}
+    async with asyncio.TaskGroup() as stages:
+        stages.create_task(download(schedules, chunks))
+        stages.create_task(parse(chunks, games, batch_size))
+        stages.create_task(transform(games, prepared, team_ids, stats))
+        stages.create_task(write(prepared, totals))
+    return totals, stats
+
+# Stream one or more seasons into the games table, e.g.
+# `python lib/ingest_stream.py --seasons 2023 2024` or, from a local file,
+# `python lib/ingest_stream.py --seasons 2024 --schedule fixtures/{season}.json`
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream NBA schedules into the games table")
+    parser.add_argument("--seasons", type=int, nargs="+", default=[2024])
+    parser.add_argument("--schedule", default=SCHEDULE_URL,
+                        help="schedule URL or local file, with {season} filled in per season")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--build-matrix", action="store_true",
+                        help="rebuild the prediction matrix afterwards; only useful on the serving host")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    schedules = [(season, args.schedule.format(season=season)) for season in args.seasons]
+    totals, stats = asyncio.run(ingest(schedules, get_team_ids(), args.batch_size))
+    print(f"Read {stats['games']} games; skipped {stats['preseason']} preseason games "
+          f"and {stats['unmapped']} games with unmapped teams")
+    print(f"Done: {totals['inserted']} inserted, {totals['updated']} updated, {totals['skipped']} skipped "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    after_ingestion()
+    if args.build_matrix:
+        from prediction_matrix import build_prediction_matrix
+        manifest = build_prediction_matrix()
+        print(f"Built prediction matrix {manifest['version']}")
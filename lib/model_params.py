@@ -0,0 +1,70 @@
+import os
+import json
+from sklearn.metrics import accuracy_score, mean_absolute_error
+
+PARAMS_DIR = "models/params"
+
+# Rounds without improvement before xgboost stops adding trees, in training
+# and when tuning
+EARLY_STOPPING_ROUNDS = 20
+
+def build_win(params):
+    from sklearn.ensemble import RandomForestClassifier
+    return RandomForestClassifier(**params, random_state=42, n_jobs=1)
+
+def build_xgboost(params):
+    import xgboost as xgb
+    return xgb.XGBClassifier(**params, objective="binary:logistic", eval_metric="logloss",
+                             random_state=42, n_jobs=1)
+
+def build_spread(params):
+    from sklearn.ensemble import GradientBoostingRegressor
+    return GradientBoostingRegressor(**params, random_state=42)
+
+# Trainable models: the registry entry their feature order comes from, the
+# dataset and target they train on, and how a fold is scored
+MODELS = {
+    "win": {
+        "registry": "win_basic", "dataset": "nba_ml_ready", "target": "home_win",
+        "build": build_win,
+        "metric": "accuracy", "score": accuracy_score, "direction": "maximize",
+    },
+    "xgboost": {
+        "registry": "win_xgboost", "dataset": "nba_ml_ready2", "target": "home_win",
+        "build": build_xgboost, "early_stopping_rounds": EARLY_STOPPING_ROUNDS,
+        "metric": "accuracy", "score": accuracy_score, "direction": "maximize",
+    },
+    "spread": {
+        "registry": "spread", "dataset": "nba_ml_ready_with_spread", "target": "point_spread",
+        "build": build_spread,
+        "metric": "mae", "score": mean_absolute_error, "direction": "minimize",
+    },
+}
+
+# Hyperparameters each model trains with until it has been tuned
+DEFAULT_PARAMS = {
+    "win": {
+        "n_estimators": 196, "max_depth": 22, "min_samples_split": 15,
+        "min_samples_leaf": 7, "max_features": None,
+    },
+    "xgboost": {
+        "n_estimators": 300, "max_depth": 6, "learning_rate": 0.05, "subsample": 0.8,
+        "colsample_bytree": 0.8, "gamma": 0.1, "reg_alpha": 0.1, "reg_lambda": 1.0,
+    },
+    "spread": {
+        "n_estimators": 300, "learning_rate": 0.05, "max_depth": 4,
+        "min_samples_leaf": 5, "subsample": 0.8,
+    },
+}
+
+def params_path(model):
+    return os.path.join(PARAMS_DIR, f"{model}.json")
+
+def tuned_params(model, defaults=None):
+    """The training defaults with the best tuned parameters, if any, applied over them"""
+    defaults = DEFAULT_PARAMS[model] if defaults is None else defaults
+    try:
+        with open(params_path(model)) as f:
+            return {**defaults, **json.load(f)["params"]}
+    except FileNotFoundError:
+        return dict(defaults)
@@ -0,0 +1,193 @@
+import os
+import sys
+import json
+import hashlib
+import time
+import threading
+from datetime import datetime, timezone
+from compiled_forest import load_compiled
+from tracing import span
+
+MANIFEST_PATH = "models/registry.json"
+
+# Seconds between manifest checks in a watching process
+RELOAD_INTERVAL = float(os.getenv("MODEL_RELOAD_SECONDS", "10"))
+
+def file_version(path):
+    """Content hash of a model artifact"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+def read_manifest(manifest_path=MANIFEST_PATH):
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"models": {}}
+
+def fsync_dir(path):
+    """Flush a directory entry so a rename into it survives a crash"""
+    fd = os.open(path or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def atomic_write(path, write, mode="wb"):
+    """Write a file through a temporary copy that is fsynced and renamed over it,
+    so readers only ever open the old or the new complete file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, mode) as f:
+            write(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    fsync_dir(os.path.dirname(path))
+
+def write_manifest(manifest, manifest_path=MANIFEST_PATH):
+    atomic_write(manifest_path, lambda f: f.write(json.dumps(manifest, indent=2) + "\n"), mode="w")
+
+def publish(model, path):
+    """Save a model artifact atomically in place of the previous one"""
+    import joblib
+
+    atomic_write(path, lambda f: joblib.dump(model, f))
+
+def register(name, path, features, metrics, manifest_path=MANIFEST_PATH):
+    """Record a saved model artifact, its feature order and evaluation metrics.
+
+    The entry's version is the version pointer watching processes reload
+    on, so register a model only once everything it serves from is written.
+    """
+    manifest = read_manifest(manifest_path)
+    manifest["models"][name] = {
+        "path": path,
+        "version": file_version(path),
+        "features": list(features),
+        "metrics": {key: round(float(value), 4) for key, value in metrics.items()},
+        "registered_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    write_manifest(manifest, manifest_path)
+    return manifest["models"][name]
+
+def load_artifact(path):
+    """A model from disk: compiled forest arrays when up to date, otherwise
+    the pickle with its NumPy arrays memory-mapped"""
+    import joblib
+
+    return load_compiled(path) or joblib.load(path, mmap_mode="r")
+
+class ModelRegistry:
+    """The models listed in the manifest, each loaded the first time it is used.
+
+    Reading the manifest is cheap, so a process only pays load time and
+    memory for the models it actually predicts with. Loaded models are kept
+    in a dict that is never mutated, only replaced, so lookups take no lock
+    and a reload swaps a new model in with one assignment.
+    """
+
+    def __init__(self, manifest_path=MANIFEST_PATH):
+        self.manifest_path = manifest_path
+        self._manifest_mtime = self._stat_manifest()
+        self.entries = read_manifest(manifest_path)["models"]
+        self._models = {}
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._watcher = None
+
+    def _stat_manifest(self):
+        try:
+            return os.stat(self.manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def entry(self, name):
+        if name not in self.entries:
+            raise ValueError(f"Unknown model {name}")
+        return self.entries[name]
+
+    def features(self, name):
+        return self.entry(name)["features"]
+
+    def metrics(self, name):
+        return self.entry(name)["metrics"]
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is None:
+            with self._lock:
+                if name not in self._models:
+                    entry = self.entry(name)
+                    self._versions = {**self._versions, name: entry["version"]}
+                    with span(f"model_load:{name}"):
+                        model = load_artifact(entry["path"])
+                    self._models = {**self._models, name: model}
+                model = self._models[name]
+        return model
+
+    def loaded(self):
+        return dict(self._versions)
+
+    def refresh(self):
+        """Reload the loaded models whose registered version has changed.
+
+        New models are built without holding the lock, so requests keep
+        being served by the old ones until the swap. A model that fails to
+        load is left as it was and retried on the next call.
+        """
+        mtime = self._stat_manifest()
+        if mtime is None or mtime == self._manifest_mtime:
+            return []
+        entries = read_manifest(self.manifest_path)["models"]
+
+        reloaded, failed = {}, False
+        for name, version in self._versions.items():
+            entry = entries.get(name)
+            if entry is None or entry["version"] == version:
+                continue
+            try:
+                reloaded[name] = (entry["version"], load_artifact(entry["path"]))
+            except Exception as e:
+                print(f"Keeping {name} {version}, reload failed: {e}", file=sys.stderr)
+                failed = True
+
+        with self._lock:
+            self.entries = entries
+            self._versions = {**self._versions, **{name: version for name, (version, _) in reloaded.items()}}
+            self._models = {**self._models, **{name: model for name, (_, model) in reloaded.items()}}
+            if not failed:
+                self._manifest_mtime = mtime
+        for name, (version, _) in reloaded.items():
+            print(f"Reloaded {name} {version}", file=sys.stderr)
+        return sorted(reloaded)
+
+    def watch(self, interval=RELOAD_INTERVAL):
+        """Check the manifest every `interval` seconds on a background thread"""
+        if self._watcher is not None or interval <= 0:
+            return
+
+        def poll():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Model reload check failed: {e}", file=sys.stderr)
+
+        self._watcher = threading.Thread(target=poll, name="model-reload", daemon=True)
+        self._watcher.start()
+
+# List the registered models
+if __name__ == "__main__":
+    manifest_path = sys.argv[1] if len(sys.argv) > 1 else MANIFEST_PATH
+    for name, entry in read_manifest(manifest_path)["models"].items():
+        print(f"{name:<14} {entry['version']}  {entry['path']:<42} "
+              f"{len(entry['features'])} features  {entry['metrics']}")
@@ -1,32 +1,185 @@
+import os
+import json
+import argparse
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+import pandas as pd
 import optuna
-from sklearn.model_selection import cross_val_score
-
-def objective(trial):
-    # Define hyperparameters to tune
-    n_estimators = trial.suggest_int('n_estimators', 100, 500)
-    max_depth = trial.suggest_int('max_depth', 10, 50)
-    min_samples_split = trial.suggest_int('min_samples_split', 2, 20)
-    min_samples_leaf = trial.suggest_int('min_samples_leaf', 1, 10)
-    max_features = trial.suggest_categorical('max_features', ['sqrt', 'log2', None])
-    
-    # Initialize the model
-    rf = RandomForestClassifier(
-        n_estimators=n_estimators,
-        max_depth=max_depth,
-        min_samples_split=min_samples_split,
-        min_samples_leaf=min_samples_leaf,
-        max_features=max_features,
-        random_state=42
+from optuna.trial import TrialState
+from sklearn.model_selection import TimeSeriesSplit
+from feature_datasets import dataset_path
+from model_registry import read_manifest, atomic_write
+from model_params import MODELS, PARAMS_DIR, params_path
+
+STORAGE_URL = "sqlite:///models/tuning.db"
+
+# Heartbeats and stale-trial retries are still marked experimental
+warnings.filterwarnings("ignore", category=optuna.exceptions.ExperimentalWarning)
+
+# Time-ordered folds: each one trains on every game before its test block
+N_SPLITS = 5
+
+# Trials that finished either way count towards the --trials target
+FINISHED = (TrialState.COMPLETE, TrialState.PRUNED)
+
+def win_space(trial):
+    return {
+        "n_estimators": trial.suggest_int("n_estimators", 100, 500),
+        "max_depth": trial.suggest_int("max_depth", 10, 50),
+        "min_samples_split": trial.suggest_int("min_samples_split", 2, 20),
+        "min_samples_leaf": trial.suggest_int("min_samples_leaf", 1, 10),
+        "max_features": trial.suggest_categorical("max_features", ["sqrt", "log2", None]),
+    }
+
+def xgboost_space(trial):
+    return {
+        "n_estimators": trial.suggest_int("n_estimators", 100, 600),
+        "max_depth": trial.suggest_int("max_depth", 2, 10),
+        "learning_rate": trial.suggest_float("learning_rate", 0.01, 0.3, log=True),
+        "subsample": trial.suggest_float("subsample", 0.5, 1.0),
+        "colsample_bytree": trial.suggest_float("colsample_bytree", 0.5, 1.0),
+        "min_child_weight": trial.suggest_int("min_child_weight", 1, 10),
+        "gamma": trial.suggest_float("gamma", 0.0, 5.0),
+        "reg_alpha": trial.suggest_float("reg_alpha", 1e-3, 10.0, log=True),
+        "reg_lambda": trial.suggest_float("reg_lambda", 1e-3, 10.0, log=True),
+    }
+
+def spread_space(trial):
+    return {
+        "n_estimators": trial.suggest_int("n_estimators", 100, 600),
+        "learning_rate": trial.suggest_float("learning_rate", 0.01, 0.2, log=True),
+        "max_depth": trial.suggest_int("max_depth", 2, 6),
+        "min_samples_leaf": trial.suggest_int("min_samples_leaf", 1, 20),
+        "subsample": trial.suggest_float("subsample", 0.5, 1.0),
+    }
+
+# Search space of each model in MODELS
+SPACES = {"win": win_space, "xgboost": xgboost_space, "spread": spread_space}
+
+def load_training_data(model):
+    """Features and target in date order, for time-ordered splits"""
+    spec = MODELS[model]
+    features = read_manifest()["models"][spec["registry"]]["features"]
+    df = pd.read_parquet(dataset_path(spec["dataset"]), columns=["id", "date"] + features + [spec["target"]])
+    df = df.sort_values(["date", "id"], kind="stable").reset_index(drop=True)
+    return df[features], df[spec["target"]]
+
+def make_objective(model, X, y, n_splits=N_SPLITS):
+    spec = MODELS[model]
+    folds = list(TimeSeriesSplit(n_splits=n_splits).split(X))
+    early_stopping_rounds = spec.get("early_stopping_rounds")
+
+    def objective(trial):
+        params = SPACES[model](trial)
+        scores = []
+        for step, (train_idx, test_idx) in enumerate(folds):
+            estimator = spec["build"](params)
+            if early_stopping_rounds:
+                # Stop on the held-out rows, as the training script does
+                estimator.set_params(early_stopping_rounds=early_stopping_rounds)
+                estimator.fit(X.iloc[train_idx], y.iloc[train_idx],
+                              eval_set=[(X.iloc[test_idx], y.iloc[test_idx])], verbose=False)
+            else:
+                estimator.fit(X.iloc[train_idx], y.iloc[train_idx])
+            scores.append(spec["score"](y.iloc[test_idx], estimator.predict(X.iloc[test_idx])))
+            # Later folds train on more data, so a trial trailing the others
+            # after the first folds rarely catches up
+            trial.report(sum(scores) / len(scores), step)
+            if trial.should_prune():
+                raise optuna.TrialPruned()
+        return sum(scores) / len(scores)
+
+    return objective
+
+def storage(url=STORAGE_URL):
+    """SQLite study storage; trials left running by a killed process are
+    failed after the grace period and re-queued"""
+    return optuna.storages.RDBStorage(
+        url,
+        engine_kwargs={"connect_args": {"timeout": 60}},
+        heartbeat_interval=30,
+        grace_period=120,
+        heartbeat_stale_trial_callback=optuna.storages.RetryHeartbeatStaleTrialCallback(max_retry=1),
     )
-    
-    # Evaluate using cross-validation
-    score = cross_val_score(rf, X_train, y_train, cv=3, scoring='accuracy').mean()
-    return score
-
-# Run optimization
-study = optuna.create_study(direction='maximize')
-study.optimize(objective, n_trials=50)
-
-# Best parameters and score
-print("Best Parameters:", study.best_params)
-print("Best Accuracy:", study.best_value)
\ No newline at end of file
+
+def pruner():
+    return optuna.pruners.MedianPruner(n_startup_trials=5, n_warmup_steps=1)
+
+def finished_trials(study):
+    return len(study.get_trials(deepcopy=False, states=FINISHED))
+
+def run_worker(model, study_name, n_trials, storage_url, seed, n_splits=N_SPLITS):
+    """Run trials in this process until the study has n_trials finished ones"""
+    optuna.logging.set_verbosity(optuna.logging.WARNING)
+    study = optuna.load_study(
+        study_name=study_name, storage=storage(storage_url),
+        sampler=optuna.samplers.TPESampler(seed=seed), pruner=pruner(),
+    )
+    if finished_trials(study) >= n_trials:
+        return 0
+    X, y = load_training_data(model)
+    study.optimize(
+        make_objective(model, X, y, n_splits),
+        callbacks=[optuna.study.MaxTrialsCallback(n_trials, states=FINISHED)],
+    )
+    return finished_trials(study)
+
+def tune(model, n_trials, jobs=None, storage_url=STORAGE_URL, study_name=None, n_splits=N_SPLITS):
+    """Tune a model with one worker process per job, sharing one stored study.
+
+    Rerunning with the same study resumes it: trials already finished count
+    towards n_trials.
+    """
+    study_name = study_name or f"{model}-tuning"
+    study = optuna.create_study(
+        study_name=study_name, storage=storage(storage_url),
+        direction=MODELS[model]["direction"], load_if_exists=True,
+    )
+    done = finished_trials(study)
+    print(f"{study_name}: {done} trials finished, target {n_trials}")
+
+    jobs = jobs or os.cpu_count() or 1
+    jobs = max(1, min(jobs, n_trials - done))
+    if done < n_trials:
+        # Seeds differ per run and worker so resumed and parallel workers explore differently
+        seeds = [done * 1000 + worker for worker in range(jobs)]
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            list(pool.map(run_worker, [model] * jobs, [study_name] * jobs, [n_trials] * jobs,
+                          [storage_url] * jobs, seeds, [n_splits] * jobs))
+
+    study = optuna.load_study(study_name=study_name, storage=storage(storage_url))
+    pruned = len(study.get_trials(deepcopy=False, states=(TrialState.PRUNED,)))
+    print(f"{finished_trials(study)} trials finished ({pruned} pruned)")
+    return study
+
+def write_best_params(model, study):
+    """Save the best parameters where the training scripts read them"""
+    spec = MODELS[model]
+    result = {
+        "params": study.best_params,
+        "cv_" + spec["metric"]: round(study.best_value, 4),
+        "study": study.study_name,
+        "trial": study.best_trial.number,
+        "updated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+    os.makedirs(PARAMS_DIR, exist_ok=True)
+    atomic_write(params_path(model), lambda f: f.write(json.dumps(result, indent=2) + "\n"), mode="w")
+    return result
+
+# Tune a model, e.g. `python lib/optimize.py win --trials 100 --jobs 8`
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune model hyperparameters with Optuna")
+    parser.add_argument("model", choices=sorted(MODELS))
+    parser.add_argument("--trials", type=int, default=50, help="finished trials to reach, counting earlier runs")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--splits", type=int, default=N_SPLITS)
+    parser.add_argument("--storage", default=STORAGE_URL)
+    parser.add_argument("--study", default=None)
+    args = parser.parse_args()
+
+    study = tune(args.model, args.trials, args.jobs, args.storage, args.study, args.splits)
+    result = write_best_params(args.model, study)
+    print(f"Best {MODELS[args.model]['metric']}: {study.best_value:.4f}")
+    print("Best Parameters:", study.best_params)
+    print(f"Saved to {params_path(args.model)}")
@@ -1,25 +1,79 @@
+import time
+_import_started = time.perf_counter()
+import re
 import sys
 import json
-import joblib
 import numpy as np
 import pandas as pd
-from supabase import create_client
 import os
 from dotenv import load_dotenv
+from fetch_planner import FetchPlan
+from feature_store import current_store
+from rpc_cache import RpcCache, data_version
+from prediction_matrix import current_matrix
+from data_access import data_source
+from model_registry import ModelRegistry
+import team_registry
+import tracing
+from tracing import span
 
 load_dotenv()
+tracing.record_startup("import", _import_started)
 
-# Initialize Supabase
-supabase = create_client(
-    os.getenv("NEXT_PUBLIC_SUPABASE_URL"),
-    os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
-)
+# Supabase, or the local database when DATA_SOURCE=local
+source = data_source()
+
+# Registered models; each is loaded the first time a request needs it
+models = ModelRegistry()
+BASIC_MODEL = "win_basic"
+ADVANCED_MODEL = "win_advanced"
+
+# Cache of RPC rows; set RPC_CACHE_PATH to add a SQLite tier shared across processes
+rpc_cache = RpcCache(disk_path=os.getenv("RPC_CACHE_PATH"))
+
+# The "id" of a worker request line, found even when the line is not valid JSON
+REQUEST_ID = re.compile(r'"id"\s*:\s*(\d+)')
+
+# Per-stage request latencies, collected while TRACE=1
+latency = tracing.LatencyHistograms()
+
+def call_rpc_uncached(func_name, params):
+    """Call an RPC function on the data source and return its first row"""
+    return source.rpc(func_name, params)
+
+def call_rpc(func_name, params):
+    """Return the first row of an RPC call, served from the cache when possible"""
+    return rpc_cache.get(func_name, params, call_rpc_uncached)
+
+def team_stats_call(team_id, is_home=True):
+    func_name = 'get_home_team_stats' if is_home else 'get_away_team_stats'
+    return func_name, {'team_id': team_id}
+
+def advanced_team_stats_call(team_id):
+    return 'get_advanced_team_stats', {'team_id_input': team_id}
+
+def head_to_head_call(home_team_id, away_team_id):
+    return 'get_head_to_head_stats', {
+        'home_team_id': home_team_id,
+        'away_team_id': away_team_id
+    }
+
+def advanced_head_to_head_call(home_team_id, away_team_id):
+    return 'get_advanced_head_to_head_stats', {
+        'home_team_id_input': home_team_id,
+        'away_team_id_input': away_team_id
+    }
+
+def combine_stats(stats, advanced_stats):
+    """Merge basic and advanced rows, or None if either is missing"""
+    if stats and advanced_stats:
+        return {**stats, **advanced_stats}
+    return None
 
 def fetch_advanced_team_stats(team_id):
     """Fetch advanced team stats using RPC functions"""
     try:
-        response = supabase.rpc('get_advanced_team_stats', {'team_id_input': team_id}).execute()
-        return response.data[0] if response.data else None
+        return call_rpc(*advanced_team_stats_call(team_id))
     except Exception as e:
         print(f"Error fetching advanced team stats: {str(e)}", file=sys.stderr)
         return None
@@ -27,9 +81,7 @@ def fetch_advanced_team_stats(team_id):
 def fetch_team_stats(team_id, is_home=True):
     """Fetch team-specific stats using RPC functions"""
     try:
-        func_name = 'get_home_team_stats' if is_home else 'get_away_team_stats'
-        response = supabase.rpc(func_name, {'team_id': team_id}).execute()
-        return response.data[0] if response.data else None
+        return call_rpc(*team_stats_call(team_id, is_home))
     except Exception as e:
         print(f"Error fetching team stats: {str(e)}", file=sys.stderr)
         return None
@@ -39,12 +91,7 @@ def fetch_all_team_stats(team_id, is_home=True):
     try:
         team_stats = fetch_team_stats(team_id, is_home)
         advanced_stats = fetch_advanced_team_stats(team_id)
-        
-        if team_stats and advanced_stats:
-            combined_stats = {**team_stats, **advanced_stats}
-            return combined_stats
-        else:
-            return None
+        return combine_stats(team_stats, advanced_stats)
     except Exception as e:
         print(f"Error fetching all team stats: {str(e)}", file=sys.stderr)
         return None
@@ -52,11 +99,7 @@ def fetch_all_team_stats(team_id, is_home=True):
 def fetch_advanced_head_to_head_stats(home_team_id, away_team_id):
     """Fetch advanced head-to-head stats using RPC functions"""
     try:
-        response = supabase.rpc('get_advanced_head_to_head_stats', {
-            'home_team_id_input': home_team_id,
-            'away_team_id_input': away_team_id
-        }).execute()
-        return response.data[0] if response.data else None
+        return call_rpc(*advanced_head_to_head_call(home_team_id, away_team_id))
     except Exception as e:
         print(f"Error fetching advanced H2H stats: {str(e)}", file=sys.stderr)
         return None
@@ -64,11 +107,7 @@ def fetch_advanced_head_to_head_stats(home_team_id, away_team_id):
 def fetch_head_to_head_stats(home_team_id, away_team_id):
     """Fetch historical matchup data between teams"""
     try:
-        response = supabase.rpc('get_head_to_head_stats', {
-            'home_team_id': home_team_id,
-            'away_team_id': away_team_id
-        }).execute()
-        return response.data[0] if response.data else None
+        return call_rpc(*head_to_head_call(home_team_id, away_team_id))
     except Exception as e:
         print(f"Error fetching H2H stats: {str(e)}", file=sys.stderr)
         return None
@@ -78,22 +117,63 @@ def fetch_all_head_to_head_stats(home_team_id, away_team_id):
     try:
         h2h_stats = fetch_head_to_head_stats(home_team_id, away_team_id)
         advanced_h2h_stats = fetch_advanced_head_to_head_stats(home_team_id, away_team_id)
-        
-        if h2h_stats and advanced_h2h_stats:
-            combined_h2h_stats = {**h2h_stats, **advanced_h2h_stats}
-            return combined_h2h_stats
-        else:
-            return None
+        return combine_stats(h2h_stats, advanced_h2h_stats)
     except Exception as e:
         print(f"Error fetching all H2H stats: {str(e)}", file=sys.stderr)
         return None
 
+def fetch_slate_stats(matchups, use_store=True):
+    """Fetch every stat row a slate needs in one concurrent round trip.
+
+    Unless use_store is False, calls covered by a fresh local feature store
+    snapshot are answered without any network access. Returns dicts keyed by team id (home-side
+    stats, away-side stats and the combined home + advanced stats used by
+    model 2) and by (home, away) pair for the combined head-to-head stats.
+    """
+    plan = FetchPlan(call_rpc)
+    for home_team_id, away_team_id, _ in matchups:
+        for team_id in (home_team_id, away_team_id):
+            plan.add(*team_stats_call(team_id, is_home=True))
+            plan.add(*advanced_team_stats_call(team_id))
+        plan.add(*team_stats_call(away_team_id, is_home=False))
+        plan.add(*head_to_head_call(home_team_id, away_team_id))
+        plan.add(*advanced_head_to_head_call(home_team_id, away_team_id))
+    
+    # Serve from the local snapshot when it is fresh; only misses hit Supabase
+    if use_store:
+        with span("feature_store"):
+            store = current_store()
+            if store is not None:
+                plan.resolve_from(store.lookup)
+    with span("rpc"):
+        plan.execute()
+    
+    home_stats, away_stats, all_stats, h2h_stats = {}, {}, {}, {}
+    for home_team_id, away_team_id, _ in matchups:
+        home_stats[home_team_id] = plan.get(*team_stats_call(home_team_id, is_home=True))
+        away_stats[away_team_id] = plan.get(*team_stats_call(away_team_id, is_home=False))
+        for team_id in (home_team_id, away_team_id):
+            all_stats[team_id] = combine_stats(
+                plan.get(*team_stats_call(team_id, is_home=True)),
+                plan.get(*advanced_team_stats_call(team_id))
+            )
+        h2h_stats[(home_team_id, away_team_id)] = combine_stats(
+            plan.get(*head_to_head_call(home_team_id, away_team_id)),
+            plan.get(*advanced_head_to_head_call(home_team_id, away_team_id))
+        )
+    
+    return home_stats, away_stats, all_stats, h2h_stats
+
 def prepare_features_for_model1(home_team_id, away_team_id, home_rest_days):
     """Compile all features in exact training order"""
     # Fetch all required data
     home_stats = fetch_team_stats(home_team_id, is_home=True)
     away_stats = fetch_team_stats(away_team_id, is_home=False)
     
+    return build_features_for_model1(home_stats, away_stats, home_rest_days)
+
+def build_features_for_model1(home_stats, away_stats, home_rest_days):
+    """Build the basic model feature row from already fetched stats"""
     # Fallback values if data is missing
     default_values = {
         'avg_pts': 110.0,           # League average
@@ -118,6 +198,10 @@ def prepare_features_for_model2(home_team_id, away_team_id, home_rest_days):
     away_stats = fetch_all_team_stats(away_team_id)
     h2h_stats = fetch_all_head_to_head_stats(home_team_id, away_team_id)
     
+    return build_features_for_model2(home_stats, away_stats, h2h_stats, home_rest_days)
+
+def build_features_for_model2(home_stats, away_stats, h2h_stats, home_rest_days):
+    """Build the advanced model feature row from already fetched stats"""
     default_values = {
         'avg_pts': 110.0,
         'avg_pts_allowed': 110.0,
@@ -163,7 +247,8 @@ def prepare_features_for_model2(home_team_id, away_team_id, home_rest_days):
         home_stats['net_rating'] - away_stats['net_rating'] if home_stats and away_stats else default_values['net_rating_diff']
     )
 
-    # Safely retrieve H2H stats with default values
+    # Safely retrieve H2H stats with default values (None when the teams have not met)
+    h2h_stats = h2h_stats or {}
     netrtg_last_5 = h2h_stats.get('netrtg_last_5', default_values['netrtg_last_5'])
     netrtg_last_10 = h2h_stats.get('netrtg_last_10', default_values['netrtg_last_10'])
     netrtg_last_20 = h2h_stats.get('netrtg_last_20', default_values['netrtg_last_20'])
@@ -198,91 +283,248 @@ def prepare_features_for_model2(home_team_id, away_team_id, home_rest_days):
         netrtg_last_20  # h2h_netrtg_last_20
     ]
 
-if __name__ == "__main__":
+FEATURE_NAMES_MODEL1 = [
+    "home_avg_pts", 
+    "away_avg_pts_scored",
+    "away_avg_pts_allowed", 
+    "home_win_pct", 
+    "home_net_rating", 
+    "home_rest_days", 
+]
+
+FEATURE_NAMES_MODEL2 = [
+    "home_avg_pts", 
+    "away_avg_pts_allowed", 
+    "home_off_rating", 
+    "away_def_rating", 
+    "home_net_rating", 
+    "away_net_rating", 
+    "home_pace", 
+    "away_pace", 
+    "home_ts_pct", 
+    "away_ts_pct", 
+    "home_efg_pct", 
+    "away_efg_pct", 
+    "home_plus_minus", 
+    "away_plus_minus", 
+    "home_ortg_adj_avg_pts", 
+    "away_drtg_adj_pts_allowed", 
+    "home_net_rating_plusminus", 
+    "away_net_rating_plusminus", 
+    "ortg_matchup_diff", 
+    "drtg_matchup_diff", 
+    "net_rating_diff", 
+    "home_rest_days", 
+    "home_rest_adj", 
+    "h2h_netrtg_last_5", 
+    "h2h_netrtg_last_10", 
+    "h2h_netrtg_last_20"
+]
+
+def load_models():
+    """Both win probability models, loading any not yet in memory"""
+    return models.get(BASIC_MODEL), models.get(ADVANCED_MODEL)
+
+def get_team_registry():
+    """The shared team registry, or None if it cannot be loaded right now"""
     try:
-        # Parse input from Next.js API
-        input_data = json.loads(sys.argv[1])
-        home_team_id = int(input_data["home_team_id"])
-        away_team_id = int(input_data["away_team_id"])
-        home_rest_days = int(input_data.get("home_rest_days", 2))
-        
-        # Validate input
-        if home_team_id == away_team_id:
-            raise ValueError("Home and away teams cannot be the same")
-        if not (0 <= home_rest_days <= 7):
-            raise ValueError("Rest days must be between 0-7")
-        
-        # Prepare features for both models
-        features_model1 = prepare_features_for_model1(home_team_id, away_team_id, home_rest_days)
-        features_model2 = prepare_features_for_model2(home_team_id, away_team_id, home_rest_days)
-        
-        # Load both models
-        model1 = joblib.load('models/nba_win_predictor.joblib')
-        model2 = joblib.load('models/nba_win_predictor2.joblib')
-        
-        # Convert features to DataFrame with proper column names
-        feature_names_model1 = [
-            "home_avg_pts", 
-            "away_avg_pts_scored",
-            "away_avg_pts_allowed", 
-            "home_win_pct", 
-            "home_net_rating", 
-            "home_rest_days", 
-        ]
-        feature_names_model2 = [
-            "home_avg_pts", 
-            "away_avg_pts_allowed", 
-            "home_off_rating", 
-            "away_def_rating", 
-            "home_net_rating", 
-            "away_net_rating", 
-            "home_pace", 
-            "away_pace", 
-            "home_ts_pct", 
-            "away_ts_pct", 
-            "home_efg_pct", 
-            "away_efg_pct", 
-            "home_plus_minus", 
-            "away_plus_minus", 
-            "home_ortg_adj_avg_pts", 
-            "away_drtg_adj_pts_allowed", 
-            "home_net_rating_plusminus", 
-            "away_net_rating_plusminus", 
-            "ortg_matchup_diff", 
-            "drtg_matchup_diff", 
-            "net_rating_diff", 
-            "home_rest_days", 
-            "home_rest_adj", 
-            "h2h_netrtg_last_5", 
-            "h2h_netrtg_last_10", 
-            "h2h_netrtg_last_20"
-        ]
-        
-        features_df_model1 = pd.DataFrame([features_model1], columns=feature_names_model1)
-        features_df_model2 = pd.DataFrame([features_model2], columns=feature_names_model2)
-        
-        # Make predictions
-        prob_model1 = model1.predict_proba(features_df_model1)[0][1]
-        prob_model2 = model2.predict_proba(features_df_model2)[0][1]
-        
-        # Prepare response
-        result = {
-            "predictions": {
-                "basic_model": {
-                    "probability": prob_model1,
-                    "accuracy": 0.711  # From your training
-                },
-                "advanced_model": {
-                    "probability": prob_model2,
-                    "accuracy": 0.606  # Update with actual accuracy
-                }
+        return team_registry.load(source)
+    except Exception as e:
+        print(f"Error loading team registry: {str(e)}", file=sys.stderr)
+        return None
+
+def parse_matchup(input_data, registry=None):
+    """Read and validate a single matchup from a request payload against the
+    team registry, which slates load once for all their matchups"""
+    home_team_id = int(input_data["home_team_id"])
+    away_team_id = int(input_data["away_team_id"])
+    home_rest_days = int(input_data.get("home_rest_days", 2))
+    
+    # Validate input
+    if home_team_id == away_team_id:
+        raise ValueError("Home and away teams cannot be the same")
+    if registry is None:
+        with span("team_registry"):
+            registry = get_team_registry()
+    for team_id in (home_team_id, away_team_id):
+        if registry is not None and not registry.has_id(team_id):
+            raise ValueError(f"Unknown team id {team_id}")
+    if not (0 <= home_rest_days <= 7):
+        raise ValueError("Rest days must be between 0-7")
+    
+    return home_team_id, away_team_id, home_rest_days
+
+def predict_matchup(home_team_id, away_team_id, home_rest_days, model1=None, model2=None):
+    """Run both models for one matchup and build the response payload"""
+    return predict_slate([(home_team_id, away_team_id, home_rest_days)], model1, model2)[0]
+
+def predict_slate(matchups, model1=None, model2=None):
+    """Predict a whole slate of (home_team_id, away_team_id, home_rest_days) matchups.
+
+    Matchups covered by a current prediction matrix are answered from it;
+    the rest are scored live, with stats fetched once per distinct team and
+    team pair in a single concurrent round trip and a single predict_proba
+    call per model. Models not passed in come from the registry, and passing
+    either one skips the matrix.
+    """
+    results = [None] * len(matchups)
+    if model1 is None and model2 is None:
+        with span("matrix_lookup"):
+            matrix = current_matrix_for_serving()
+            if matrix is not None:
+                for i, matchup in enumerate(matchups):
+                    results[i] = matrix.lookup(*matchup)
+    
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        probs_model1, probs_model2 = predict_probabilities([matchups[i] for i in missing], model1, model2)
+        for i, prob_model1, prob_model2 in zip(missing, probs_model1, probs_model2):
+            results[i] = (prob_model1, prob_model2)
+    
+    return [
+        prediction_payload(*matchup, prob_model1, prob_model2)
+        for matchup, (prob_model1, prob_model2) in zip(matchups, results)
+    ]
+
+def predict_probabilities(matchups, model1=None, model2=None, use_store=True):
+    """Live home win probabilities from each model, as two arrays aligned with matchups"""
+    model1 = model1 if model1 is not None else models.get(BASIC_MODEL)
+    model2 = model2 if model2 is not None else models.get(ADVANCED_MODEL)
+    home_stats, away_stats, all_stats, h2h_stats = fetch_slate_stats(matchups, use_store)
+    
+    # Build one feature matrix per model for the whole slate
+    with span("features"):
+        features_model1 = np.array([
+            build_features_for_model1(home_stats[home], away_stats[away], rest)
+            for home, away, rest in matchups
+        ], dtype=float)
+        features_model2 = np.array([
+            build_features_for_model2(all_stats[home], all_stats[away], h2h_stats[(home, away)], rest)
+            for home, away, rest in matchups
+        ], dtype=float)
+    
+    # Make predictions
+    with span("predict_proba:" + BASIC_MODEL):
+        probs_model1 = model1.predict_proba(pd.DataFrame(features_model1, columns=FEATURE_NAMES_MODEL1))[:, 1]
+    with span("predict_proba:" + ADVANCED_MODEL):
+        probs_model2 = model2.predict_proba(pd.DataFrame(features_model2, columns=FEATURE_NAMES_MODEL2))[:, 1]
+    return probs_model1, probs_model2
+
+def serving_versions():
+    """Version of each win model a live prediction would use right now"""
+    loaded = models.loaded()
+    return {name: loaded.get(name) or models.entry(name)["version"] for name in (BASIC_MODEL, ADVANCED_MODEL)}
+
+def current_matrix_for_serving():
+    """The prediction matrix if it was built from the current data and models, else None"""
+    matrix = current_matrix()
+    if matrix is None or not matrix.matches(data_version(), serving_versions()):
+        return None
+    return matrix
+
+def prediction_payload(home_team_id, away_team_id, home_rest_days, prob_model1, prob_model2):
+    return {
+        "predictions": {
+            "basic_model": {
+                "probability": float(prob_model1),
+                "accuracy": models.metrics(BASIC_MODEL).get("accuracy")
             },
-            "metadata": {
-                "home_team_id": home_team_id,
-                "away_team_id": away_team_id,
-                "home_rest_days": home_rest_days
+            "advanced_model": {
+                "probability": float(prob_model2),
+                "accuracy": models.metrics(ADVANCED_MODEL).get("accuracy")
             }
+        },
+        "metadata": {
+            "home_team_id": home_team_id,
+            "away_team_id": away_team_id,
+            "home_rest_days": home_rest_days
         }
+    }
+
+def handle_request(input_data, model1=None, model2=None):
+    """Dispatch a request to the single-game or slate prediction path.
+
+    A payload with a "matchups" list is treated as a slate and answered with
+    {"games": [...]}, and {"command": "stats"} returns the RPC cache
+    counters, loaded model versions and stage latency histograms; anything
+    else is a single matchup. With "trace": true the response metadata
+    includes the timed stages of the request.
+    """
+    if input_data.get("command") == "stats":
+        return {"cache": rpc_cache.stats(), "models": models.loaded(), "latency": latency.snapshot()}
+    
+    trace = tracing.begin("request", force=bool(input_data.get("trace")))
+    try:
+        result = dispatch_request(input_data, model1, model2)
+    finally:
+        if trace is not None:
+            tracing.finish()
+    if trace is not None:
+        if tracing.ENABLED:
+            latency.observe_trace(trace)
+        if input_data.get("trace"):
+            result.setdefault("metadata", {})["trace"] = trace.to_dict()
+    return result
+
+def dispatch_request(input_data, model1=None, model2=None):
+    if "matchups" in input_data:
+        with span("team_registry"):
+            registry = get_team_registry()
+        matchups = [parse_matchup(matchup, registry) for matchup in input_data["matchups"]]
+        if not matchups:
+            return {"games": []}
+        return {"games": predict_slate(matchups, model1, model2)}
+    return predict_matchup(*parse_matchup(input_data), model1, model2)
+
+def run_worker(stdin=sys.stdin, stdout=sys.stdout):
+    """Serve predictions as JSON lines until stdin closes.
+
+    Models are loaded on the first request that needs them, so the worker
+    is ready immediately, and retrained versions are swapped in by a
+    background watcher (MODEL_RELOAD_SECONDS, 0 to disable). Each input line
+    is a request object; the optional "id" field is echoed back so callers
+    can match responses to requests.
+    """
+    models.watch()
+    print(json.dumps({"ready": True}), file=stdout, flush=True)
+    
+    for line in stdin:
+        line = line.strip()
+        if not line:
+            continue
+        
+        request_id = None
+        try:
+            input_data = json.loads(line)
+            request_id = input_data.get("id")
+            result = handle_request(input_data)
+        except json.JSONDecodeError:
+            result = {"error": "Invalid JSON input"}
+            # Recover the id so the caller is answered instead of timing out
+            match = REQUEST_ID.search(line)
+            if match:
+                request_id = int(match.group(1))
+        except Exception as e:
+            result = {
+                "error": str(e),
+                "predictions": {
+                    "basic_model": {"probability": 0.5},
+                    "advanced_model": {"probability": 0.5}
+                }
+            }
+        
+        result["id"] = request_id
+        print(json.dumps(result), file=stdout, flush=True)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--worker":
+        run_worker()
+        sys.exit(0)
+    
+    try:
+        # Parse input from Next.js API
+        input_data = json.loads(sys.argv[1])
+        result = handle_request(input_data)
         
         print(json.dumps(result))
         
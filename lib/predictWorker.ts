@@ -0,0 +1,130 @@
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
+import { createInterface } from 'readline';
+import path from 'path';
+
+export interface PredictionRequest {
+    home_team_id: number;
+    away_team_id: number;
+    home_rest_days: number;
+}
+
+// eslint-disable-next-line @typescript-eslint/no-explicit-any
+type PredictionResponse = Record<string, any>;
+
+interface PendingRequest {
+    resolve: (value: PredictionResponse) => void;
+    reject: (reason: Error) => void;
+    timer: NodeJS.Timeout;
+}
+
+const REQUEST_TIMEOUT_MS = 30000;
+
+let worker: ChildProcessWithoutNullStreams | null = null;
+let nextRequestId = 1;
+const pending = new Map<number, PendingRequest>();
+
+function rejectAll(error: Error) {
+    for (const [id, request] of pending) {
+        clearTimeout(request.timer);
+        request.reject(error);
+        pending.delete(id);
+    }
+}
+
+// The worker answers requests in order, so a reply that cannot be matched
+// by id belongs to the oldest request still waiting
+function rejectOldest(error: Error) {
+    for (const [id, request] of pending) {
+        clearTimeout(request.timer);
+        request.reject(error);
+        pending.delete(id);
+        return;
+    }
+}
+
+function startWorker(): ChildProcessWithoutNullStreams {
+    const child = spawn('python', [
+        path.join(process.cwd(), 'lib', 'predict.py'),
+        '--worker'
+    ]);
+
+    // Each stdout line is one JSON response tagged with the request id
+    createInterface({ input: child.stdout }).on('line', (line) => {
+        let response: PredictionResponse;
+        try {
+            response = JSON.parse(line);
+        } catch {
+            console.error('Invalid worker output:', line);
+            rejectOldest(new Error('Invalid prediction worker output'));
+            return;
+        }
+
+        if (response.ready) {
+            return;
+        }
+        const request = pending.get(response.id);
+        if (!request) {
+            // Late replies to requests that already timed out are dropped
+            if (typeof response.id !== 'number' || response.id >= nextRequestId) {
+                rejectOldest(new Error(response.error || 'Unmatched prediction worker response'));
+            }
+            return;
+        }
+        clearTimeout(request.timer);
+        pending.delete(response.id);
+        request.resolve(response);
+    });
+
+    // Fetch warnings are logged to stderr and should not fail the request
+    child.stderr.on('data', (data) => {
+        console.error('Python worker:', data.toString());
+    });
+
+    // Failing to spawn (python not on PATH, wrong cwd) or to write to a dead
+    // worker fails the pending requests instead of crashing the server
+    const onError = (error: Error) => {
+        if (worker === child) {
+            worker = null;
+        }
+        rejectAll(error);
+    };
+    child.on('error', onError);
+    child.stdin.on('error', onError);
+
+    child.on('exit', (code) => {
+        if (worker === child) {
+            worker = null;
+        }
+        rejectAll(new Error(`Prediction worker exited with code ${code}`));
+    });
+
+    return child;
+}
+
+function sendToWorker(payload: object): Promise<PredictionResponse> {
+    if (!worker) {
+        worker = startWorker();
+    }
+
+    const id = nextRequestId++;
+    const child = worker;
+
+    return new Promise((resolve, reject) => {
+        const timer = setTimeout(() => {
+            pending.delete(id);
+            reject(new Error('Prediction worker timed out'));
+        }, REQUEST_TIMEOUT_MS);
+
+        pending.set(id, { resolve, reject, timer });
+        child.stdin.write(JSON.stringify({ id, ...payload }) + '\n');
+    });
+}
+
+export function predictWithWorker(input: PredictionRequest): Promise<PredictionResponse> {
+    return sendToWorker(input);
+}
+
+// A slate is scored in one batch by the worker and answered as { games: [...] }
+export function predictSlateWithWorker(matchups: PredictionRequest[]): Promise<PredictionResponse> {
+    return sendToWorker({ matchups });
+}
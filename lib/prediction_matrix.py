@@ -0,0 +1,144 @@
+import os
+import sys
+import json
+import glob
+from datetime import datetime, timezone
+import numpy as np
+
+DEFAULT_MATRIX_DIR = "models/prediction_matrix"
+MANIFEST_NAME = "manifest.json"
+
+# Every rest-day value a request may ask for
+REST_DAYS = range(8)
+
+class PredictionMatrix:
+    """Memory-mapped home win probabilities for every matchup and rest-day value.
+
+    The array is (n_models, n_teams, n_teams, n_rest_days), indexed by home
+    team, away team and home rest days, with NaN on the diagonal. The
+    manifest stamps it with the data epoch and model versions it was
+    computed from, and it is only served while both are still current.
+    """
+
+    def __init__(self, matrix_dir, manifest):
+        self.matrix_dir = matrix_dir
+        self.manifest = manifest
+        self.data_version = manifest["data_version"]
+        self.model_versions = manifest["models"]
+        self.team_index = {team_id: i for i, team_id in enumerate(manifest["team_ids"])}
+        self.probabilities = np.load(os.path.join(matrix_dir, manifest["file"]), mmap_mode="r")
+
+    @classmethod
+    def load(cls, matrix_dir=DEFAULT_MATRIX_DIR):
+        """Open the current matrix, or return None if none has been built"""
+        try:
+            with open(os.path.join(matrix_dir, MANIFEST_NAME)) as f:
+                manifest = json.load(f)
+            return cls(matrix_dir, manifest)
+        except FileNotFoundError:
+            return None
+
+    def matches(self, data_version, model_versions):
+        return self.data_version == data_version and self.model_versions == model_versions
+
+    def lookup(self, home_team_id, away_team_id, home_rest_days):
+        """Each model's probability for a matchup, or None if the matrix does not cover it"""
+        i = self.team_index.get(home_team_id)
+        j = self.team_index.get(away_team_id)
+        if i is None or j is None or i == j or not 0 <= home_rest_days < self.probabilities.shape[3]:
+            return None
+        return tuple(float(value) for value in self.probabilities[:, i, j, home_rest_days])
+
+_current = {}
+
+def current_matrix(matrix_dir=DEFAULT_MATRIX_DIR):
+    """Return the matrix in matrix_dir, or None if none has been built.
+
+    Like current_store, the open matrix is reused until its manifest
+    changes on disk. Callers check it against the current data and models.
+    """
+    try:
+        mtime = os.stat(os.path.join(matrix_dir, MANIFEST_NAME)).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    cached = _current.get(matrix_dir)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, PredictionMatrix.load(matrix_dir))
+        _current[matrix_dir] = cached
+    return cached[1]
+
+def build_prediction_matrix(matrix_dir=DEFAULT_MATRIX_DIR):
+    """Score every ordered matchup at every rest-day value and save the result.
+
+    All 30 x 29 x 8 rows go through predict.predict_probabilities as one
+    batch, so each model runs a single predict_proba call. Stats are read
+    from the database rather than the feature store, which may predate the
+    ingestion that triggered the build. The data epoch is read before
+    fetching, so ingestion that lands mid-build leaves the matrix stale
+    rather than wrongly current. As with the feature store,
+    the array is written under a version-stamped name and the manifest is
+    replaced last.
+    """
+    import predict
+    from rpc_cache import data_version
+
+    stamp = data_version()
+    # Rows cached before the ingestion must not end up in the matrix
+    predict.rpc_cache.invalidate()
+    team_ids = predict.get_team_registry().ids
+    n_teams = len(team_ids)
+
+    matchups = [
+        (home_team_id, away_team_id, rest)
+        for home_team_id in team_ids for away_team_id in team_ids if home_team_id != away_team_id
+        for rest in REST_DAYS
+    ]
+    probs_model1, probs_model2 = predict.predict_probabilities(matchups, use_store=False)
+
+    index = {team_id: i for i, team_id in enumerate(team_ids)}
+    homes = np.array([index[home] for home, _, _ in matchups])
+    aways = np.array([index[away] for _, away, _ in matchups])
+    rests = np.array([rest for _, _, rest in matchups])
+    probabilities = np.full((2, n_teams, n_teams, len(REST_DAYS)), np.nan)
+    probabilities[0, homes, aways, rests] = probs_model1
+    probabilities[1, homes, aways, rests] = probs_model2
+
+    model_versions = predict.serving_versions()
+    built_at = datetime.now(timezone.utc)
+    version = f"{built_at:%Y%m%d%H%M%S}-{stamp}"
+    filename = f"probabilities-{version}.npy"
+    os.makedirs(matrix_dir, exist_ok=True)
+    np.save(os.path.join(matrix_dir, filename), probabilities)
+
+    manifest = {
+        "version": version,
+        "built_at": built_at.isoformat(),
+        "data_version": stamp,
+        "models": model_versions,
+        "team_ids": team_ids,
+        "rest_days": list(REST_DAYS),
+        "file": filename,
+    }
+    tmp_path = os.path.join(matrix_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(matrix_dir, MANIFEST_NAME))
+
+    # Drop older arrays; open mmaps keep their data on POSIX
+    for path in glob.glob(os.path.join(matrix_dir, "*.npy")):
+        if os.path.basename(path) != filename:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    return manifest
+
+# Run after ingestion on the host that serves predictions: the matrix is only
+# used while it matches that host's models/.rpc_cache_epoch, e.g.
+# `python lib/prediction_matrix.py`
+if __name__ == "__main__":
+    matrix_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_MATRIX_DIR
+    manifest = build_prediction_matrix(matrix_dir)
+    print(f"Built prediction matrix {manifest['version']} for {len(manifest['team_ids'])} teams in {matrix_dir}")
@@ -0,0 +1,44 @@
+import time
+import random
+import threading
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` requests per second with bursts up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def call_with_retries(fn, *args, attempts=4, base_delay=1.0, max_delay=30.0, bucket=None, label=None):
+    """Call fn(*args), retrying failures with full-jitter exponential backoff.
+
+    When a bucket is given, every attempt (including retries) waits for a
+    token first so retries cannot exceed the upstream rate limit.
+    """
+    for attempt in range(attempts):
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            return fn(*args)
+        except Exception as e:
+            if attempt == attempts - 1:
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            print(f"Retrying {label or fn.__name__} in {delay:.1f}s after error: {e}")
+            time.sleep(delay)
@@ -0,0 +1,100 @@
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from pandas.api.indexers import BaseIndexer
+
+# One output column: `stat` over the last `window` values of `column` within
+# each group, optionally shifted so the current game is excluded
+RollingSpec = namedtuple(
+    "RollingSpec",
+    ["name", "column", "window", "min_periods", "stat", "shift"],
+    defaults=[None, "mean", 0],
+)
+
+class GroupWindowIndexer(BaseIndexer):
+    """Trailing fixed-size windows that never cross a group boundary.
+
+    `group_start` holds, for every row of the group-sorted frame, the
+    position of the first row of its group.
+    """
+
+    def get_window_bounds(self, num_values=0, min_periods=None, center=None, closed=None, step=None):
+        end = np.arange(1, num_values + 1, dtype=np.int64)
+        start = np.maximum(end - self.window_size, self.group_start).astype(np.int64)
+        return start, end
+
+def group_layout(df, by):
+    """Stable group-sorted order of df and the group start for each sorted row"""
+    codes = df.groupby(by, sort=False).ngroup().to_numpy()
+    order = np.argsort(codes, kind="stable")
+    sorted_codes = codes[order]
+    is_start = np.ones(len(order), dtype=bool)
+    is_start[1:] = sorted_codes[1:] != sorted_codes[:-1]
+    starts = np.flatnonzero(is_start)
+    group_start = starts[np.cumsum(is_start) - 1]
+    return order, group_start
+
+def shift_within_groups(values, group_start, periods):
+    """Shift sorted rows down by `periods`, leaving NaN at the top of each group"""
+    shifted = np.full_like(values, np.nan)
+    shifted[periods:] = values[:-periods]
+    shifted[np.arange(len(values)) - periods < group_start] = np.nan
+    return shifted
+
+def rolling_features(df, by, specs):
+    """Compute every rolling spec for the groups of `by` in vectorized passes.
+
+    Equivalent to df.groupby(by)[column].transform(lambda x: x.shift(shift)
+    .rolling(window, min_periods).<stat>()) for each spec, but the frame is
+    sorted and the group boundaries found once, and all columns sharing a
+    (window, min_periods, stat, shift) are computed in a single rolling call.
+    Returns a frame aligned with df.index, one column per spec name.
+    """
+    order, group_start = group_layout(df, by)
+    columns = list(dict.fromkeys(spec.column for spec in specs))
+    values = df[columns].to_numpy(dtype=float, na_value=np.nan)[order]
+    
+    passes = {}
+    for spec in specs:
+        min_periods = spec.window if spec.min_periods is None else spec.min_periods
+        passes.setdefault((spec.window, min_periods, spec.stat, spec.shift), []).append(spec)
+    
+    result = np.empty((len(df), len(specs)))
+    positions = {spec.name: i for i, spec in enumerate(specs)}
+    for (window, min_periods, stat, shift), pass_specs in passes.items():
+        pass_columns = list(dict.fromkeys(spec.column for spec in pass_specs))
+        pass_values = values[:, [columns.index(column) for column in pass_columns]]
+        if shift:
+            pass_values = shift_within_groups(pass_values, group_start, shift)
+        
+        indexer = GroupWindowIndexer(window_size=window, group_start=group_start)
+        rolled = getattr(pd.DataFrame(pass_values).rolling(indexer, min_periods=min_periods), stat)()
+        rolled = rolled.to_numpy()
+        
+        for spec in pass_specs:
+            result[order, positions[spec.name]] = rolled[:, pass_columns.index(spec.column)]
+    
+    return pd.DataFrame(result, index=df.index, columns=[spec.name for spec in specs])
+
+def group_mean(df, by, column):
+    """Broadcast the per-group mean of `column` back onto every row.
+
+    Sums each group's contiguous slice with NumPy's pairwise summation so
+    the result matches Series.mean() bit for bit, unlike groupby's
+    compensated mean.
+    """
+    order, group_start = group_layout(df, by)
+    values = df[column].to_numpy(dtype=float, na_value=np.nan)[order]
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0)
+    
+    starts = np.unique(group_start)
+    ends = np.append(starts[1:], len(values))
+    means = np.array([
+        filled[start:end].sum() / count if (count := present[start:end].sum()) else np.nan
+        for start, end in zip(starts, ends)
+    ])
+    
+    result = np.empty(len(df))
+    result[order] = means[np.searchsorted(starts, group_start)]
+    return pd.Series(result, index=df.index, name=column)
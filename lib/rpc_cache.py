@@ -0,0 +1,226 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from fetch_planner import rpc_key
+
+# Seconds a cached row counts as fresh, per RPC. Team and matchup stats only
+# move when a game finishes, so an hour is conservative.
+DEFAULT_TTLS = {
+    "get_home_team_stats": 3600,
+    "get_away_team_stats": 3600,
+    "get_advanced_team_stats": 6 * 3600,
+    "get_head_to_head_stats": 6 * 3600,
+    "get_advanced_head_to_head_stats": 6 * 3600,
+}
+DEFAULT_TTL = 600
+
+# How long past its TTL a row is still served while it refreshes in the background
+DEFAULT_STALE_WINDOW = 24 * 3600
+
+DEFAULT_EPOCH_FILE = "models/.rpc_cache_epoch"
+
+_MISSING = object()
+
+def notify_data_changed(epoch_file=DEFAULT_EPOCH_FILE):
+    """Invalidation hook for ingestion scripts.
+
+    Bumps the epoch file that every RpcCache watches; on their next lookup
+    they treat all cached rows as expired and refetch them.
+    """
+    directory = os.path.dirname(epoch_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = epoch_file + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(str(time.time_ns()))
+    os.replace(tmp_path, epoch_file)
+
+def data_version(epoch_file=DEFAULT_EPOCH_FILE):
+    """The current data epoch: the epoch file's mtime, or None before the first ingestion"""
+    try:
+        return os.stat(epoch_file).st_mtime_ns
+    except (FileNotFoundError, TypeError):
+        return None
+
+class DiskTier:
+    """SQLite-backed second tier shared by every process using the same path"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS rpc_cache ("
+                "key TEXT PRIMARY KEY, value TEXT, stored_at REAL)"
+            )
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT value, stored_at FROM rpc_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def set(self, key, value, stored_at):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO rpc_cache (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), stored_at),
+            )
+
+    def expire(self, prefix=""):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE rpc_cache SET stored_at = 0 WHERE substr(key, 1, length(?)) = ?",
+                (prefix, prefix),
+            )
+
+class RpcCache:
+    """In-process LRU of RPC rows with per-RPC TTLs and stale-while-revalidate.
+
+    Lookups inside the TTL are served from memory (or the optional disk
+    tier). Rows past their TTL but inside the stale window are returned
+    immediately and refreshed in the background. When a refresh fails,
+    the last real value is served regardless of age; only a cold miss
+    with Supabase unreachable propagates the error to the caller.
+    """
+
+    def __init__(self, maxsize=4096, ttls=None, default_ttl=DEFAULT_TTL,
+                 stale_window=DEFAULT_STALE_WINDOW, disk_path=None,
+                 epoch_file=DEFAULT_EPOCH_FILE):
+        self.maxsize = maxsize
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.stale_window = stale_window
+        self.disk = DiskTier(disk_path) if disk_path else None
+        self.epoch_file = epoch_file
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.refreshing = set()
+        self.refresher = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rpc-refresh")
+        self.counters = {"hits": 0, "stale_hits": 0, "misses": 0, "fallbacks": 0, "errors": 0}
+        self.epoch = self._read_epoch()
+        self.epoch_checked_at = time.monotonic()
+
+    def get(self, func_name, params, loader):
+        """Return the row for an RPC call, loading it with loader(func_name, params) if needed"""
+        self._check_epoch()
+        key = self._key(func_name, params)
+        entry = self._lookup(key)
+        ttl = self.ttls.get(func_name, self.default_ttl)
+        
+        if entry is not _MISSING:
+            value, stored_at = entry
+            age = time.time() - stored_at
+            if age <= ttl:
+                self._count("hits")
+                return value
+            if age <= ttl + self.stale_window:
+                self._count("stale_hits")
+                self._refresh_in_background(key, func_name, params, loader)
+                return value
+        
+        self._count("misses")
+        try:
+            value = loader(func_name, params)
+        except Exception:
+            self._count("errors")
+            if entry is _MISSING:
+                raise
+            self._count("fallbacks")
+            print(f"Serving cached {func_name} after fetch failure", file=sys.stderr)
+            return entry[0]
+        
+        self._store(key, value)
+        return value
+
+    def invalidate(self, func_name=None):
+        """Expire cached rows for one RPC, or every row if func_name is None.
+
+        Expired rows are kept so they can still be served if Supabase is down.
+        """
+        prefix = "" if func_name is None else json.dumps([func_name])[:-1]
+        with self.lock:
+            for key, (value, _) in self.entries.items():
+                if key.startswith(prefix):
+                    self.entries[key] = (value, 0)
+        if self.disk:
+            self.disk.expire(prefix)
+
+    def stats(self):
+        with self.lock:
+            return {**self.counters, "size": len(self.entries)}
+
+    def _key(self, func_name, params):
+        name, items = rpc_key(func_name, params)
+        return json.dumps([name, items])
+
+    def _lookup(self, key):
+        with self.lock:
+            entry = self.entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                self.entries.move_to_end(key)
+                return entry
+        if self.disk:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self._remember(key, entry)
+                return entry
+        return _MISSING
+
+    def _store(self, key, value):
+        entry = (value, time.time())
+        self._remember(key, entry)
+        if self.disk:
+            self.disk.set(key, *entry)
+
+    def _remember(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def _refresh_in_background(self, key, func_name, params, loader):
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+        
+        def refresh():
+            try:
+                self._store(key, loader(func_name, params))
+            except Exception as e:
+                self._count("errors")
+                print(f"Error refreshing {func_name}: {str(e)}", file=sys.stderr)
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+        
+        self.refresher.submit(refresh)
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def _read_epoch(self):
+        return data_version(self.epoch_file)
+
+    def _check_epoch(self):
+        # Stat the epoch file at most once a second
+        now = time.monotonic()
+        if now - self.epoch_checked_at < 1.0:
+            return
+        self.epoch_checked_at = now
+        epoch = self._read_epoch()
+        if epoch != self.epoch:
+            self.epoch = epoch
+            self.invalidate()
@@ -0,0 +1,28 @@
+import pandas as pd
+from rolling import RollingSpec, rolling_features
+
+def shared_features(games):
+    """Columns every model's feature set starts from, aligned with games.index.
+
+    home_avg_pts and away_avg_pts_allowed are 10-game rolling means over
+    each team's home and away games in date order. home_days_since_last_game
+    is the raw gap between home games; each model applies its own clipping
+    or fill to turn it into rest days.
+    """
+    df = games.assign(date=pd.to_datetime(games["date"]))
+    by_home = df.sort_values(by=["home_team_id", "date"])
+    by_away = df.sort_values(by=["away_team_id", "date"])
+    
+    home = rolling_features(by_home, "home_team_id", [
+        RollingSpec("home_avg_pts", "home_score", 10, min_periods=3),
+    ])
+    away = rolling_features(by_away, "away_team_id", [
+        RollingSpec("away_avg_pts_allowed", "home_score", 10, min_periods=3),  # Home score = away team's points allowed
+    ])
+    days = by_home.groupby("home_team_id")["date"].diff().dt.days
+    
+    return pd.DataFrame({
+        "home_avg_pts": home["home_avg_pts"],
+        "away_avg_pts_allowed": away["away_avg_pts_allowed"],
+        "home_days_since_last_game": days,
+    }).reindex(games.index)
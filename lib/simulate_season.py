@@ -0,0 +1,243 @@
+import os
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from dotenv import load_dotenv
+from data_access import data_source
+from table_reader import read_games
+from feature_datasets import dataset_path
+from model_registry import ModelRegistry
+import team_registry
+import tracing
+from tracing import span
+
+load_dotenv()
+
+RESULTS_PATH = "models/results/season_simulation.csv"
+
+# Seasons per task; every chunk has its own seed, so results do not depend on --jobs
+CHUNK_SIZE = 5000
+
+PLAYOFF_SEEDS = 6
+PLAY_IN_SEEDS = 10
+
+EASTERN_CONFERENCE = {
+    "ATL", "BOS", "BKN", "CHA", "CHI", "CLE", "DET", "IND",
+    "MIA", "MIL", "NYK", "ORL", "PHI", "TOR", "WAS",
+}
+
+# Team state carried into each remaining game, by the side it plays on
+HOME_STATE = ["home_avg_margin", "home_margin_std", "home_net_rating", "home_pace", "home_avg_pts"]
+AWAY_STATE = ["away_avg_margin", "away_margin_std", "away_pace", "away_avg_pts_allowed"]
+
+def conferences(registry):
+    """Conference code per team in registry order: 0 East, 1 West, or all 0
+    when the abbreviations are not NBA ones and the league is seeded as one"""
+    abbreviations = [registry.by_id[team_id]["abbreviation"] for team_id in registry.ids]
+    if not EASTERN_CONFERENCE & set(abbreviations):
+        return np.zeros(len(abbreviations), dtype=np.int64)
+    return np.array([0 if abbreviation in EASTERN_CONFERENCE else 1 for abbreviation in abbreviations])
+
+def load_schedule(games, season=None, as_of=None):
+    """A regular season's played and remaining games.
+
+    Defaults to the latest season; games after `as_of` (YYYY-MM-DD) count
+    as remaining even if they have a score, for replaying past seasons.
+    """
+    games = games.assign(date=pd.to_datetime(games["date"]))
+    if "season_type" in games.columns:
+        games = games[games["season_type"].fillna("Regular Season") == "Regular Season"]
+    season = int(games["season"].max()) if season is None else season
+    games = games[games["season"] == season]
+    played = games["home_score"].notna() & games["away_score"].notna()
+    if as_of is not None:
+        played &= games["date"] <= pd.Timestamp(as_of)
+    return season, games[played], games[~played].sort_values(["date", "id"], kind="stable")
+
+def spread_features(remaining, history):
+    """Spread model features for every remaining game, from each team's latest state.
+
+    `history` is the spread dataset up to the simulation date. A team's
+    rolling margins, pace and scoring come from its last home or away game
+    there, head-to-head spread from the pair's last five meetings, and rest
+    days from the remaining schedule itself. Missing state gets the same
+    defaults feature_engineering_regressor fills in.
+    """
+    history = history.sort_values(["date", "id"], kind="stable")
+    home = history.drop_duplicates("home_team_id", keep="last").set_index("home_team_id")[HOME_STATE]
+    away = history.drop_duplicates("away_team_id", keep="last").set_index("away_team_id")[AWAY_STATE]
+    features = pd.concat([
+        home.reindex(remaining["home_team_id"]).reset_index(drop=True),
+        away.reindex(remaining["away_team_id"]).reset_index(drop=True),
+    ], axis=1)
+
+    pairs = ["home_team_id", "away_team_id"]
+    h2h = history.groupby(pairs).tail(5).groupby(pairs)["point_spread"].agg(["mean", "count"])
+    h2h = h2h["mean"].where(h2h["count"] >= 2)
+    features["h2h_avg_spread"] = h2h.reindex(pd.MultiIndex.from_frame(remaining[pairs])).to_numpy()
+
+    # Days since each team's previous home game, as in shared_features
+    home_dates = pd.concat([
+        history[["home_team_id", "date"]].assign(row=-1),
+        remaining[["home_team_id", "date"]].assign(row=np.arange(len(remaining))),
+    ]).sort_values(["home_team_id", "date"], kind="stable")
+    home_dates["rest"] = home_dates.groupby("home_team_id")["date"].diff().dt.days
+    rest = home_dates[home_dates["row"] >= 0].set_index("row")["rest"].sort_index()
+    features["home_rest_days"] = rest.fillna(7).to_numpy()
+
+    for column in ["home_pace", "away_pace", "home_avg_pts", "away_avg_pts_allowed"]:
+        features[column] = features[column].fillna(history[column].mean())
+    features = features.fillna({
+        "home_avg_margin": 0, "away_avg_margin": 0, "home_net_rating": 0,
+        "home_margin_std": 0, "away_margin_std": 0, "h2h_avg_spread": 0,
+    })
+    features["pace_diff"] = features["home_pace"] - features["away_pace"]
+    features["rest_adjusted_spread"] = features["home_avg_margin"] * (1 + (features["home_rest_days"] - 3) * 0.02)
+    return features
+
+def margin_distributions(model, features, columns):
+    """Predicted home margin and its spread for each game, from one batch prediction.
+
+    A game's standard deviation pools the two teams' recent margin
+    volatility; teams without one get the league median.
+    """
+    mu = model.predict(features[columns])
+    stds = features[["home_margin_std", "away_margin_std"]].to_numpy()
+    known = stds[stds > 0]
+    stds = np.where(stds > 0, stds, np.median(known) if known.size else 12.0)
+    sigma = np.sqrt((stds ** 2).mean(axis=1))
+    return np.asarray(mu, dtype=float), sigma
+
+def simulate_chunk(seed, n_sims, threshold, home_index, away_index, base_wins, conference, max_wins):
+    """Play out the remaining games n_sims times and count win totals and seeds.
+
+    The home team wins a game when its standard normal draw clears
+    -mu / sigma. Win totals are one matrix product of the results with the
+    home-minus-away incidence matrix, and seeds come from sorting each
+    season by conference and wins, with ties broken at random.
+    """
+    rng = np.random.default_rng(seed)
+    n_teams, n_games = len(base_wins), len(threshold)
+
+    incidence = np.zeros((n_games, n_teams), dtype=np.float32)
+    games = np.arange(n_games)
+    incidence[games, home_index] = 1
+    incidence[games, away_index] = -1
+    # Every team starts with all its remaining away games won
+    start = base_wins + np.bincount(away_index, minlength=n_teams)
+
+    home_wins = rng.standard_normal((n_sims, n_games), dtype=np.float32) > threshold
+    wins = start + (home_wins.astype(np.float32) @ incidence).round().astype(np.int64)
+
+    # Seed = position within the team's conference, best record first
+    order = np.argsort(conference * (max_wins + 2) - wins - rng.random(wins.shape), axis=1)
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(n_teams), axis=1)
+    conference_start = np.searchsorted(np.sort(conference), conference)
+    seeds = ranks - conference_start
+
+    teams = np.arange(n_teams)
+    return {
+        "wins": np.bincount((teams * (max_wins + 1) + wins).ravel(),
+                            minlength=n_teams * (max_wins + 1)).reshape(n_teams, max_wins + 1),
+        "seeds": np.bincount((teams * n_teams + seeds).ravel(),
+                             minlength=n_teams * n_teams).reshape(n_teams, n_teams),
+    }
+
+def simulate(mu, sigma, home_index, away_index, base_wins, conference, n_sims,
+             jobs=None, seed=0, chunk_size=CHUNK_SIZE):
+    """Win-total and seed counts per team over n_sims simulated seasons,
+    with chunks of seasons spread over a process pool"""
+    n_teams = len(base_wins)
+    max_wins = int(base_wins.max() + np.bincount(np.concatenate([home_index, away_index]), minlength=n_teams).max())
+    threshold = (-mu / sigma).astype(np.float32)
+    sizes = [min(chunk_size, n_sims - done) for done in range(0, n_sims, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    totals = {"wins": np.zeros((n_teams, max_wins + 1), dtype=np.int64),
+              "seeds": np.zeros((n_teams, n_teams), dtype=np.int64)}
+    args = (threshold, home_index, away_index, base_wins, conference, max_wins)
+    with ProcessPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+        for counts in pool.map(simulate_chunk, seeds, sizes, *[[arg] * len(sizes) for arg in args]):
+            for name in totals:
+                totals[name] += counts[name]
+    return totals
+
+def win_percentile(histogram, q):
+    """Win total at quantile q of each team's win histogram"""
+    cumulative = histogram.cumsum(axis=1) / histogram.sum(axis=1, keepdims=True)
+    return (cumulative < q).sum(axis=1)
+
+def summarize(registry, conference, base_wins, totals):
+    """One row per team: current and projected wins, and seeding odds"""
+    wins, seeds = totals["wins"], totals["seeds"]
+    n_sims = wins[0].sum()
+    seed_odds = seeds / n_sims
+    summary = pd.DataFrame({
+        "team_id": registry.ids,
+        "abbreviation": [registry.by_id[team_id]["abbreviation"] for team_id in registry.ids],
+        "conference": np.where(conference == 0, "East", "West") if conference.any() else "League",
+        "wins": base_wins,
+        "mean_wins": (wins * np.arange(wins.shape[1])).sum(axis=1) / n_sims,
+        "wins_p10": win_percentile(wins, 0.1),
+        "wins_p50": win_percentile(wins, 0.5),
+        "wins_p90": win_percentile(wins, 0.9),
+        "top_seed": seed_odds[:, 0],
+        "playoffs": seed_odds[:, :PLAYOFF_SEEDS].sum(axis=1),
+        "play_in": seed_odds[:, PLAYOFF_SEEDS:PLAY_IN_SEEDS].sum(axis=1),
+    })
+    conference_size = np.bincount(conference).max()
+    for seed in range(conference_size):
+        summary[f"seed_{seed + 1}"] = seed_odds[:, seed]
+    return summary.sort_values(["conference", "mean_wins"], ascending=[True, False])
+
+def run_simulation(n_sims, season=None, as_of=None, jobs=None, seed=0):
+    """Simulate the rest of a season with the registered spread model"""
+    source = data_source()
+    registry = team_registry.load(source)
+    position = registry.position
+    with span("load"):
+        season, played, remaining = load_schedule(read_games(source), season, as_of)
+        history = pd.read_parquet(dataset_path("nba_ml_ready_with_spread"))
+        history = history[history["point_spread"].notna()]
+        if as_of is not None:
+            history = history[history["date"] <= pd.Timestamp(as_of)]
+
+    models = ModelRegistry()
+    with span("predict"):
+        features = spread_features(remaining, history)
+        mu, sigma = margin_distributions(models.get("spread"), features, models.features("spread"))
+
+    home_index = remaining["home_team_id"].map(position).to_numpy()
+    away_index = remaining["away_team_id"].map(position).to_numpy()
+    winners = np.where(played["home_win"].to_numpy(dtype=bool), played["home_team_id"], played["away_team_id"])
+    base_wins = np.bincount(pd.Series(winners).map(position).to_numpy(), minlength=len(registry.ids))
+    conference = conferences(registry)
+    with span("simulate"):
+        totals = simulate(mu, sigma, home_index, away_index, base_wins, conference, n_sims, jobs, seed)
+    return season, len(played), len(remaining), summarize(registry, conference, base_wins, totals)
+
+# Seeding odds for the rest of the season, e.g. `python lib/simulate_season.py --sims 100000`
+if __name__ == "__main__":
+    tracing.trace_script("simulate_season")
+    parser = argparse.ArgumentParser(description="Monte Carlo simulation of the remaining season")
+    parser.add_argument("--sims", type=int, default=100000)
+    parser.add_argument("--season", type=int, default=None, help="season to simulate (default: latest)")
+    parser.add_argument("--as-of", default=None, help="treat games after this date (YYYY-MM-DD) as unplayed")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=RESULTS_PATH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    season, n_played, n_remaining, summary = run_simulation(args.sims, args.season, args.as_of, args.jobs, args.seed)
+    pd.set_option("display.width", 200)
+    columns = ["abbreviation", "conference", "wins", "mean_wins", "wins_p10", "wins_p90",
+               "top_seed", "playoffs", "play_in"]
+    print(f"Season {season}: {n_played} games played, {n_remaining} remaining, {args.sims:,} simulations")
+    print(summary[columns].round(3).to_string(index=False))
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    summary.to_csv(args.output, index=False)
+    print(f"\nSaved to {args.output} in {time.perf_counter() - start:.1f}s")
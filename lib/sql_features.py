@@ -0,0 +1,237 @@
+import sys
+import duckdb
+import pandas as pd
+from table_reader import GAMES_SCHEMA
+
+DEFAULT_DB_PATH = "models/nba_local.duckdb"
+
+# Games with typed columns for the window queries below. Scores and results
+# are cast to DOUBLE so averages match pandas' float rolling means.
+BASE_GAMES = """
+    SELECT
+        id, season, CAST(date AS DATE) AS date, home_team_id, away_team_id,
+        home_score, away_score, home_win, CAST(season_type AS VARCHAR) AS season_type,
+        CAST(home_score AS DOUBLE) AS home_pts,
+        CAST(away_score AS DOUBLE) AS away_pts,
+        CAST(home_win AS DOUBLE) AS home_won,
+        CAST(home_score - away_score AS DOUBLE) AS spread
+    FROM games
+"""
+
+def rolling(stat, column, partition, window, min_periods=None, shift=0):
+    """SQL for pandas' groupby(partition)[column].shift(shift).rolling(window, min_periods).<stat>()
+
+    Rows are ordered by date within each partition. Like pandas, a window
+    only produces a value once it holds `min_periods` non-null values.
+    """
+    min_periods = window if min_periods is None else min_periods
+    end = f"{shift} PRECEDING" if shift else "CURRENT ROW"
+    frame = f"PARTITION BY {partition} ORDER BY date ROWS BETWEEN {window - 1 + shift} PRECEDING AND {end}"
+    return f"CASE WHEN COUNT({column}) OVER ({frame}) >= {min_periods} THEN {stat}({column}) OVER ({frame}) END"
+
+def days_since_last(partition):
+    return f"date_diff('day', LAG(date) OVER (PARTITION BY {partition} ORDER BY date), date)"
+
+WIN_FEATURES_SQL = f"""
+    WITH g AS ({BASE_GAMES}),
+    rolled AS (
+        SELECT *,
+            {rolling("AVG", "home_pts", "home_team_id", 10, 3)} AS home_avg_pts,
+            {rolling("AVG", "home_won", "home_team_id", 82, 6)} AS home_win_pct,
+            {rolling("AVG", "home_pts", "home_team_id", 10, 5)} AS home_pts_last_10,
+            {rolling("AVG", "away_pts", "home_team_id", 10, 5)} AS home_pts_allowed_last_10,
+            {rolling("AVG", "away_pts", "away_team_id", 10, 3)} AS away_avg_pts_scored,
+            {rolling("AVG", "home_pts", "away_team_id", 10, 3)} AS away_avg_pts_allowed,
+            {days_since_last("home_team_id")} AS home_days_since_last_game
+        FROM g
+    )
+    SELECT
+        id, season, date, home_team_id, away_team_id, home_score, away_score, home_win, season_type,
+        home_avg_pts, away_avg_pts_scored, away_avg_pts_allowed, home_win_pct,
+        home_pts_last_10 / home_pts_allowed_last_10 AS home_net_rating,
+        CAST(LEAST(GREATEST(home_days_since_last_game, 1), 10) AS DOUBLE) AS home_rest_days
+    FROM rolled
+    WHERE home_avg_pts IS NOT NULL AND away_avg_pts_allowed IS NOT NULL
+        AND home_score IS NOT NULL AND away_score IS NOT NULL
+    ORDER BY home_team_id, date
+"""
+
+SPREAD_FEATURES_SQL = f"""
+    WITH g AS (
+        SELECT * REPLACE (
+            CASE WHEN month(date) >= 10 THEN year(date) ELSE year(date) - 1 END AS season
+        )
+        FROM ({BASE_GAMES})
+    ),
+    rolled AS (
+        SELECT g.*,
+            home_adv.pace AS home_pace,
+            away_adv.pace AS away_pace,
+            {rolling("AVG", "home_pts", "home_team_id", 10, 3)} AS home_avg_pts,
+            {rolling("AVG", "home_pts", "home_team_id", 10)} AS home_pts_last_10,
+            {rolling("AVG", "away_pts", "home_team_id", 10)} AS home_pts_allowed_last_10,
+            {rolling("AVG", "spread", "home_team_id", 10, 3)} AS home_avg_margin,
+            {rolling("STDDEV_SAMP", "spread", "home_team_id", 20, 5)} AS home_margin_std,
+            {rolling("AVG", "home_pts", "away_team_id", 10, 3)} AS away_avg_pts_allowed,
+            {rolling("AVG", "away_pts", "away_team_id", 10)} AS away_pts_last_10,
+            {rolling("AVG", "home_pts", "away_team_id", 10)} AS away_pts_allowed_last_10,
+            {rolling("AVG", "spread", "away_team_id", 10, 3)} AS away_avg_margin,
+            {rolling("STDDEV_SAMP", "spread", "away_team_id", 20, 5)} AS away_margin_std,
+            {rolling("AVG", "spread", "home_team_id, away_team_id", 5, 2, shift=1)} AS h2h_avg_spread,
+            CAST(COALESCE({days_since_last("home_team_id")}, 7) AS DOUBLE) AS home_rest_days
+        FROM g
+        LEFT JOIN team_advanced_stats home_adv
+            ON home_adv.team_id = g.home_team_id AND home_adv.season = g.season
+        LEFT JOIN team_advanced_stats away_adv
+            ON away_adv.team_id = g.away_team_id AND away_adv.season = g.season
+    )
+    SELECT
+        id, season, date, home_team_id, away_team_id, home_score, away_score, home_win,
+        COALESCE(home_pace, AVG(home_pace) OVER ()) AS home_pace,
+        COALESCE(away_pace, AVG(away_pace) OVER ()) AS away_pace,
+        home_avg_pts, away_avg_pts_allowed,
+        COALESCE(home_pts_last_10 - home_pts_allowed_last_10, 0) AS home_net_rating,
+        COALESCE(away_pts_last_10 - away_pts_allowed_last_10, 0) AS away_net_rating,
+        home_score - away_score AS point_spread,
+        COALESCE(home_avg_margin, 0) AS home_avg_margin,
+        COALESCE(away_avg_margin, 0) AS away_avg_margin,
+        COALESCE(home_margin_std, 0) AS home_margin_std,
+        COALESCE(away_margin_std, 0) AS away_margin_std,
+        home_pace - away_pace AS pace_diff,
+        home_rest_days,
+        home_avg_margin * (1 + (home_rest_days - 3) * 0.02::DOUBLE) AS rest_adjusted_spread,
+        COALESCE(h2h_avg_spread, 0) AS h2h_avg_spread
+    FROM rolled
+    QUALIFY home_avg_pts IS NOT NULL AND away_avg_pts_allowed IS NOT NULL
+    ORDER BY home_team_id, date
+"""
+
+# Local versions of the Supabase stats functions, built from the training
+# feature definitions above (and feature_engineering_xgboost's for advanced
+# head-to-head) and read at the team's or matchup's latest completed game.
+# Where the training windows would still be empty they return no row, so
+# predict falls back to its defaults.
+def team_stats_sql(side, other):
+    team = f"{side}_team_id"
+    won = "home_won" if side == "home" else "1 - home_won"
+    return f"""
+        WITH g AS ({BASE_GAMES}),
+        rolled AS (
+            SELECT date,
+                {rolling("AVG", f"{side}_pts", team, 10, 3)} AS avg_pts,
+                {rolling("AVG", f"{other}_pts", team, 10, 3)} AS avg_pts_allowed,
+                {rolling("AVG", "won", team, 82, 6)} AS win_pct,
+                {rolling("AVG", f"{side}_pts", team, 10, 5)}
+                    / {rolling("AVG", f"{other}_pts", team, 10, 5)} AS home_net_rating
+            FROM (SELECT *, {won} AS won FROM g)
+            WHERE {team} = $team_id AND home_score IS NOT NULL AND away_score IS NOT NULL
+        )
+        SELECT avg_pts, avg_pts_allowed, win_pct, home_net_rating
+        FROM rolled
+        WHERE avg_pts IS NOT NULL AND avg_pts_allowed IS NOT NULL
+            AND win_pct IS NOT NULL AND home_net_rating IS NOT NULL
+        ORDER BY date DESC
+        LIMIT 1
+    """
+
+LOCAL_RPCS = {
+    "get_home_team_stats": team_stats_sql("home", "away"),
+    "get_away_team_stats": team_stats_sql("away", "home"),
+    "get_advanced_team_stats": """
+        SELECT off_rating, def_rating, net_rating, pace, ts_pct, efg_pct, plus_minus
+        FROM team_advanced_stats
+        WHERE team_id = $team_id_input
+        ORDER BY season DESC, id DESC
+        LIMIT 1
+    """,
+    "get_head_to_head_stats": """
+        SELECT COUNT(*) AS games_played, AVG(home_score - away_score) AS avg_point_diff
+        FROM games
+        WHERE home_team_id = $home_team_id AND away_team_id = $away_team_id
+            AND home_score IS NOT NULL AND away_score IS NOT NULL
+        HAVING COUNT(*) > 0
+    """,
+    # Each meeting takes each team's latest stats dated (mid-season, April
+    # 15) on or before it, as the merge_asof in the xgboost features does
+    "get_advanced_head_to_head_stats": f"""
+        WITH g AS ({BASE_GAMES}),
+        adv AS (
+            SELECT team_id, net_rating, make_date(season, 4, 15) AS date FROM team_advanced_stats
+        ),
+        meetings AS (
+            SELECT home_adv.net_rating - away_adv.net_rating AS netrtg_diff,
+                row_number() OVER (ORDER BY g.date DESC) AS n
+            FROM g
+            ASOF LEFT JOIN adv home_adv ON home_adv.team_id = g.home_team_id AND g.date >= home_adv.date
+            ASOF LEFT JOIN adv away_adv ON away_adv.team_id = g.away_team_id AND g.date >= away_adv.date
+            WHERE g.home_team_id = $home_team_id_input AND g.away_team_id = $away_team_id_input
+                AND g.home_score IS NOT NULL AND g.away_score IS NOT NULL
+        )
+        SELECT
+            AVG(netrtg_diff) FILTER (WHERE n <= 5) AS netrtg_last_5,
+            AVG(netrtg_diff) FILTER (WHERE n <= 10) AS netrtg_last_10,
+            AVG(netrtg_diff) FILTER (WHERE n <= 20) AS netrtg_last_20
+        FROM meetings
+        HAVING COUNT(netrtg_diff) FILTER (WHERE n <= 5) >= 3
+    """,
+}
+
+def connect(path=DEFAULT_DB_PATH):
+    return duckdb.connect(path)
+
+def replace_table(con, table, frame):
+    con.register("incoming", frame)
+    try:
+        con.execute(f"CREATE OR REPLACE TABLE {table} AS SELECT * FROM incoming")
+    finally:
+        con.unregister("incoming")
+
+def sync_tables(con, games, adv_stats):
+    """Replace the local copies of games and team_advanced_stats"""
+    for table, frame in [("games", games), ("team_advanced_stats", adv_stats)]:
+        replace_table(con, table, frame)
+
+def query_features(con, sql):
+    df = con.execute(sql).df()
+    df["date"] = pd.to_datetime(df["date"]).astype("datetime64[us]")
+    dtypes = {column: dtype for column, dtype in GAMES_SCHEMA.items() if column != "date"}
+    if "point_spread" in df.columns:
+        dtypes["point_spread"] = "Int64"
+    return df.astype({column: dtype for column, dtype in dtypes.items() if column in df.columns})
+
+def win_features(con):
+    """The nba_ml_ready feature set computed in the database"""
+    return query_features(con, WIN_FEATURES_SQL)
+
+def spread_features(con):
+    """The nba_ml_ready_with_spread feature set computed in the database"""
+    df = query_features(con, SPREAD_FEATURES_SQL)
+    df["season"] = df["season"].astype("int32")
+    return df
+
+# Build both feature sets in the local database, refreshing it first unless
+# it is already the configured data source (DATA_SOURCE=local)
+if __name__ == "__main__":
+    from data_access import data_source, LocalSource
+    from table_reader import read_games, read_advanced_stats
+    from feature_datasets import write_dataset
+    import tracing
+    from tracing import span
+
+    tracing.trace_script("sql_features")
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_PATH
+    source = data_source()
+    if isinstance(source, LocalSource) and source.path == path:
+        con = source.con
+    else:
+        con = connect(path)
+        games, adv_stats = read_games(source), read_advanced_stats(source)
+        with span("sync_tables"):
+            sync_tables(con, games, adv_stats)
+
+    for name, build in [("nba_ml_ready", win_features), ("nba_ml_ready_with_spread", spread_features)]:
+        with span(f"engineer:{name}"):
+            engineered_df = build(con)
+        with span(f"write_csv:{name}"):
+            engineered_df.to_csv(f"models/{name}.csv", index=False)
+        write_dataset(engineered_df, name)
@@ -0,0 +1,85 @@
+import pandas as pd
+from tracing import span
+
+PAGE_SIZE = 1000
+
+# Columns read from each table and the dtype each one is loaded as. Scores
+# and results use pandas' nullable types because scheduled games have none.
+TEAMS_SCHEMA = {
+    "id": "int64",
+    "name": "object",
+    "abbreviation": "object",
+}
+
+GAMES_SCHEMA = {
+    "id": "int64",
+    "season": "int64",
+    "date": "object",
+    "home_team_id": "int64",
+    "away_team_id": "int64",
+    "home_score": "Int64",
+    "away_score": "Int64",
+    "home_win": "boolean",
+    "season_type": "object",
+}
+
+ADVANCED_STATS_SCHEMA = {
+    "id": "int64",
+    "team_id": "int64",
+    "season": "int64",
+    "off_rating": "float64",
+    "def_rating": "float64",
+    "net_rating": "float64",
+    "pace": "float64",
+    "ts_pct": "float64",
+    "efg_pct": "float64",
+    "plus_minus": "float64",
+}
+
+def iter_pages(client, table, columns, key="id", page_size=PAGE_SIZE, filters=()):
+    """Yield a table's rows page by page using keyset pagination on `key`.
+
+    Each request asks for rows with key greater than the last one seen, so
+    pages stay consistent while rows are being added and no request is
+    capped by PostgREST's default row limit. `filters` is a list of
+    (operator, column, value) tuples such as ("gt", "date", "2024-01-01").
+    """
+    last_key = None
+    while True:
+        query = client.table(table).select(",".join(columns))
+        for operator, column, value in filters:
+            query = getattr(query, operator)(column, value)
+        if last_key is not None:
+            query = query.gt(key, last_key)
+        rows = query.order(key).limit(page_size).execute().data
+        if not rows:
+            return
+        yield rows
+        if len(rows) < page_size:
+            return
+        last_key = rows[-1][key]
+
+def read_table(client, table, schema, key="id", page_size=PAGE_SIZE, filters=()):
+    """Read the schema's columns of a table into a typed DataFrame.
+
+    Pages are converted to typed frames as they arrive, so only one page of
+    raw JSON rows is held in memory at a time.
+    """
+    columns = list(schema)
+    frames = [
+        pd.DataFrame.from_records(rows, columns=columns).astype(schema)
+        for rows in iter_pages(client, table, columns, key, page_size, filters)
+    ]
+    if not frames:
+        return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in schema.items()})
+    return pd.concat(frames, ignore_index=True)
+
+def read_games(source, since=None, page_size=PAGE_SIZE):
+    """All games, or only those played after `since` (YYYY-MM-DD), from a data source"""
+    filters = [("gt", "date", since)] if since else []
+    with span("fetch:games"):
+        return source.read_table("games", GAMES_SCHEMA, page_size=page_size, filters=filters)
+
+def read_advanced_stats(source, page_size=PAGE_SIZE):
+    with span("fetch:team_advanced_stats"):
+        return source.read_table("team_advanced_stats", ADVANCED_STATS_SCHEMA, page_size=page_size)
@@ -0,0 +1,159 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from datetime import datetime, timezone
+from table_reader import TEAMS_SCHEMA
+
+CACHE_PATH = "models/team_registry.json"
+MAX_AGE_HOURS = 24
+
+# Seconds between background refresh attempts, so a failing fetch is not
+# retried on every request
+REFRESH_RETRY_SECONDS = 60
+
+_loaded = {}
+_refreshing = set()
+_refresh_attempted = {}
+_refresh_lock = threading.Lock()
+
+def normalize_name(name):
+    """Case- and punctuation-insensitive team name key"""
+    return " ".join(name.lower().replace(".", "").split())
+
+class TeamRegistry:
+    """All teams with O(1) lookups by Supabase id, NBA API id, abbreviation and name"""
+
+    def __init__(self, teams, version, fetched_at):
+        self.teams = teams
+        self.version = version
+        self.fetched_at = datetime.fromisoformat(fetched_at)
+        self.by_id = {team["id"]: team for team in teams}
+        self.by_abbreviation = {team["abbreviation"]: team for team in teams}
+        self.by_name = {normalize_name(team["name"]): team for team in teams}
+        self.by_nba_id = {team["nba_id"]: team for team in teams if team.get("nba_id") is not None}
+        # Dense position of each Supabase id, for array-indexed features
+        self.ids = sorted(self.by_id)
+        self.position = {team_id: i for i, team_id in enumerate(self.ids)}
+
+    def has_id(self, team_id):
+        return team_id in self.by_id
+
+    def id_for_abbreviation(self, abbreviation):
+        team = self.by_abbreviation.get(abbreviation)
+        return team["id"] if team else None
+
+    def id_for_name(self, name):
+        team = self.by_name.get(normalize_name(name))
+        return team["id"] if team else None
+
+    def id_for_nba_id(self, nba_id):
+        team = self.by_nba_id.get(nba_id)
+        return team["id"] if team else None
+
+    def abbreviation_to_id(self):
+        return {abbreviation: team["id"] for abbreviation, team in self.by_abbreviation.items()}
+
+    def nba_to_supabase(self):
+        return {nba_id: team["id"] for nba_id, team in self.by_nba_id.items()}
+
+    def age_hours(self):
+        return (datetime.now(timezone.utc) - self.fetched_at).total_seconds() / 3600
+
+def attach_nba_ids(rows):
+    """Match Supabase teams to NBA API ids, by abbreviation and then by full name"""
+    try:
+        from nba_api.stats.static import teams as nba_teams
+    except ImportError:
+        return rows
+    
+    by_abbreviation = {row["abbreviation"]: row for row in rows}
+    by_name = {normalize_name(row["name"]): row for row in rows}
+    for nba_team in nba_teams.get_teams():
+        row = by_abbreviation.get(nba_team["abbreviation"]) or by_name.get(normalize_name(nba_team["full_name"]))
+        if row:
+            row["nba_id"] = nba_team["id"]
+        else:
+            print(f"Warning: Could not match NBA team {nba_team['full_name']} ({nba_team['abbreviation']})", file=sys.stderr)
+    return rows
+
+def fetch_registry(source):
+    """Build a registry from the 'teams' table of a data source"""
+    teams = source.read_table("teams", TEAMS_SCHEMA)
+    if teams.empty:
+        raise Exception("Error fetching teams: the teams table is empty")
+    
+    rows = attach_nba_ids(teams.to_dict("records"))
+    version = hashlib.sha256(json.dumps(rows, sort_keys=True).encode()).hexdigest()[:12]
+    return TeamRegistry(rows, version, datetime.now(timezone.utc).isoformat())
+
+def save_registry(registry, path=CACHE_PATH):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "version": registry.version,
+            "fetched_at": registry.fetched_at.isoformat(),
+            "teams": registry.teams,
+        }, f, indent=2)
+    os.replace(tmp_path, path)
+
+def read_registry(path=CACHE_PATH):
+    try:
+        with open(path) as f:
+            cached = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return TeamRegistry(cached["teams"], cached["version"], cached["fetched_at"])
+
+def load(source, path=CACHE_PATH, max_age_hours=MAX_AGE_HOURS, refresh=False):
+    """Return the team registry, fetching the teams table at most once.
+
+    The registry is memoised per process and cached on disk. The caller only
+    waits on the teams table when there is no copy at all or a refresh is
+    requested; a copy older than max_age_hours keeps being served while a
+    background thread replaces it.
+    """
+    registry = None if refresh else _loaded.get(path)
+    if registry is None and not refresh:
+        registry = read_registry(path)
+    if registry is None:
+        registry = fetch_registry(source)
+        save_registry(registry, path)
+    elif registry.age_hours() > max_age_hours:
+        refresh_in_background(source, path, max_age_hours)
+    _loaded[path] = registry
+    return registry
+
+def refresh_in_background(source, path=CACHE_PATH, max_age_hours=MAX_AGE_HOURS):
+    """Replace the memoised registry without blocking the caller.
+
+    A newer disk copy, written by another process such as an ingestion run,
+    is adopted without touching the network. On failure the old registry
+    stays in place and the next attempt waits REFRESH_RETRY_SECONDS.
+    """
+    with _refresh_lock:
+        now = time.monotonic()
+        if path in _refreshing or now - _refresh_attempted.get(path, -REFRESH_RETRY_SECONDS) < REFRESH_RETRY_SECONDS:
+            return
+        _refreshing.add(path)
+        _refresh_attempted[path] = now
+    
+    def refresh():
+        try:
+            registry = read_registry(path)
+            if registry is None or registry.age_hours() > max_age_hours:
+                registry = fetch_registry(source)
+                save_registry(registry, path)
+            _loaded[path] = registry
+        except Exception as e:
+            print(f"Error refreshing team registry: {str(e)}", file=sys.stderr)
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(path)
+    
+    threading.Thread(target=refresh, name="team-registry-refresh", daemon=True).start()
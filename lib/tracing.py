@@ -0,0 +1,150 @@
+import os
+import sys
+import time
+import atexit
+import bisect
+import threading
+
+# TRACE=1 traces every prediction request and pipeline script run. Without
+# it only requests that ask for a trace are timed; span() is then a lookup
+# and a shared no-op context manager.
+ENABLED = os.getenv("TRACE", "") not in ("", "0")
+
+# Upper bounds (ms) of the latency histogram buckets; the last is open-ended
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000]
+
+_local = threading.local()
+
+# Time spent before the first trace of the process (e.g. imports); it is
+# reported once, in the first trace
+_startup = []
+
+class Trace:
+    """Timed spans of one request or script run, in the order they started"""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.ended = None
+        self.depth = 0
+        self.spans = []
+        while _startup:
+            self.spans.append(_startup.pop(0))
+
+    def add(self, name, start, ms, depth):
+        self.spans.append({"name": name, "start_ms": round((start - self.started) * 1000, 3),
+                           "ms": round(ms, 3), "depth": depth})
+
+    def total_ms(self):
+        return ((self.ended or time.perf_counter()) - self.started) * 1000
+
+    def to_list(self):
+        return sorted(self.spans, key=lambda item: item["start_ms"])
+
+    def to_dict(self):
+        return {"total_ms": round(self.total_ms(), 3), "spans": self.to_list()}
+
+class Span:
+    __slots__ = ("trace", "name", "start")
+
+    def __init__(self, trace, name):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        self.trace.depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.depth -= 1
+        self.trace.add(self.name, self.start, (time.perf_counter() - self.start) * 1000, self.trace.depth)
+        return False
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+NULL_SPAN = NullSpan()
+
+def span(name):
+    """Time a block as one stage of the current trace; does nothing when no trace is active"""
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        return NULL_SPAN
+    return Span(trace, name)
+
+def begin(name, force=False):
+    """Start a trace on this thread if tracing is on (or forced); returns it or None"""
+    if not (ENABLED or force):
+        return None
+    trace = Trace(name)
+    _local.trace = trace
+    return trace
+
+def finish():
+    """End this thread's trace and return it"""
+    trace = getattr(_local, "trace", None)
+    _local.trace = None
+    if trace is not None:
+        trace.ended = time.perf_counter()
+    return trace
+
+def record_startup(name, start):
+    """Note a stage that ran before any trace began, such as module imports"""
+    _startup.append({"name": name, "start_ms": 0.0,
+                     "ms": round((time.perf_counter() - start) * 1000, 3), "depth": 0})
+
+def summary(trace):
+    lines = [f"{trace.name}: {trace.total_ms():.1f} ms"]
+    for item in trace.to_list():
+        lines.append(f"{'  ' * (item['depth'] + 1)}{item['name']:<{44 - 2 * item['depth']}}{item['ms']:>10.1f} ms")
+    return "\n".join(lines)
+
+def trace_script(name):
+    """Trace a pipeline or training script run and print its spans to stderr at exit"""
+    trace = begin(name)
+    if trace is not None:
+        atexit.register(lambda: print(summary(trace), file=sys.stderr))
+    return trace
+
+class LatencyHistograms:
+    """Per-stage latency histograms aggregated over many traces"""
+
+    def __init__(self, buckets_ms=BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    def observe(self, stage, ms):
+        with self.lock:
+            hist = self.stages.get(stage)
+            if hist is None:
+                hist = self.stages[stage] = {"count": 0, "sum_ms": 0.0, "max_ms": 0.0,
+                                             "buckets": [0] * (len(self.buckets_ms) + 1)}
+            hist["count"] += 1
+            hist["sum_ms"] += ms
+            hist["max_ms"] = max(hist["max_ms"], ms)
+            hist["buckets"][bisect.bisect_left(self.buckets_ms, ms)] += 1
+
+    def observe_trace(self, trace):
+        """Add a finished trace: its total under the trace name and each span under its own"""
+        self.observe(trace.name, trace.total_ms())
+        for item in trace.spans:
+            self.observe(item["name"], item["ms"])
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "buckets_ms": self.buckets_ms,
+                "stages": {
+                    stage: {**hist, "sum_ms": round(hist["sum_ms"], 3), "max_ms": round(hist["max_ms"], 3),
+                            "buckets": list(hist["buckets"])}
+                    for stage, hist in self.stages.items()
+                },
+            }
@@ -2,16 +2,14 @@ import pandas as pd
 from sklearn.ensemble import GradientBoostingRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, r2_score
-import joblib
+import sys
 from datetime import datetime
+sys.path.insert(0, "lib")
+from model_params import tuned_params
+import tracing
+from tracing import span
 
-def train_spread_model():
-    # Load engineered data
-    df = pd.read_csv("models/nba_ml_ready_with_spread.csv")
-    
-    # Ensure the date column is in datetime format
-    df['date'] = pd.to_datetime(df['date'])
-    
+def train_spread_model(seasons=None):
     # Define spread-specific features
     features = [
         # Core metrics
@@ -37,6 +35,17 @@ def train_spread_model():
         'away_avg_pts_allowed'
     ]
     
+    # Load engineered data, reading only the needed columns and seasons
+    with span("load"):
+        df = pd.read_parquet(
+            "models/datasets/nba_ml_ready_with_spread",
+            columns=['date', 'point_spread'] + features,
+            filters=[("season", "in", seasons)] if seasons else None
+        )
+    
+    # Ensure the date column is in datetime format
+    df['date'] = pd.to_datetime(df['date'])
+    
     # Target is the actual point spread
     X = df[features]
     y = df['point_spread']
@@ -49,19 +58,15 @@ def train_spread_model():
     y_train, y_test = y[train_mask], y[~train_mask]
     
     # Train model with hyperparameters tuned for spread prediction
-    model = GradientBoostingRegressor(
-        n_estimators=300,
-        learning_rate=0.05,
-        max_depth=4,
-        min_samples_leaf=5,
-        subsample=0.8,
-        random_state=42
-    )
+    # (`python lib/optimize.py spread` writes the tuned ones)
+    model = GradientBoostingRegressor(**tuned_params("spread"), random_state=42)
     
-    model.fit(X_train, y_train)
+    with span("fit"):
+        model.fit(X_train, y_train)
     
     # Evaluate
-    predictions = model.predict(X_test)
+    with span("evaluate"):
+        predictions = model.predict(X_test)
     mae = mean_absolute_error(y_test, predictions)
     r2 = r2_score(y_test, predictions)
     
@@ -78,9 +83,12 @@ def train_spread_model():
     }).sort_values('importance', ascending=False)
     print(importance)
     
-    # Save model
-    joblib.dump(model, "models/spread_predictor.joblib")
+    # Save model atomically, then record the new version in the model registry
+    from model_registry import publish, register
+    with span("save"):
+        publish(model, "models/spread_predictor.joblib")
     print("\nModel saved to models/spread_predictor.joblib")
+    register("spread", "models/spread_predictor.joblib", features, {"mae": mae, "r2": r2})
     
     # Optional: Save sample predictions for analysis
     test_results = X_test.copy()
@@ -90,4 +98,6 @@ def train_spread_model():
     test_results[['date', 'actual', 'predicted']].to_csv("models/spread_test_results.csv", index=False)
 
 if __name__ == "__main__":
+    # TRACE=1 prints how long each stage took
+    tracing.trace_script("train_spread_model")
     train_spread_model()
\ No newline at end of file
@@ -3,9 +3,17 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score
 from sklearn.metrics import classification_report, roc_auc_score, confusion_matrix
+import sys
+sys.path.insert(0, "lib")
+from model_params import tuned_params
+import tracing
+from tracing import span
 
-# Load engineered data
-df = pd.read_csv("models/nba_ml_ready.csv")
+# TRACE=1 prints how long each stage took
+tracing.trace_script("train_win_model")
+
+# Seasons to train on (None = all); other season partitions are never read
+SEASONS = None
 
 # Define features/target
 features = [
@@ -16,23 +24,26 @@ features = [
     "home_net_rating", 
     "home_rest_days", 
 ]
+
+# Load engineered data, reading only the feature and target columns
+with span("load"):
+    df = pd.read_parquet(
+        "models/datasets/nba_ml_ready",
+        columns=features + ["home_win"],
+        filters=[("season", "in", SEASONS)] if SEASONS else None
+    )
+
 X = df[features]
 y = df["home_win"]
 
 # Split data
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-# Train model
-hyperparameters = {
-    "n_estimators": 196,
-    "max_depth": 22,
-    "min_samples_split": 15,
-    "min_samples_leaf": 7,
-    "max_features": None,
-    "random_state": 42
-}
+# Train model, with the best parameters from `python lib/optimize.py win` if tuned
+hyperparameters = {**tuned_params("win"), "random_state": 42}
 model = RandomForestClassifier(**hyperparameters)
-model.fit(X_train, y_train)
+with span("fit"):
+    model.fit(X_train, y_train)
 
 # Log feature importance
 print("Feature Importances:")
@@ -40,7 +51,8 @@ for feature, importance in zip(features, model.feature_importances_):
     print(f"{feature}: {importance:.4f}")
 
 # Evaluate
-predictions = model.predict(X_test)
+with span("evaluate"):
+    predictions = model.predict(X_test)
 print(f"Accuracy: {accuracy_score(y_test, predictions):.2%}")
 
 # Add after your accuracy print:
@@ -52,9 +64,21 @@ print(f"\nROC AUC: {roc_auc_score(y_test, model.predict_proba(X_test)[:,1]):.2%}
 print("\nConfusion Matrix:")
 print(confusion_matrix(y_test, predictions))
 
-# Save model
-import joblib
-joblib.dump(model, "models/nba_win_predictor.joblib")
+# Save model atomically, so a running predictor never reads a partial file
+from model_registry import publish, register
+with span("save"):
+    publish(model, "models/nba_win_predictor.joblib")
+
+# Refresh the memory-mapped copy predict.py serves from
+from compiled_forest import compile_model_file
+with span("compile"):
+    compile_model_file("models/nba_win_predictor.joblib")
+
+# Record the new version last; running predictors reload when it changes
+register("win_basic", "models/nba_win_predictor.joblib", features, {
+    "accuracy": accuracy_score(y_test, predictions),
+    "roc_auc": roc_auc_score(y_test, model.predict_proba(X_test)[:,1]),
+})
 
 # Visualize feature importance
 import matplotlib.pyplot as plt
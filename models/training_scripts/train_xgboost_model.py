@@ -3,12 +3,19 @@ import xgboost as xgb
 from sklearn.model_selection import train_test_split, GridSearchCV
 from sklearn.metrics import accuracy_score, classification_report, roc_auc_score
 from sklearn.preprocessing import LabelEncoder
-import joblib
+import sys
 import warnings
 warnings.filterwarnings('ignore')
+sys.path.insert(0, "lib")
+from model_params import tuned_params, EARLY_STOPPING_ROUNDS
+import tracing
+from tracing import span
 
-# Load engineered data
-df = pd.read_csv("models/nba_ml_ready2.csv")
+# TRACE=1 prints how long each stage took
+tracing.trace_script("train_xgboost_model")
+
+# Seasons to train on (None = all); other season partitions are never read
+SEASONS = None
 
 # Define features/target (same as before)
 features = [
@@ -40,6 +47,14 @@ features = [
     "h2h_netrtg_last_20"
 ]
 
+# Load engineered data, reading only the feature and target columns
+with span("load"):
+    df = pd.read_parquet(
+        "models/datasets/nba_ml_ready2",
+        columns=features + ["home_win"],
+        filters=[("season", "in", SEASONS)] if SEASONS else None
+    )
+
 X = df[features]
 y = df["home_win"]
 
@@ -51,29 +66,24 @@ X_train, X_test, y_train, y_test = train_test_split(
     stratify=y  # Maintain class balance
 )
 
-# Basic XGBoost model with reasonable defaults
+# Reasonable defaults, overridden by `python lib/optimize.py xgboost` once tuned
+hyperparameters = tuned_params("xgboost")
 model = xgb.XGBClassifier(
     objective='binary:logistic',
-    n_estimators=300,
-    max_depth=6,
-    learning_rate=0.05,
-    subsample=0.8,
-    colsample_bytree=0.8,
-    gamma=0.1,
-    reg_alpha=0.1,
-    reg_lambda=1.0,
+    **hyperparameters,
     random_state=42,
     eval_metric='logloss',
-    early_stopping_rounds=20,
+    early_stopping_rounds=EARLY_STOPPING_ROUNDS,
     use_label_encoder=False
 )
 
 # Fit with early stopping
-model.fit(
-    X_train, y_train,
-    eval_set=[(X_test, y_test)],
-    verbose=True
-)
+with span("fit"):
+    model.fit(
+        X_train, y_train,
+        eval_set=[(X_test, y_test)],
+        verbose=True
+    )
 
 # Feature importance
 print("\nFeature Importances:")
@@ -85,17 +95,24 @@ print(importance)
 
 # Evaluation
 print("\nEvaluation Metrics:")
-y_pred = model.predict(X_test)
-y_pred_proba = model.predict_proba(X_test)[:, 1]
+with span("evaluate"):
+    y_pred = model.predict(X_test)
+    y_pred_proba = model.predict_proba(X_test)[:, 1]
 
 print(f"Accuracy: {accuracy_score(y_test, y_pred):.2%}")
 print(f"ROC AUC: {roc_auc_score(y_test, y_pred_proba):.2%}")
 print("\nClassification Report:")
 print(classification_report(y_test, y_pred))
 
-# Save model
-joblib.dump(model, "models/nba_xgboost_win_predictor.joblib")
+# Save model atomically, then record the new version in the model registry
+from model_registry import publish, register
+with span("save"):
+    publish(model, "models/nba_xgboost_win_predictor.joblib")
 print("\nModel saved to models/nba_xgboost_win_predictor.joblib")
+register("win_xgboost", "models/nba_xgboost_win_predictor.joblib", features, {
+    "accuracy": accuracy_score(y_test, y_pred),
+    "roc_auc": roc_auc_score(y_test, y_pred_proba),
+})
 
 # Optional: Save feature importance plot
 import matplotlib.pyplot as plt
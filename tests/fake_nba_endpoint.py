@@ -0,0 +1,106 @@
+"""Local stand-in for the two stats.nba.com endpoints get_advanced_stats calls.
+
+Serves LeagueDashTeamStats-like rows at /league?season=2024-25 and a
+TeamDashboardByGeneralSplits-like row at /dashboard?team_id=...&season=...
+Failures are injected per request key, e.g. {"dashboard 1610612737 2024-25":
+[429, 500]} answers the first two calls for that team season with those
+statuses. Every request is logged with its arrival time and status, along
+with the most requests in flight at once.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import pandas as pd
+import requests
+
+class FakeNbaEndpoint:
+    def __init__(self, team_ids, failures=None, latency=0.02):
+        self.team_ids = list(team_ids)
+        self.failures = {key: list(statuses) for key, statuses in (failures or {}).items()}
+        self.latency = latency
+        self.log = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def requests_for(self, key):
+        return [entry for entry in self.log if entry["key"] == key]
+
+    def respond(self, path, query):
+        """Status and JSON body for one request, applying any injected failure"""
+        season = query["season"][0]
+        if path == "/league":
+            key = f"league {season}"
+            body = {"rows": [
+                {"TEAM_ID": team_id, "OFF_RATING": 115.0, "DEF_RATING": 112.0,
+                 "NET_RATING": 3.0, "PACE": 99.0}
+                for team_id in self.team_ids
+            ]}
+        elif path == "/dashboard":
+            team_id = int(query["team_id"][0])
+            key = f"dashboard {team_id} {season}"
+            body = {"row": {
+                "PTS": 112, "FGA": 88, "FTA": 22, "FGM": 41, "FG3M": 13, "AST": 26, "TOV": 13,
+                "OREB": 10, "DREB": 34, "W_PCT": 0.55, "PLUS_MINUS": 2.5, "FG_PCT": 0.47,
+                "FG3_PCT": 0.36, "FT_PCT": 0.78, "STL": 8, "BLK": 5, "MIN": 48,
+            }}
+        else:
+            return None, 404, {}
+        with self.lock:
+            pending = self.failures.get(key)
+            status = pending.pop(0) if pending else 200
+        return key, status, body if status == 200 else {"error": "injected"}
+
+    def handler(self):
+        endpoint = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                arrived = time.monotonic()
+                with endpoint.lock:
+                    endpoint.in_flight += 1
+                    endpoint.max_in_flight = max(endpoint.max_in_flight, endpoint.in_flight)
+                try:
+                    url = urlparse(self.path)
+                    key, status, body = endpoint.respond(url.path, parse_qs(url.query))
+                    time.sleep(endpoint.latency)
+                    with endpoint.lock:
+                        endpoint.log.append({"key": key, "status": status, "at": arrived})
+                    payload = json.dumps(body).encode()
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(payload)))
+                    self.end_headers()
+                    self.wfile.write(payload)
+                finally:
+                    with endpoint.lock:
+                        endpoint.in_flight -= 1
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    # Fetch functions with the signatures fetch_team_stats_rows injects
+
+    def fetch_league(self, season_str):
+        response = requests.get(f"{self.url}/league", params={"season": season_str}, timeout=5)
+        response.raise_for_status()
+        return pd.DataFrame(response.json()["rows"])
+
+    def fetch_dashboard(self, team_id, season_str):
+        response = requests.get(f"{self.url}/dashboard", params={"team_id": team_id, "season": season_str}, timeout=5)
+        response.raise_for_status()
+        return pd.Series(response.json()["row"])
@@ -0,0 +1,63 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+import pandas as pd
+import pytest
+from data_access import LocalSource
+from table_reader import read_games, GAMES_SCHEMA
+import data_entering
+from data_entering import write_games_batch
+
+def batch(*games):
+    """Prepared games rows, as prepare_games returns them"""
+    df = pd.DataFrame(games, columns=["season", "date", "home_team_id", "away_team_id", "home_score", "away_score"])
+    df = df.astype({"home_score": "Int64", "away_score": "Int64"})
+    df["home_win"] = (df["home_score"] > df["away_score"]).astype("boolean")
+    return df
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    source = LocalSource(str(tmp_path / "nba.duckdb"))
+    monkeypatch.setattr(data_entering, "source", source)
+    existing = batch(
+        (2024, "2024-11-01", 1, 2, 110, 100),
+        (2024, "2024-11-01", 3, 4, None, None),
+        (2024, "2024-11-02", 2, 1, None, None),
+    )
+    existing.insert(0, "id", [1, 2, 3])
+    source.replace_table("games", existing.assign(season_type="Regular Season").astype(GAMES_SCHEMA))
+    return source
+
+def test_new_changed_and_unchanged_games_are_told_apart(source):
+    counts = write_games_batch(batch(
+        (2024, "2024-11-01", 1, 2, 110, 100),   # Unchanged
+        (2024, "2024-11-01", 3, 4, 99, 101),    # Now scored
+        (2024, "2024-11-02", 2, 1, None, None), # Still unscored
+        (2024, "2024-11-03", 1, 3, None, None), # New
+    ))
+    assert counts == {"inserted": 1, "updated": 1, "skipped": 2}
+
+    games = read_games(source).set_index(["date", "home_team_id", "away_team_id"]).sort_index()
+    assert len(games) == 4
+    assert games.loc[("2024-11-01", 3, 4), ["home_score", "away_score", "home_win"]].tolist() == [99, 101, False]
+    assert sorted(games["id"]) == [1, 2, 3, 4]
+
+def test_rerunning_a_batch_writes_nothing(source):
+    rows = batch(
+        (2024, "2024-11-01", 1, 2, 110, 100),
+        (2024, "2024-11-01", 3, 4, None, None),
+        (2024, "2024-11-02", 2, 1, None, None),
+    )
+    assert write_games_batch(rows) == {"inserted": 0, "updated": 0, "skipped": 3}
+    assert len(read_games(source)) == 3
+
+def test_games_are_matched_on_date_and_both_teams(source):
+    # Same teams on another day, and the reverse fixture on the same day
+    counts = write_games_batch(batch(
+        (2024, "2024-11-05", 1, 2, None, None),
+        (2024, "2024-11-01", 2, 1, None, None),
+    ))
+    assert counts == {"inserted": 2, "updated": 0, "skipped": 0}
+    assert len(read_games(source)) == 5
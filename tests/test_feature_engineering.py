@@ -0,0 +1,100 @@
+import os
+import sys
+import json
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "lib"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import pandas as pd
+import pytest
+from synthetic_league import league, write_local_db
+from data_access import LocalSource
+import feature_engineering
+
+FEATURES = ["home_avg_pts", "away_avg_pts_scored", "away_avg_pts_allowed",
+            "home_win_pct", "home_net_rating", "home_rest_days"]
+
+@pytest.fixture
+def league_db(tmp_path, monkeypatch):
+    """A synthetic league in a local database, with models/ under tmp_path.
+
+    Returns the final games and a function that rewrites the games table as
+    it looked on a given day: games after it, or listed as postponed, have
+    no score yet.
+    """
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("models")
+    teams, games, adv_stats = league(2, teams=10)
+    path = str(tmp_path / "nba.duckdb")
+    write_local_db(path, teams, games, adv_stats)
+    source = LocalSource(path)
+    monkeypatch.setattr(feature_engineering, "source", source)
+
+    def as_of(day, postponed=()):
+        state = games.copy()
+        unplayed = (state["date"] > day) | state["id"].isin(postponed)
+        state.loc[unplayed, ["home_score", "away_score", "home_win"]] = pd.NA
+        source.replace_table("games", state)
+
+    return games, as_of
+
+def read_outputs():
+    csv = pd.read_csv(feature_engineering.OUTPUT_PATH)
+    dataset = pd.read_parquet("models/datasets/nba_ml_ready")
+    with open(feature_engineering.CHECKPOINT_PATH) as f:
+        checkpoint = json.load(f)
+    return csv, dataset, checkpoint
+
+def test_incremental_runs_match_a_full_rebuild(league_db):
+    games, as_of = league_db
+    days = sorted(games["date"].unique())
+    first, second = days[len(days) * 3 // 5], days[len(days) * 4 // 5]
+    # A game on the watermark day is still being played at the first run
+    late = games.loc[games["date"] == first, "id"].iloc[-1]
+
+    as_of(first, postponed=[late])
+    feature_engineering.run_full()
+    as_of(second)
+    feature_engineering.run_incremental()
+    as_of(days[-1])
+    feature_engineering.run_incremental()
+    feature_engineering.run_incremental()
+
+    csv, dataset, _ = read_outputs()
+    full = feature_engineering.engineer_features(feature_engineering.fetch_games())
+    assert not csv["id"].duplicated().any()
+    assert not dataset["id"].duplicated().any()
+    assert late in set(csv["id"])
+    assert set(csv["id"]) == set(full["id"]) == set(dataset["id"])
+    pd.testing.assert_frame_equal(
+        csv.set_index("id").sort_index()[FEATURES],
+        full.set_index("id").sort_index()[FEATURES].astype(float),
+        check_exact=False, rtol=1e-12,
+    )
+
+def test_postponed_game_is_picked_up_once_without_stalling(league_db):
+    games, as_of = league_db
+    days = sorted(games["date"].unique())
+    first = days[len(days) * 3 // 4]
+    second = days[len(days) * 3 // 4 + 10]
+    # Postponed a few days before the first run, so still within PENDING_DAYS at the second
+    postponed = games.loc[games["date"] < first, "id"].iloc[-10]
+
+    as_of(first, postponed=[postponed])
+    feature_engineering.run_full()
+    as_of(second, postponed=[postponed])
+    feature_engineering.run_incremental()
+    _, _, checkpoint = read_outputs()
+    assert checkpoint["watermark"] == second
+    assert str(postponed) in checkpoint["pending"]
+
+    as_of(days[-1])
+    feature_engineering.run_incremental()
+    feature_engineering.run_incremental()
+    csv, dataset, checkpoint = read_outputs()
+    assert checkpoint["watermark"] == days[-1]
+    assert str(postponed) not in checkpoint["pending"]
+    assert (csv["id"] == postponed).sum() == 1
+    assert not csv["id"].duplicated().any()
+    assert not dataset["id"].duplicated().any()
@@ -0,0 +1,29 @@
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "lib"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import pandas as pd
+from synthetic_league import league
+from feature_engineering_xgboost import engineer_features
+
+STATS = ["off_rating", "def_rating", "net_rating", "pace"]
+
+def test_advanced_stats_land_on_their_own_games():
+    _, games, adv_stats = league(3, teams=8)
+    features = engineer_features(games, adv_stats=adv_stats)
+
+    # The latest season stats dated on or before each game, looked up directly
+    adv_stats = adv_stats.assign(date=pd.to_datetime(adv_stats["season"].astype(str) + "-04-15"))
+    for side in ["home", "away"]:
+        expected = pd.merge_asof(
+            features[["date", f"{side}_team_id"]].reset_index().sort_values("date"),
+            adv_stats.sort_values("date"),
+            on="date", left_by=f"{side}_team_id", right_by="team_id",
+        ).set_index("index").loc[features.index]
+        for stat in STATS:
+            pd.testing.assert_series_equal(
+                features[f"{side}_{stat}"], expected[stat], check_names=False,
+            )
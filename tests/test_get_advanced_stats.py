@@ -0,0 +1,75 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+from nba_api.stats.static import teams
+import rate_limit
+from get_advanced_stats import fetch_team_stats_rows, season_string
+from fake_nba_endpoint import FakeNbaEndpoint
+
+NBA_TEAM_IDS = [team["id"] for team in teams.get_teams()[:4]]
+TEAM_MAP = {nba_id: i + 1 for i, nba_id in enumerate(NBA_TEAM_IDS)}
+SEASONS = [2024, 2023]
+
+def fetch_rows(endpoint, **kwargs):
+    return fetch_team_stats_rows(
+        TEAM_MAP, SEASONS, fetch_league=endpoint.fetch_league,
+        fetch_dashboard=endpoint.fetch_dashboard, **kwargs,
+    )
+
+def test_retries_429s_and_errors_until_every_row_is_fetched():
+    team = NBA_TEAM_IDS[0]
+    failures = {
+        "league 2024-25": [429],
+        f"dashboard {team} 2023-24": [500, 429],
+    }
+    with FakeNbaEndpoint(NBA_TEAM_IDS, failures) as endpoint:
+        rows = fetch_rows(endpoint, rate=50.0, max_workers=3, retry_delay=0.01)
+
+    assert sorted((row["team_id"], row["season"]) for row in rows) == sorted(
+        (team_id, season) for team_id in TEAM_MAP.values() for season in SEASONS
+    )
+    assert [r["status"] for r in endpoint.requests_for("league 2024-25")] == [429, 200]
+    assert [r["status"] for r in endpoint.requests_for(f"dashboard {team} 2023-24")] == [500, 429, 200]
+    assert endpoint.max_in_flight <= 3
+
+def test_backoff_doubles_between_attempts(monkeypatch):
+    # Take the top of each jitter range so the delays are deterministic
+    monkeypatch.setattr(rate_limit.random, "uniform", lambda low, high: high)
+    key = f"dashboard {NBA_TEAM_IDS[1]} 2024-25"
+    with FakeNbaEndpoint(NBA_TEAM_IDS, {key: [429, 429, 503]}) as endpoint:
+        rows = fetch_rows(endpoint, rate=100.0, retry_delay=0.05)
+
+    assert len(rows) == len(TEAM_MAP) * len(SEASONS)
+    attempts = [r["at"] for r in endpoint.requests_for(key)]
+    gaps = [later - earlier for earlier, later in zip(attempts, attempts[1:])]
+    assert len(gaps) == 3
+    for gap, delay in zip(gaps, [0.05, 0.1, 0.2]):
+        assert gap >= delay
+
+def test_gives_up_on_a_call_after_the_last_attempt():
+    key = f"dashboard {NBA_TEAM_IDS[2]} 2024-25"
+    with FakeNbaEndpoint(NBA_TEAM_IDS, {key: [429] * 4}) as endpoint:
+        rows = fetch_rows(endpoint, rate=100.0, retry_delay=0.01)
+
+    assert len(endpoint.requests_for(key)) == 4
+    assert (TEAM_MAP[NBA_TEAM_IDS[2]], 2024) not in {(row["team_id"], row["season"]) for row in rows}
+    assert len(rows) == len(TEAM_MAP) * len(SEASONS) - 1
+
+def test_requests_including_retries_stay_under_the_rate_limit():
+    rate = 5.0
+    failures = {f"dashboard {team_id} 2024-25": [429] for team_id in NBA_TEAM_IDS}
+    with FakeNbaEndpoint(NBA_TEAM_IDS, failures, latency=0.0) as endpoint:
+        fetch_rows(endpoint, rate=rate, max_workers=8, retry_delay=0.0)
+
+    # Two league calls, eight dashboards and four retries, all through one bucket
+    times = sorted(r["at"] for r in endpoint.log)
+    assert len(times) == 14
+    capacity = rate  # The bucket's default burst
+    assert times[-1] - times[0] >= (len(times) - capacity) / rate * 0.95
+    for i, start in enumerate(times):
+        for j in range(i, len(times)):
+            window = times[j] - start
+            # Small slack for the time between taking a token and the request arriving
+            assert j - i + 1 <= capacity + rate * (window + 0.01)
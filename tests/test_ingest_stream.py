@@ -0,0 +1,50 @@
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+from data_entering import parse_schedule
+from ingest_stream import ScheduleParser, schedule_frame
+
+def game(gid, gcode, home, away, home_score="", away_score=""):
+    return {"gid": gid, "gcode": gcode, "h": {"ta": home, "s": home_score}, "v": {"ta": away, "s": away_score}}
+
+# Real schedule ids and gcodes: the gcode is the date and the away and home
+# team codes, and the id's 001 / 002 prefix marks preseason / regular season
+SCHEDULE = {"lscd": [
+    {"mscd": {"mon": "October", "g": [
+        game("0012400005", "20241006/PHXPOR", "POR", "PHX"),
+        game("0012400041", "20241018/BKNPHI", "PHI", "BKN"),
+        game("0022400061", "20241025/PHIMIL", "MIL", "PHI", "124", "109"),
+        game("0022400070", "20241026/LALPHX", "PHX", "LAL", "118", "114"),
+        game("0022400077", "20241027/PORNOP", "NOP", "POR", "105", "103"),
+    ]}},
+    {"mscd": {"mon": "November", "g": [
+        game("0022400101", "20241101/BOSCHA", "CHA", "BOS", "109", "124"),
+    ]}},
+]}
+
+REGULAR_SEASON = ["0022400061", "0022400070", "0022400077", "0022400101"]
+
+def test_team_codes_with_p_are_not_preseason():
+    games = [g for month in SCHEDULE["lscd"] for g in month["mscd"]["g"]]
+    frame, preseason = schedule_frame(games, 2024)
+
+    assert frame["game_id"].tolist() == REGULAR_SEASON
+    assert preseason == 2
+    assert frame.loc[0, ["date", "home_team", "away_team"]].tolist() == ["2024-10-25", "MIL", "PHI"]
+
+def test_streamed_games_match_parse_schedule():
+    data = json.dumps(SCHEDULE).encode()
+    parser, games = ScheduleParser(), []
+    for i in range(0, len(data), 50):
+        games += parser.feed(data[i:i + 50])
+    parser.close()
+
+    frame, _ = schedule_frame(games, 2024)
+    expected = parse_schedule(SCHEDULE, 2024)
+    assert expected["game_id"].tolist() == REGULAR_SEASON
+    assert (expected["season_type"] == "Regular Season").all()
+    for column in ["game_id", "date", "home_team", "away_team", "home_score", "away_score"]:
+        assert frame[column].tolist() == expected[column].tolist()
@@ -0,0 +1,57 @@
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "lib"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import numpy as np
+import pandas as pd
+import pytest
+from synthetic_league import league, write_local_db
+from data_access import LocalSource
+import sql_features
+
+@pytest.fixture(scope="module")
+def local(tmp_path_factory):
+    teams, games, adv_stats = league(3, teams=10, seed=1)
+    path = str(tmp_path_factory.mktemp("rpc") / "nba.duckdb")
+    write_local_db(path, teams, games, adv_stats)
+    return LocalSource(path), teams, games, adv_stats
+
+def test_team_stats_match_the_training_features_at_the_latest_game(local):
+    source, teams, _, _ = local
+    features = sql_features.win_features(source.con).sort_values("date")
+    for team_id in teams["id"].tolist():
+        home = features[features["home_team_id"] == team_id].iloc[-1]
+        stats = source.rpc("get_home_team_stats", {"team_id": team_id})
+        assert np.isclose(stats["avg_pts"], home["home_avg_pts"])
+        assert np.isclose(stats["win_pct"], home["home_win_pct"])
+        assert np.isclose(stats["home_net_rating"], home["home_net_rating"])
+
+        away = features[features["away_team_id"] == team_id].iloc[-1]
+        stats = source.rpc("get_away_team_stats", {"team_id": team_id})
+        assert np.isclose(stats["avg_pts"], away["away_avg_pts_scored"])
+        assert np.isclose(stats["avg_pts_allowed"], away["away_avg_pts_allowed"])
+
+def test_advanced_head_to_head_matches_the_xgboost_features(local):
+    source, _, games, adv_stats = local
+    # Net ratings as feature_engineering_xgboost merges them onto each game
+    adv_stats = adv_stats.assign(date=pd.to_datetime(adv_stats["season"].astype(str) + "-04-15"))
+    games = games.assign(date=pd.to_datetime(games["date"])).sort_values("date")
+    for side in ["home", "away"]:
+        merged = pd.merge_asof(games, adv_stats.sort_values("date"), on="date",
+                               left_by=f"{side}_team_id", right_by="team_id")
+        games[f"{side}_net_rating"] = merged["net_rating"].to_numpy()
+    games["netrtg_diff"] = games["home_net_rating"] - games["away_net_rating"]
+
+    for (home, away), meetings in games.groupby(["home_team_id", "away_team_id"]):
+        stats = source.rpc("get_advanced_head_to_head_stats",
+                           {"home_team_id_input": int(home), "away_team_id_input": int(away)})
+        for window in [5, 10, 20]:
+            # The shifted window the next meeting would get
+            expected = meetings["netrtg_diff"].rolling(window, min_periods=3).mean().iloc[-1]
+            if np.isnan(expected):
+                assert stats is None
+            else:
+                assert np.isclose(stats[f"netrtg_last_{window}"], expected)
@@ -0,0 +1,37 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+import pytest
+from team_registry import TeamRegistry
+from predict import parse_matchup
+
+REGISTRY = TeamRegistry(
+    [{"id": team_id, "abbreviation": f"T{team_id:02d}", "name": f"Team {team_id}"} for team_id in range(1, 31)],
+    version="test", fetched_at="2024-11-01T00:00:00+00:00",
+)
+
+def test_reads_ids_and_rest_days():
+    assert parse_matchup({"home_team_id": 3, "away_team_id": 4, "home_rest_days": 0}, REGISTRY) == (3, 4, 0)
+    assert parse_matchup({"home_team_id": "7", "away_team_id": "12", "home_rest_days": "7"}, REGISTRY) == (7, 12, 7)
+
+def test_rest_days_default_to_two():
+    assert parse_matchup({"home_team_id": 3, "away_team_id": 4}, REGISTRY) == (3, 4, 2)
+
+@pytest.mark.parametrize("payload, message", [
+    ({"home_team_id": 5, "away_team_id": 5}, "cannot be the same"),
+    ({"home_team_id": 31, "away_team_id": 5}, "Unknown team id 31"),
+    ({"home_team_id": 5, "away_team_id": 0}, "Unknown team id 0"),
+    ({"home_team_id": 5, "away_team_id": 6, "home_rest_days": 8}, "between 0-7"),
+    ({"home_team_id": 5, "away_team_id": 6, "home_rest_days": -1}, "between 0-7"),
+])
+def test_rejects_invalid_matchups(payload, message):
+    with pytest.raises(ValueError, match=message):
+        parse_matchup(payload, REGISTRY)
+
+def test_missing_or_non_numeric_ids_are_rejected():
+    with pytest.raises(KeyError):
+        parse_matchup({"home_team_id": 5}, REGISTRY)
+    with pytest.raises(ValueError):
+        parse_matchup({"home_team_id": "LAL", "away_team_id": 5}, REGISTRY)
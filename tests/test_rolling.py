@@ -0,0 +1,30 @@
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "lib"))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import numpy as np
+import pandas as pd
+from rolling import RollingSpec, rolling_features
+from bench_rolling import synthetic_games, transform_lambdas, rolling_engine
+
+def test_engine_matches_the_groupby_lambdas():
+    df = synthetic_games(2, teams=10)
+    pd.testing.assert_frame_equal(transform_lambdas(df).astype(float), rolling_engine(df), check_exact=True)
+
+def test_engine_handles_missing_values_and_unsorted_groups():
+    df = synthetic_games(1, teams=6).sample(frac=1, random_state=0)
+    df.loc[df.index[::7], "home_score"] = np.nan
+    specs = [
+        RollingSpec("pts", "home_score", 5, min_periods=2),
+        RollingSpec("pts_std", "home_score", 5, min_periods=3, stat="std"),
+        RollingSpec("prev_pts", "home_score", 3, min_periods=1, shift=1),
+    ]
+    actual = rolling_features(df, "home_team_id", specs)
+    for spec in specs:
+        expected = df.groupby("home_team_id")[spec.column].transform(
+            lambda x: getattr(x.shift(spec.shift).rolling(spec.window, min_periods=spec.min_periods), spec.stat)()
+        )
+        pd.testing.assert_series_equal(actual[spec.name], expected.astype(float), check_names=False)
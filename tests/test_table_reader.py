@@ -0,0 +1,89 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lib"))
+
+from table_reader import iter_pages, read_table, GAMES_SCHEMA
+
+class FakeQuery:
+    """The slice of the PostgREST query builder iter_pages uses, over a list of rows"""
+
+    def __init__(self, client, rows):
+        self.client = client
+        self.rows = rows
+        self.conditions = []
+
+    def select(self, columns):
+        self.columns = columns.split(",")
+        return self
+
+    def gt(self, column, value):
+        self.conditions.append(("gt", column, value))
+        self.rows = [row for row in self.rows if row[column] > value]
+        return self
+
+    def gte(self, column, value):
+        self.conditions.append(("gte", column, value))
+        self.rows = [row for row in self.rows if row[column] >= value]
+        return self
+
+    def order(self, column):
+        self.rows = sorted(self.rows, key=lambda row: row[column])
+        return self
+
+    def limit(self, count):
+        self.rows = self.rows[:count]
+        return self
+
+    def execute(self):
+        self.client.requests.append(self.conditions)
+        data = [{column: row[column] for column in self.columns} for row in self.rows]
+        if self.client.on_request:
+            self.client.on_request(len(self.client.requests))
+        return type("Response", (), {"data": data})
+
+class FakeClient:
+    def __init__(self, rows, on_request=None):
+        self.rows = rows
+        self.requests = []
+        self.on_request = on_request
+
+    def table(self, name):
+        return FakeQuery(self, list(self.rows))
+
+def game(game_id, date="2024-11-01"):
+    return {"id": game_id, "season": 2024, "date": date, "home_team_id": 1, "away_team_id": 2,
+            "home_score": 110, "away_score": 100, "home_win": True, "season_type": "Regular Season"}
+
+def test_pages_follow_the_last_key_seen():
+    client = FakeClient([game(i) for i in range(1, 11)])
+    pages = list(iter_pages(client, "games", ["id"], page_size=4))
+
+    assert [[row["id"] for row in page] for page in pages] == [[1, 2, 3, 4], [5, 6, 7, 8], [9, 10]]
+    assert client.requests == [[], [("gt", "id", 4)], [("gt", "id", 8)]]
+
+def test_a_full_last_page_ends_on_an_empty_request():
+    client = FakeClient([game(i) for i in range(1, 9)])
+    pages = list(iter_pages(client, "games", ["id"], page_size=4))
+
+    assert sum(len(page) for page in pages) == 8
+    assert len(client.requests) == 3
+
+def test_rows_added_during_the_read_are_neither_skipped_nor_repeated():
+    rows = [game(i) for i in range(2, 21, 2)]
+    # After the first page, an earlier id and a later one arrive
+    def insert(requests):
+        if requests == 1:
+            rows.extend([game(1), game(21)])
+    client = FakeClient(rows, on_request=insert)
+
+    ids = [row["id"] for page in iter_pages(client, "games", ["id"], page_size=3) for row in page]
+    assert ids == [2, 4, 6, 8, 10, 12, 14, 16, 18, 20, 21]
+
+def test_filters_apply_to_every_page():
+    client = FakeClient([game(i, date=f"2024-11-{i:02d}") for i in range(1, 11)])
+    df = read_table(client, "games", GAMES_SCHEMA, page_size=2, filters=[("gte", "date", "2024-11-06")])
+
+    assert df["id"].tolist() == [6, 7, 8, 9, 10]
+    assert all(("gte", "date", "2024-11-06") in conditions for conditions in client.requests)
+    assert df.dtypes.astype(str).to_dict() == GAMES_SCHEMA